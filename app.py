@@ -5,7 +5,7 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
 from app import create_app
-from app.extensions.db import get_db
+from app.utils.revogacao import token_revogado
 
 # ===========================
 # Carrega variáveis do .env
@@ -32,11 +32,7 @@ jwt = JWTManager(app)
 
 @jwt.token_in_blocklist_loader
 def verificar_token_revogado(jwt_header, jwt_payload):
-    jti = jwt_payload["jti"]
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("SELECT 1 FROM tokensrevogados WHERE jti = %s", (jti,))
-        return cursor.fetchone() is not None
+    return token_revogado(jwt_payload["jti"])
 
 # ===========================
 # CORS global
@@ -4,6 +4,12 @@ from app.config import Config
 from flask_cors import CORS
 from app.extensions import jwt
 from app.extensions.mail import mail
+from app.extensions.db import init_db
+from app.utils.instrumentacao import init_instrumentacao
+from app.utils.metricas import init_metricas
+from app.utils.rastreamento import init_rastreamento
+from app.utils.revogacao import obter_cache_revogacao, token_revogado
+from app.comandos import registrar_comandos
 from werkzeug.exceptions import HTTPException
 
 # Blueprints
@@ -17,6 +23,7 @@ from app.dashboard.dashboard_routes import dashboard_bp
 from app.registrostreino.registrostreino_routes import registrostreino_bp
 from app.exercicios.exercicios_routes import exercicios_bp
 from app.administrador.admin_routes import admin_bp
+from app.envios.envios_routes import envios_bp
 
 def create_app():
     app = Flask(__name__, static_folder='static', static_url_path='/static')
@@ -45,18 +52,24 @@ def create_app():
     # Inicializar extensões
     jwt.init_app(app)
     mail.init_app(app)
+    init_db(app)
+    init_instrumentacao(app)
+    init_metricas(app)
+    init_rastreamento(app)
 
     # =====================
     # Verificação de tokens revogados (Blacklist)
     # =====================
     @jwt.token_in_blocklist_loader
     def verificar_token_revogado(jwt_header, jwt_payload):
-        from app.extensions.db import get_db
-        jti = jwt_payload["jti"]
-        db = get_db()
-        with db.cursor() as cursor:
-            cursor.execute("SELECT 1 FROM tokensrevogados WHERE jti = %s", (jti,))
-            return cursor.fetchone() is not None
+        return token_revogado(jwt_payload["jti"])
+
+    # Aquece o cache de revogação deste processo antes da primeira requisição
+    with app.app_context():
+        try:
+            obter_cache_revogacao().sincronizar()
+        except Exception as e:
+            print(f"[ERRO] Falha ao aquecer cache de tokens revogados: {e}")
 
     # =====================
     # CORS com suporte a credentials
@@ -115,5 +128,9 @@ def create_app():
     app.register_blueprint(registrostreino_bp, url_prefix="/registrostreino")
     app.register_blueprint(exercicios_bp, url_prefix="/exercicios")
     app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(envios_bp, url_prefix="/envios")
+
+    # Comandos de manutenção (flask tokens purgar, ...)
+    registrar_comandos(app)
 
     return app
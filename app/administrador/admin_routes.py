@@ -9,6 +9,12 @@ import os
 import subprocess
 from dotenv import load_dotenv
 from app.utils.admin import verificar_admin
+from app.utils.revogacao import contar_tokens_revogados
+from app.utils.estatisticas import obter_estatisticas
+from app.utils.paginacao import Paginacao
+from app.utils.streaming import responder_json_streaming
+from app.utils.indice_trigramas import remover_aluno
+from app.utils.instrumentacao import obter_estatisticas_sql
 import traceback
 
 admin_bp = Blueprint("admin", __name__)
@@ -55,42 +61,68 @@ def estatisticas_gerais():
     if not verificar_admin():
         return jsonify({"message": "Acesso negado"}), 403
 
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) AS total_alunos FROM usuarios WHERE tipo_usuario='aluno'")
-        total_alunos = cursor.fetchone()["total_alunos"]
+    # Séries: ?semanas=12 (novos usuários por semana) e ?dias=30 (sessões por dia)
+    semanas = min(max(request.args.get("semanas", 12, type=int), 1), 52)
+    dias = min(max(request.args.get("dias", 30, type=int), 1), 90)
 
-        cursor.execute("SELECT COUNT(*) AS total_personais FROM usuarios WHERE tipo_usuario='personal'")
-        total_personais = cursor.fetchone()["total_personais"]
+    try:
+        return jsonify(obter_estatisticas(semanas, dias))
+    except Exception as e:
+        print("Erro ao calcular estatísticas:", e)
+        return jsonify({"message": "Erro ao calcular estatísticas"}), 500
 
-        cursor.execute("SELECT COUNT(*) AS total_nutris FROM usuarios WHERE tipo_usuario='nutricionista'")
-        total_nutris = cursor.fetchone()["total_nutris"]
+# ===============================
+# Tamanho da tabela de tokens revogados
+# ===============================
+@admin_bp.route("/tokens-revogados", methods=["GET"])
+@jwt_required()
+def tamanho_tokens_revogados():
+    if not verificar_admin():
+        return jsonify({"message": "Acesso negado"}), 403
 
-        cursor.execute("SELECT COUNT(*) AS total_treinos FROM treinos WHERE ativo=TRUE")
-        total_treinos = cursor.fetchone()["total_treinos"]
+    try:
+        return jsonify(contar_tokens_revogados()), 200
+    except Exception as e:
+        return jsonify({"message": f"Erro ao contar tokens revogados: {str(e)}"}), 500
 
-        cursor.execute("SELECT COUNT(*) AS total_planos FROM planosalimentares WHERE ativo=TRUE")
-        total_planos = cursor.fetchone()["total_planos"]
+# ===============================
+# Consultas SQL mais caras deste worker (agregado por impressão digital)
+# ===============================
+ORDENS_SQL = ("tempo_total_ms", "tempo_medio_ms", "p95_ms", "chamadas", "linhas")
 
-        cursor.execute("SELECT COUNT(*) AS total_agendamentos FROM agendamentos")
-        total_agendamentos = cursor.fetchone()["total_agendamentos"]
 
-        cursor.execute("SELECT COUNT(*) AS total_avaliacoes FROM avaliacoesfisicas")
-        total_avaliacoes = cursor.fetchone()["total_avaliacoes"]
+@admin_bp.route("/sql-estatisticas", methods=["GET"])
+@jwt_required()
+def estatisticas_sql():
+    if not verificar_admin():
+        return jsonify({"message": "Acesso negado"}), 403
 
-        cursor.execute("SELECT COUNT(*) AS total_exercicios FROM exercicios")
-        total_exercicios = cursor.fetchone()["total_exercicios"]
+    ordem = request.args.get("ordem", "tempo_total_ms")
+    if ordem not in ORDENS_SQL:
+        return jsonify({"message": f"ordem deve ser uma de: {', '.join(ORDENS_SQL)}"}), 400
+    limite = min(max(request.args.get("limite", 50, type=int), 1), 500)
+    origem = request.args.get("origem")
 
+    estatisticas = obter_estatisticas_sql()
+    consultas = estatisticas.listar(ordem, limite=None if origem else limite)
+    if origem:
+        consultas = [c for c in consultas if c["origem"] == origem][:limite]
     return jsonify({
-        "alunos": total_alunos,
-        "personal": total_personais,
-        "nutricionista": total_nutris,
-        "treinos": total_treinos,
-        "planos": total_planos,
-        "agendamentos": total_agendamentos,
-        "avaliacoes": total_avaliacoes,
-        "exercicios": total_exercicios
-    })
+        # Cada worker do gunicorn tem o seu agregado: requisições seguidas podem cair em workers diferentes
+        "pid": estatisticas.pid,
+        "desde": datetime.fromtimestamp(estatisticas.desde).isoformat(timespec="seconds"),
+        "consultas": consultas,
+    }), 200
+
+
+@admin_bp.route("/sql-estatisticas", methods=["DELETE"])
+@jwt_required()
+def zerar_estatisticas_sql():
+    if not verificar_admin():
+        return jsonify({"message": "Acesso negado"}), 403
+
+    obter_estatisticas_sql().zerar()
+    return jsonify({"message": "Estatísticas de SQL zeradas neste worker"}), 200
 
 # ===============================
 # Listar todos os usuários
@@ -101,14 +133,15 @@ def listar_usuarios():
     if not verificar_admin():
         return jsonify({"message": "Acesso negado"}), 403
 
+    pagina = Paginacao.da_requisicao([("nome", "nome", "ASC"), ("id_usuario", "id", "ASC")])
     db = get_db()
     with db.cursor() as cursor:
-        cursor.execute("""
+        resultado = pagina.executar(cursor, """
             SELECT id_usuario AS id, nome, email, tipo_usuario, ativo, criado_em
             FROM usuarios
-            ORDER BY nome
+            WHERE {apos_cursor}
         """)
-        return jsonify(cursor.fetchall()), 200
+        return jsonify(resultado), 200
 
 # ===============================
 # Desativar usuário manualmente
@@ -137,6 +170,7 @@ def desativar_usuario(id_usuario):
             # Atualizar status
             cursor.execute("UPDATE usuarios SET ativo=FALSE WHERE id_usuario=%s", (id_usuario,))
         db.commit()
+        remover_aluno(id_usuario)
 
         registrar_log(email_admin, "Desativar usuário", f"id_usuario={id_usuario}")
         return jsonify({"message": "Usuário desativado com sucesso"}), 200
@@ -309,6 +343,38 @@ def restaurar_backup(nome):
         return jsonify({"message": f"Erro ao restaurar backup: {e}"}), 500
     
 
+# ===============================
+# Consultas de logs (listagem e exportação)
+# ===============================
+SQL_LOGS = {
+    "envio": """
+        SELECT l.id_log, 'envio' AS tipo_log,
+            u.nome AS usuario_destino, u.email,
+            l.tipo_envio, l.destino, l.conteudo, l.status, l.data_envio
+        FROM logs l
+        LEFT JOIN usuarios u ON l.id_usuario = u.id_usuario
+        WHERE l.tipo_log = 'envio'
+        ORDER BY l.data_envio DESC
+    """,
+    "acao": """
+        SELECT l.id_log, 'acao' AS tipo_log,
+            l.usuario_origem, l.acao, l.detalhes, l.data
+        FROM logs l
+        WHERE l.tipo_log = 'acao'
+        ORDER BY l.data DESC
+    """,
+    None: """
+        SELECT l.id_log, l.tipo_log,
+            l.usuario_origem, l.acao, l.detalhes,
+            u.nome AS usuario_destino, u.email,
+            l.tipo_envio, l.destino, l.conteudo, l.status,
+            l.data_envio, l.data
+        FROM logs l
+        LEFT JOIN usuarios u ON l.id_usuario = u.id_usuario
+        ORDER BY COALESCE(l.data_envio, l.data) DESC
+    """,
+}
+
 # ===============================
 # Listar logs do sistema (completo)
 # ===============================
@@ -319,42 +385,29 @@ def listar_logs():
         return jsonify({"message": "Acesso negado"}), 403
 
     tipo = request.args.get("tipo")  # envio, acao, ou None
+    sql = SQL_LOGS.get(tipo, SQL_LOGS[None])
     db = get_db()
     try:
         with db.cursor() as cursor:
-            if tipo == "envio":
-                cursor.execute("""
-                    SELECT l.id_log, 'envio' AS tipo_log,
-                        u.nome AS usuario_destino, u.email,
-                        l.tipo_envio, l.destino, l.conteudo, l.status, l.data_envio
-                    FROM logs l
-                    LEFT JOIN usuarios u ON l.id_usuario = u.id_usuario
-                    WHERE l.tipo_log = 'envio'
-                    ORDER BY l.data_envio DESC
-                    LIMIT 100
-                """)
-            elif tipo == "acao":
-                cursor.execute("""
-                    SELECT l.id_log, 'acao' AS tipo_log,
-                        l.usuario_origem, l.acao, l.detalhes, l.data
-                    FROM logs l
-                    WHERE l.tipo_log = 'acao'
-                    ORDER BY l.data DESC
-                    LIMIT 100
-                """)
-            else:
-                cursor.execute("""
-                    SELECT l.id_log, l.tipo_log,
-                        l.usuario_origem, l.acao, l.detalhes,
-                        u.nome AS usuario_destino, u.email,
-                        l.tipo_envio, l.destino, l.conteudo, l.status,
-                        l.data_envio, l.data
-                    FROM logs l
-                    LEFT JOIN usuarios u ON l.id_usuario = u.id_usuario
-                    ORDER BY COALESCE(l.data_envio, l.data) DESC
-                    LIMIT 100
-                """)
-
+            cursor.execute(sql + " LIMIT 100")
             return jsonify(cursor.fetchall()), 200
     except Exception as e:
         return jsonify({"message": f"Erro ao obter logs: {str(e)}"}), 500
+
+# ===============================
+# Exportar todos os logs (JSON em streaming)
+# ===============================
+@admin_bp.route("/logs/exportar", methods=["GET"])
+@jwt_required()
+def exportar_logs():
+    if not verificar_admin():
+        return jsonify({"message": "Acesso negado"}), 403
+
+    tipo = request.args.get("tipo")
+    try:
+        return responder_json_streaming(
+            SQL_LOGS.get(tipo, SQL_LOGS[None]),
+            nome_arquivo=f"logs_{tipo or 'todos'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        )
+    except Exception as e:
+        return jsonify({"message": f"Erro ao exportar logs: {str(e)}"}), 500
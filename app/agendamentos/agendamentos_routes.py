@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions.db import get_db
+from app.utils.cache import invalidar_dashboard
+from app.utils.paginacao import Paginacao
+from app.utils.stats_profissional import registrar_vinculo, recalcular_sessoes_semana
 import json
 
 agendamentos_bp = Blueprint('agendamentos', __name__)
@@ -46,8 +49,13 @@ def criar_agendamento():
                 )
                 VALUES (%s, %s, %s, %s, %s, %s, 'marcado')
             """, (id_aluno, id_profissional, tipo, inicio, fim, observacoes))
+            id_agendamento = cursor.lastrowid
+
+            registrar_vinculo(cursor, id_profissional, id_aluno)
+            recalcular_sessoes_semana(cursor, id_profissional)
             db.commit()
-            return jsonify({'msg': 'Agendamento criado com sucesso', 'id_agendamento': cursor.lastrowid}), 201
+            invalidar_dashboard(id_aluno, id_profissional)
+            return jsonify({'msg': 'Agendamento criado com sucesso', 'id_agendamento': id_agendamento}), 201
     except Exception as e:
         print("Erro ao criar agendamento:", e)
         return jsonify({'msg': 'Erro interno ao criar agendamento'}), 500
@@ -64,31 +72,33 @@ def listar_agendamentos():
     identidade = extrair_user_info()
     user_id = identidade.get("id")
     tipo_usuario = identidade.get("tipo_usuario")
+    pagina = Paginacao.da_requisicao([
+        ("a.data_hora_inicio", "data_hora_inicio", "DESC"),
+        ("a.id_agendamento", "id_agendamento", "DESC"),
+    ])
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             if tipo_usuario == 'aluno':
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT a.id_agendamento, a.tipo_agendamento, a.data_hora_inicio, a.data_hora_fim,
                            a.status, a.observacoes, 
                            u.nome AS nome_profissional, u.tipo_usuario AS tipo_profissional
                     FROM agendamentos a
                     JOIN usuarios u ON a.id_profissional = u.id_usuario
-                    WHERE a.id_aluno = %s
-                    ORDER BY a.data_hora_inicio DESC
+                    WHERE a.id_aluno = %s AND {apos_cursor}
                 """, (user_id,))
             else:
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT a.id_agendamento, a.tipo_agendamento, a.data_hora_inicio, a.data_hora_fim,
                            a.status, a.observacoes, 
                            u.nome AS nome_aluno, u.tipo_usuario AS tipo_aluno
                     FROM agendamentos a
                     JOIN usuarios u ON a.id_aluno = u.id_usuario
-                    WHERE a.id_profissional = %s
-                    ORDER BY a.data_hora_inicio DESC
+                    WHERE a.id_profissional = %s AND {apos_cursor}
                 """, (user_id,))
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("Erro ao listar agendamentos:", e)
         return jsonify({'msg': 'Erro interno ao listar agendamentos'}), 500
@@ -145,7 +155,10 @@ def atualizar_agendamento(id):
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("SELECT data_hora_inicio, data_hora_fim, status, observacoes FROM agendamentos WHERE id_agendamento = %s", (id,))
+            cursor.execute("""
+                SELECT id_aluno, id_profissional, data_hora_inicio, data_hora_fim, status, observacoes
+                FROM agendamentos WHERE id_agendamento = %s
+            """, (id,))
             atual = cursor.fetchone()
             if not atual:
                 return jsonify({'msg': 'Agendamento não encontrado'}), 404
@@ -165,8 +178,10 @@ def atualizar_agendamento(id):
                 SET data_hora_inicio = %s, data_hora_fim = %s, status = %s, observacoes = %s
                 WHERE id_agendamento = %s
             """, (data_hora_inicio, data_hora_fim, status_final, observacoes_final, id))
+            recalcular_sessoes_semana(cursor, atual["id_profissional"])
 
             db.commit()
+            invalidar_dashboard(atual["id_aluno"], atual["id_profissional"])
             return jsonify({'msg': 'Agendamento atualizado com sucesso', 'id_agendamento': id}), 200
     except Exception as e:
         print("Erro ao atualizar agendamento:", e)
@@ -184,12 +199,20 @@ def cancelar_agendamento(id):
     db = get_db()
     try:
         with db.cursor() as cursor:
+            cursor.execute("""
+                SELECT id_aluno, id_profissional FROM agendamentos WHERE id_agendamento = %s
+            """, (id,))
+            agendamento = cursor.fetchone()
             cursor.execute("""
                 UPDATE agendamentos
                 SET status = 'cancelado'
                 WHERE id_agendamento = %s
             """, (id,))
+            if agendamento:
+                recalcular_sessoes_semana(cursor, agendamento["id_profissional"])
             db.commit()
+            if agendamento:
+                invalidar_dashboard(agendamento["id_aluno"], agendamento["id_profissional"])
             return jsonify({'msg': 'Agendamento cancelado com sucesso', 'id_agendamento': id}), 200
     except Exception as e:
         print("Erro ao cancelar agendamento:", e)
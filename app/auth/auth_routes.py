@@ -5,10 +5,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from app.extensions.db import get_db
 from app.utils.logs import registrar_log_acao
+from app.utils.revogacao import registrar_revogacao
 import secrets
-from flask_mail import Message
-from app.extensions.mail import mail
-from app.utils.jwt import extrair_user_info
+from app.utils.jwt import extrair_user_info, extrair_user_id
+from app.utils.fila_envios import enfileirar_envio
+from app.utils.texto import normalizar_nome
+from app.utils.indice_trigramas import indexar_aluno
 
 
 auth_bp = Blueprint('auth', __name__)
@@ -51,22 +53,24 @@ def register():
 
             if tipo_usuario == "personal":
                 cursor.execute("""
-                    INSERT INTO usuarios (nome, email, senha_hash, tipo_usuario, ativo, cref)
-                    VALUES (%s, %s, %s, %s, TRUE, %s)
-                """, (nome, email, senha_hash, tipo_usuario, cref))
+                    INSERT INTO usuarios (nome, nome_busca, email, senha_hash, tipo_usuario, ativo, cref)
+                    VALUES (%s, %s, %s, %s, %s, TRUE, %s)
+                """, (nome, normalizar_nome(nome), email, senha_hash, tipo_usuario, cref))
             elif tipo_usuario == "nutricionista":
                 cursor.execute("""
-                    INSERT INTO usuarios (nome, email, senha_hash, tipo_usuario, ativo, crn)
-                    VALUES (%s, %s, %s, %s, TRUE, %s)
-                """, (nome, email, senha_hash, tipo_usuario, crn))
+                    INSERT INTO usuarios (nome, nome_busca, email, senha_hash, tipo_usuario, ativo, crn)
+                    VALUES (%s, %s, %s, %s, %s, TRUE, %s)
+                """, (nome, normalizar_nome(nome), email, senha_hash, tipo_usuario, crn))
             else:  # aluno
                 cursor.execute("""
-                    INSERT INTO usuarios (nome, email, senha_hash, tipo_usuario, ativo)
-                    VALUES (%s, %s, %s, %s, TRUE)
-                """, (nome, email, senha_hash, tipo_usuario))
+                    INSERT INTO usuarios (nome, nome_busca, email, senha_hash, tipo_usuario, ativo)
+                    VALUES (%s, %s, %s, %s, %s, TRUE)
+                """, (nome, normalizar_nome(nome), email, senha_hash, tipo_usuario))
 
             db.commit()
             id_usuario = cursor.lastrowid
+            if tipo_usuario == "aluno":
+                indexar_aluno({"id_usuario": id_usuario, "nome": nome, "email": email})
             registrar_log_acao(nome, "registro_usuario", f"Registrou novo usuário tipo {tipo_usuario}")
 
             response = {'msg': 'Usuário registrado com sucesso'}
@@ -139,7 +143,8 @@ def login():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]
+    token = get_jwt()
+    jti = token["jti"]
     identidade_raw = get_jwt_identity()
     identidade = json.loads(identidade_raw) if isinstance(identidade_raw, str) else identidade_raw
     nome_usuario = identidade.get("email") or identidade.get("id")
@@ -147,8 +152,12 @@ def logout():
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("INSERT INTO tokensrevogados (jti) VALUES (%s)", (jti,))
+            cursor.execute(
+                "INSERT INTO tokensrevogados (jti, expira_em) VALUES (%s, FROM_UNIXTIME(%s))",
+                (jti, token.get("exp"))
+            )
             db.commit()
+        registrar_revogacao(jti, token.get("exp"))
         registrar_log_acao(nome_usuario, "logout", "Logout realizado com sucesso")
         return jsonify({"message": "Logout realizado com sucesso"}), 200
     except Exception as e:
@@ -189,16 +198,16 @@ def cadastro_rapido():
                 return jsonify({"msg": "Já existe um usuário com este CPF"}), 400
 
             cursor.execute("""
-                INSERT INTO usuarios (nome, cpf, email, whatsapp, data_nascimento, senha_hash, tipo_usuario, ativo, perfil_completo)
-                VALUES (%s, %s, %s, %s, %s, %s, 'aluno', TRUE, FALSE)
-            """, (nome, cpf, email, whatsapp, data_nascimento, senha_hash))
+                INSERT INTO usuarios (nome, nome_busca, cpf, email, whatsapp, data_nascimento, senha_hash, tipo_usuario, ativo, perfil_completo)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, 'aluno', TRUE, FALSE)
+            """, (nome, normalizar_nome(nome), cpf, email, whatsapp, data_nascimento, senha_hash))
+            id_aluno = cursor.lastrowid
             db.commit()
+            indexar_aluno({"id_usuario": id_aluno, "nome": nome, "cpf": cpf, "email": email, "whatsapp": whatsapp})
 
-        # Enviar e-mail com instruções
+        # Enfileirar e-mail com instruções
         try:
-            msg = Message("Bem-vindo ao Alpphas GYM!",
-                          recipients=[email])
-            msg.body = f"""
+            corpo = f"""
 Olá, {nome}!
 
 Você foi cadastrado por um profissional no sistema Alpphas GYM.
@@ -214,7 +223,13 @@ Recomendamos que você troque sua senha ao acessar.
 Atenciosamente,
 Equipe Alpphas GYM
 """
-            mail.send(msg)
+            enfileirar_envio(
+                "email", email, corpo,
+                id_usuario=id_aluno,
+                assunto="Bem-vindo ao Alpphas GYM!",
+                descricao_log="E-mail de boas-vindas (cadastro rápido)",
+                id_solicitante=extrair_user_id()
+            )
         except Exception as e:
             print("Erro ao enviar e-mail:", str(e))
 
@@ -1,22 +1,24 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_cors import cross_origin
 from app.extensions.db import get_db
 from app.utils.logs import registrar_log_envio
+from app.utils.jwt import extrair_user_id
+from app.utils.fila_envios import enfileirar_envio
+from app.utils.cache import invalidar_dashboard
+from app.utils.paginacao import Paginacao
+from app.utils.streaming import responder_json_streaming
+from app.utils.busca_alunos import buscar_alunos
 
-from io import BytesIO
 from reportlab.graphics.shapes import Drawing, String
 from reportlab.graphics.charts.lineplots import LinePlot
 from reportlab.graphics.charts.textlabels import Label
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.colors import Color
-from flask_mail import Message
-from app.extensions.mail import mail
+from app.utils.pdf_base import DocumentoPDF
+from app.utils.pdf_cache import responder_pdf
+from app.utils.rastreamento import rastrear
 
 import reportlab.lib.colors as rl_colors
-import os, json, requests
+import os, json
 
 
 avaliacoes_bp = Blueprint("avaliacoes", __name__)
@@ -147,6 +149,7 @@ def criar_avaliacao():
                 observacoes
             ))
             db.commit()
+            invalidar_dashboard(id_aluno)
             return jsonify({"message": "Avaliação criada com sucesso"}), 201
     except Exception as e:
         print("Erro ao registrar avaliação:", e)
@@ -166,33 +169,35 @@ def listar_avaliacoes():
 
     user_id = identidade.get("id")
     tipo = identidade.get("tipo_usuario")
+    pagina = Paginacao.da_requisicao([
+        ("a.data_avaliacao", "data_avaliacao", "DESC"),
+        ("a.id_avaliacao", "id_avaliacao", "DESC"),
+    ])
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             if tipo == "aluno":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT a.*,
                     u1.nome AS nome_profissional,
                     u2.nome AS nome_aluno
                     FROM avaliacoesfisicas a
                     JOIN usuarios u1 ON u1.id_usuario = a.id_profissional
                     JOIN usuarios u2 ON u2.id_usuario = a.id_aluno
-                    WHERE a.id_aluno = %s
-                    ORDER BY a.data_avaliacao DESC
+                    WHERE a.id_aluno = %s AND {apos_cursor}
                 """, (user_id,))
             else:
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT a.*, 
                         u1.nome AS nome_aluno, u1.cpf AS cpf_aluno, 
                         u2.nome AS nome_profissional
                     FROM avaliacoesfisicas a
                     JOIN usuarios u1 ON u1.id_usuario = a.id_aluno
                     JOIN usuarios u2 ON u2.id_usuario = a.id_profissional
-                    WHERE a.id_profissional = %s
-                    ORDER BY a.data_avaliacao DESC
+                    WHERE a.id_profissional = %s AND {apos_cursor}
                 """, (user_id,))
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("Erro ao listar avaliações:", e)
         return jsonify({"message": "Erro interno"}), 500
@@ -200,6 +205,33 @@ def listar_avaliacoes():
         db.close()
 
 
+# ================================
+# Exportar avaliações (JSON em streaming)
+# ================================
+@avaliacoes_bp.route("/exportar", methods=["GET"])
+@jwt_required()
+def exportar_avaliacoes():
+    identidade = extrair_identidade()
+    if not identidade:
+        return jsonify({"message": "Token inválido"}), 401
+
+    # Profissional exporta todas as avaliações que fez; aluno, as próprias
+    campo = "a.id_aluno" if identidade.get("tipo_usuario") == "aluno" else "a.id_profissional"
+    try:
+        return responder_json_streaming(f"""
+            SELECT a.*,
+                u1.nome AS nome_aluno, u2.nome AS nome_profissional
+            FROM avaliacoesfisicas a
+            JOIN usuarios u1 ON u1.id_usuario = a.id_aluno
+            JOIN usuarios u2 ON u2.id_usuario = a.id_profissional
+            WHERE {campo} = %s
+            ORDER BY a.data_avaliacao DESC, a.id_avaliacao DESC
+        """, (identidade.get("id"),), nome_arquivo="avaliacoes.json")
+    except Exception as e:
+        print("Erro ao exportar avaliações:", e)
+        return jsonify({"message": "Erro interno"}), 500
+
+
 # ================================
 # Obter avaliação por ID (ATUALIZADA)
 # ================================
@@ -276,7 +308,7 @@ def editar_avaliacao(id):
     try:
         with db.cursor() as cursor:
             # Verifica se o usuário tem permissão para editar
-            cursor.execute("SELECT id_profissional FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
+            cursor.execute("SELECT id_aluno, id_profissional FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
             avaliacao = cursor.fetchone()
             if not avaliacao:
                 return jsonify({"message": "Avaliação não encontrada"}), 404
@@ -306,6 +338,7 @@ def editar_avaliacao(id):
                 data["panturrilha_direita"], data["panturrilha_esquerda"], data["observacoes"], id
             ))
             db.commit()
+            invalidar_dashboard(avaliacao["id_aluno"])
             return jsonify({"message": "Avaliação atualizada com sucesso"}), 200
     except Exception as e:
         print("Erro ao editar avaliação:", e)
@@ -328,7 +361,7 @@ def excluir_avaliacao(id):
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("SELECT id_profissional FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
+            cursor.execute("SELECT id_aluno, id_profissional FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
             avaliacao = cursor.fetchone()
             if not avaliacao:
                 return jsonify({"message": "Avaliação não encontrada"}), 404
@@ -337,6 +370,7 @@ def excluir_avaliacao(id):
 
             cursor.execute("DELETE FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
             db.commit()
+            invalidar_dashboard(avaliacao["id_aluno"])
             return jsonify({"message": "Avaliação excluída com sucesso"}), 200
     except Exception as e:
         print("Erro ao excluir avaliação:", e)
@@ -361,12 +395,7 @@ def buscar_aluno_por_nome():
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("""
-                SELECT id_usuario, nome, email, cpf
-                FROM usuarios
-                WHERE tipo_usuario = 'aluno' AND nome LIKE %s AND ativo = TRUE
-            """, (f"%{nome}%",))
-            alunos = cursor.fetchall()
+            alunos = buscar_alunos(cursor, nome, ("id_usuario", "nome", "email", "cpf"))
             return jsonify(alunos), 200
     except Exception as e:
         print("Erro ao buscar aluno:", e)
@@ -492,66 +521,26 @@ def detalhar_avaliacao_para_uso(id_avaliacao):
 #=================================
 # Gerar PDF
 #=================================
+@rastrear("pdf.avaliacao")
 def gerar_pdf_avaliacao(avaliacoes, nome_arquivo="avaliacao_temp.pdf", salvar_em_disco=False):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
     atual = avaliacoes[-1]  # Última avaliação
 
-    # Marca d'água (logo central transparente)
-    try:
-        logo_path = "app/static/img/alpphas_logo.png"
-        watermark = ImageReader(logo_path)
-        c.saveState()
-        c.translate(width / 2, height / 2)
-        c.setFillColor(Color(0.7, 0.7, 0.7, alpha=0.08))
-        c.drawImage(watermark, -200, -200, width=400, height=400, mask='auto')
-        c.restoreState()
-    except:
-        pass
-
-    # Logo no canto superior
-    try:
-        c.drawImage(logo_path, 40, height - 80, width=60, height=60, mask='auto')
-    except:
-        pass
-
-    # Cabeçalho do profissional
-    c.setFont("Helvetica", 10)
-    x_dados = 120
-    y_dados = height - 50
-    c.drawString(x_dados, y_dados, f"Profissional: {atual['nome_profissional']}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"Telefone: {atual.get('telefone') or 'Não informado'}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"E-mail: {atual.get('email') or 'Não informado'}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"CREF: {atual.get('cref') or 'Não informado'}")
-
-    c.setLineWidth(1)
-    linha_y = y_dados - 10
-    c.line(40, linha_y, width - 40, linha_y)
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, linha_y - 30, "Avaliação Física")
+    doc = DocumentoPDF("Avaliação Física", [
+        f"Profissional: {atual['nome_profissional']}",
+        f"Telefone: {atual.get('telefone') or 'Não informado'}",
+        f"E-mail: {atual.get('email') or 'Não informado'}",
+        f"CREF: {atual.get('cref') or 'Não informado'}",
+    ])
+    c = doc.c
+    height = doc.height
 
     # Dados do aluno
-    y = linha_y - 60
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, f"Aluno: {atual['nome_aluno']}")
-    y -= 20
-    c.setFont("Helvetica", 11)
-    c.drawString(80, y, f"Data: {atual['data_avaliacao'].strftime('%d/%m/%Y')}")
-    y -= 15
-    c.drawString(80, y, f"Peso: {atual['peso']} kg    Altura: {atual['altura']} m")
-    y -= 25
+    doc.texto(80, f"Aluno: {atual['nome_aluno']}", "Helvetica-Bold", 12, avanco=20)
+    doc.texto(80, f"Data: {atual['data_avaliacao'].strftime('%d/%m/%Y')}", "Helvetica", 11, avanco=15)
+    doc.texto(80, f"Peso: {atual['peso']} kg    Altura: {atual['altura']} m", "Helvetica", 11, avanco=25)
 
     # Medidas corporais
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, "Medições corporais:")
-    y -= 15
-    c.setFont("Helvetica", 10)
+    doc.texto(80, "Medições corporais:", "Helvetica-Bold", 12, avanco=15)
     medidas = [
         ("Ombro", "ombro"),
         ("Tórax", "torax"),
@@ -570,17 +559,11 @@ def gerar_pdf_avaliacao(avaliacoes, nome_arquivo="avaliacao_temp.pdf", salvar_em
         ("Panturrilha Esquerda", "panturrilha_esquerda"),
     ]
     for label, key in medidas:
-        if y < 100:
-            c.showPage()
-            y = height - 80
-        c.drawString(100, y, f"- {label}: {atual.get(key, '---')} cm")
-        y -= 13
-
-    y -= 10
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, "Dobras cutâneas:")
-    y -= 15
-    c.setFont("Helvetica", 10)
+        doc.garantir_espaco()
+        doc.texto(100, f"- {label}: {atual.get(key, '---')} cm", avanco=13)
+
+    doc.y -= 10
+    doc.texto(80, "Dobras cutâneas:", "Helvetica-Bold", 12, avanco=15)
     dobras = [
         ("Peitoral", "dobra_peitoral"),
         ("Tríceps", "dobra_triceps"),
@@ -590,15 +573,11 @@ def gerar_pdf_avaliacao(avaliacoes, nome_arquivo="avaliacao_temp.pdf", salvar_em
         ("Supra-ilíaca", "dobra_supra_iliaca"),
     ]
     for label, key in dobras:
-        if y < 100:
-            c.showPage()
-            y = height - 80
-        c.drawString(100, y, f"- {label}: {atual.get(key, '---')} mm")
-        y -= 13
+        doc.garantir_espaco()
+        doc.texto(100, f"- {label}: {atual.get(key, '---')} mm", avanco=13)
 
-    y -= 20
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, f"Percentual de Gordura: {atual.get('percentual_gordura', '---')}%")
+    doc.y -= 20
+    doc.texto(80, f"Percentual de Gordura: {atual.get('percentual_gordura', '---')}%", "Helvetica-Bold", 12)
 
     # Página nova para gráfico
     c.showPage()
@@ -650,17 +629,7 @@ def gerar_pdf_avaliacao(avaliacoes, nome_arquivo="avaliacao_temp.pdf", salvar_em
 
         drawing.drawOn(c, 40, height - 320)
 
-    c.save()
-    buffer.seek(0)
-
-    if salvar_em_disco:
-        caminho = os.path.join("app", "static", "pdfs", nome_arquivo)
-        os.makedirs(os.path.dirname(caminho), exist_ok=True)
-        with open(caminho, "wb") as f:
-            f.write(buffer.getbuffer())
-        return caminho
-    else:
-        return buffer
+    return doc.finalizar(nome_arquivo, salvar_em_disco)
 
     
 #==============================
@@ -675,13 +644,7 @@ def baixar_pdf_avaliacao(id_avaliacao):
         return jsonify({"message": "Avaliação não encontrada"}), 404
 
     try:
-        pdf = gerar_pdf_avaliacao(avaliacoes)
-        return send_file(
-            pdf,
-            mimetype="application/pdf",
-            as_attachment=True,
-            download_name=f"avaliacao_fisica_{id_avaliacao}.pdf"
-        )
+        return responder_pdf("avaliacao", avaliacoes, gerar_pdf_avaliacao, f"avaliacao_fisica_{id_avaliacao}.pdf")
     except Exception as e:
         print(f"[ERRO PDF AVALIACAO] {e}")
         return jsonify({"message": "Erro ao gerar PDF da avaliação física"}), 500
@@ -729,28 +692,12 @@ def enviar_avaliacao_whatsapp(id_avaliacao):
             f"Equipe Alpphas GYM"
         )
 
-        instancia = os.getenv("ULTRAMSG_INSTANCE")
-        token = os.getenv("ULTRAMSG_TOKEN")
-        payload = {
-            "token": token,
-            "to": numero,
-            "body": mensagem
-        }
-
-        try:
-            response = requests.post(
-                f"https://api.ultramsg.com/{instancia}/messages/chat",
-                json=payload
-            )
-            response.raise_for_status()
-
-            registrar_log_envio(atual["id_aluno"], "whatsapp", numero, mensagem, "sucesso")
-            return jsonify({"message": "Avaliação enviada com sucesso via WhatsApp"}), 200
-
-        except Exception as e:
-            print("Erro ao enviar WhatsApp:", e)
-            registrar_log_envio(atual["id_aluno"], "whatsapp", numero, f"Erro no envio WhatsApp: {mensagem}", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar via WhatsApp: {str(e)}"}), 500
+        id_envio = enfileirar_envio(
+            "whatsapp", numero, mensagem,
+            id_usuario=atual["id_aluno"],
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio via WhatsApp agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado no envio:", e)
@@ -791,34 +738,23 @@ def enviar_avaliacao_email(id_avaliacao):
             registrar_log_envio(atual["id_aluno"], "email", email, "Erro ao gerar PDF", "falha")
             return jsonify({"message": "Erro ao gerar o PDF da avaliação"}), 500
 
-        # Preparar e enviar o e-mail
-        try:
-            msg = Message(
-                subject="📋 Sua Avaliação Física - Alpphas GYM",
-                recipients=[email],
-                body=(
-                    f"Olá {nome},\n\n"
-                    f"Segue em anexo o arquivo da sua avaliação física personalizada com gráfico de evolução.\n\n"
-                    f"Qualquer dúvida, entre em contato com seu profissional.\n\n"
-                    f"Atenciosamente,\nEquipe Alpphas GYM"
-                )
-            )
-
-            msg.attach(
-                filename=f"avaliacao_fisica_{id_avaliacao}.pdf",
-                content_type="application/pdf",
-                data=pdf_data
-            )
-
-            mail.send(msg)
-
-            registrar_log_envio(atual["id_aluno"], "email", email, "Envio de avaliação física em PDF", "sucesso")
-            return jsonify({"message": "Avaliação enviada com sucesso por e-mail."}), 200
-
-        except Exception as e:
-            print("Erro ao enviar e-mail:", e)
-            registrar_log_envio(atual["id_aluno"], "email", email, "Erro ao enviar avaliação física", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar o e-mail: {str(e)}"}), 500
+        # Enfileirar o e-mail
+        corpo = (
+            f"Olá {nome},\n\n"
+            f"Segue em anexo o arquivo da sua avaliação física personalizada com gráfico de evolução.\n\n"
+            f"Qualquer dúvida, entre em contato com seu profissional.\n\n"
+            f"Atenciosamente,\nEquipe Alpphas GYM"
+        )
+        id_envio = enfileirar_envio(
+            "email", email, corpo,
+            id_usuario=atual["id_aluno"],
+            assunto="📋 Sua Avaliação Física - Alpphas GYM",
+            anexo=pdf_data,
+            anexo_nome=f"avaliacao_fisica_{id_avaliacao}.pdf",
+            descricao_log="Envio de avaliação física em PDF",
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio por e-mail agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado no envio:", e)
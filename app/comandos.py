@@ -0,0 +1,117 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.utils.revogacao import purgar_tokens_expirados, contar_tokens_revogados
+from app.utils.fila_envios import criar_despachante
+from app.extensions.db import get_db
+from app.utils.stats_profissional import recalcular_stats
+from app.utils.busca_alunos import reindexar_nomes
+from app.utils.migracoes import aplicar_migracoes, listar_migracoes, pendentes
+
+# ===============================
+# flask tokens ...
+# ===============================
+tokens_cli = AppGroup("tokens", help="Manutenção da tabela tokensrevogados.")
+
+
+@tokens_cli.command("purgar")
+@click.option("--lote", default=1000, show_default=True, help="Linhas apagadas por DELETE.")
+def purgar_tokens(lote):
+    """Remove os tokens revogados cujo exp já passou."""
+    removidos = purgar_tokens_expirados(tamanho_lote=lote)
+    click.echo(f"{removidos} token(s) expirado(s) removido(s).")
+
+
+@tokens_cli.command("contar")
+def contar_tokens():
+    """Mostra o tamanho da tabela tokensrevogados."""
+    contagem = contar_tokens_revogados()
+    click.echo(f"total={contagem['total']} ativos={contagem['ativos']} expirados={contagem['expirados']}")
+
+
+# ===============================
+# flask envios ...
+# ===============================
+envios_cli = AppGroup("envios", help="Fila de envios de e-mail e WhatsApp.")
+
+
+@envios_cli.command("processar")
+@click.option("--continuo", is_flag=True, help="Fica consumindo a fila até ser interrompido (Ctrl+C).")
+def processar_envios(continuo):
+    """Processa os envios pendentes (útil com FILA_ENVIOS_AUTOINICIAR=0)."""
+    despachante = criar_despachante(current_app._get_current_object())
+    if not continuo:
+        click.echo(f"{despachante.processar_lote()} envio(s) processado(s).")
+        return
+
+    despachante.iniciar()
+    click.echo(f"Consumindo a fila com {despachante.num_threads} thread(s)...")
+    try:
+        despachante.aguardar()
+    except KeyboardInterrupt:
+        despachante.parar()
+
+
+# ===============================
+# flask stats ...
+# ===============================
+stats_cli = AppGroup("stats", help="Resumo dos profissionais (profissional_stats).")
+
+
+@stats_cli.command("recalcular")
+@click.option("--profissional", type=int, default=None, help="Recalcula só este id_profissional.")
+def recalcular_stats_profissionais(profissional):
+    """Reconstrói profissional_stats a partir de agendamentos, treinos e planos."""
+    db = get_db()
+    with db.cursor() as cursor:
+        total = recalcular_stats(cursor, profissional)
+    db.commit()
+    click.echo(f"{total} profissional(is) recalculado(s).")
+
+
+# ===============================
+# flask busca ...
+# ===============================
+busca_cli = AppGroup("busca", help="Índice de busca de alunos por nome (usuarios.nome_busca).")
+
+
+@busca_cli.command("reindexar")
+def reindexar_busca():
+    """Preenche nome_busca (nome sem acento, minúsculo) de quem estiver desatualizado."""
+    db = get_db()
+    with db.cursor() as cursor:
+        total = reindexar_nomes(cursor)
+    db.commit()
+    click.echo(f"{total} nome(s) reindexado(s).")
+
+
+# ===============================
+# flask db ...
+# ===============================
+db_cli = AppGroup("db", help="Migrações do esquema (app/migracoes/).")
+
+
+@db_cli.command("upgrade")
+@click.option("--ate", type=int, default=None, help="Para na versão informada.")
+def upgrade_db(ate):
+    """Aplica as migrações pendentes, em ordem."""
+    aplicadas = aplicar_migracoes(get_db(), alvo=ate)
+    for migracao in aplicadas:
+        click.echo(f"aplicada {migracao.nome}")
+    click.echo(f"{len(aplicadas)} migração(ões) aplicada(s).")
+
+
+@db_cli.command("status")
+def status_db():
+    """Lista as migrações e se já foram aplicadas neste banco."""
+    faltando = {migracao.versao for migracao in pendentes(get_db())}
+    for migracao in listar_migracoes():
+        click.echo(f"{'pendente' if migracao.versao in faltando else 'aplicada'}  {migracao.nome}")
+
+
+def registrar_comandos(app):
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(envios_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(busca_cli)
+    app.cli.add_command(db_cli)
@@ -22,5 +22,98 @@ class Config:
     DB_NAME = DB_CONFIG["database"]
     DB_PORT = DB_CONFIG["port"]
 
+    # Pool de conexões (por worker do gunicorn)
+    DB_POOL_TAMANHO = int(os.getenv("DB_POOL_TAMANHO", 10))
+    DB_POOL_TEMPO_VIDA = int(os.getenv("DB_POOL_TEMPO_VIDA", 1800))
+    DB_POOL_TEMPO_OCIOSO = int(os.getenv("DB_POOL_TEMPO_OCIOSO", 300))
+    DB_POOL_TEMPO_ESPERA = int(os.getenv("DB_POOL_TEMPO_ESPERA", 10))
+    # Conexões com multi-statement, só para consultas_em_lote (dashboard, plano, estatísticas)
+    DB_POOL_LOTE_TAMANHO = int(os.getenv("DB_POOL_LOTE_TAMANHO", 3))
+
+    # Intervalo (s) para cada worker buscar logouts feitos em outros workers
+    REVOGACAO_INTERVALO_SINCRONIZACAO = int(os.getenv("REVOGACAO_INTERVALO_SINCRONIZACAO", 5))
+
+    # Cache de PDFs gerados (por worker); com PDF_CACHE_DISCO=1 os despejados vão para app/static/pdfs/cache
+    PDF_CACHE_LIMITE_BYTES = int(os.getenv("PDF_CACHE_LIMITE_BYTES", 64 * 1024 * 1024))
+    PDF_CACHE_DISCO = os.getenv("PDF_CACHE_DISCO", "0") == "1"
+    PDF_CACHE_LIMITE_BYTES_DISCO = int(os.getenv("PDF_CACHE_LIMITE_BYTES_DISCO", 256 * 1024 * 1024))
+
+    # Sessão SMTP reaproveitada: após esse tempo ocioso (s) é verificada com NOOP antes do uso
+    MAIL_TEMPO_OCIOSO = int(os.getenv("MAIL_TEMPO_OCIOSO", 60))
+    # Timeout (s) de cada operação no socket SMTP; entra no cálculo do lease da fila de envios
+    MAIL_TIMEOUT = int(os.getenv("MAIL_TIMEOUT", 30))
+
+    # Dashboard em cache por usuário (por worker); as rotas de escrita mudam a versão do usuário no
+    # banco (dashboard_versoes), conferida a cada acerto; o TTL é a rede de segurança
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 60))
+    DASHBOARD_CACHE_MAX_ITENS = int(os.getenv("DASHBOARD_CACHE_MAX_ITENS", 10000))
+
+    # Estatísticas do painel admin: recalculadas no máximo uma vez por TTL (s) em cada worker
+    ESTATISTICAS_CACHE_TTL = int(os.getenv("ESTATISTICAS_CACHE_TTL", 30))
+
+    # Listagens com ?limit= / ?cursor= (paginação por keyset)
+    PAGINACAO_LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", 50))
+    PAGINACAO_LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", 200))
+
+    # Busca de alunos por nome (typeahead): máximo de resultados por consulta
+    BUSCA_ALUNOS_LIMITE = int(os.getenv("BUSCA_ALUNOS_LIMITE", 20))
+    BUSCA_EXERCICIOS_LIMITE = int(os.getenv("BUSCA_EXERCICIOS_LIMITE", 50))
+
+    # Índice de trigramas em memória (por worker) para alunos e exercícios: montado no início do
+    # worker (gunicorn.conf.py) e remontado em segundo plano a cada TTL (s)
+    INDICE_BUSCA_ATIVO = os.getenv("INDICE_BUSCA_ATIVO", "0") == "1"
+    INDICE_BUSCA_TTL = int(os.getenv("INDICE_BUSCA_TTL", 300))
+    INDICE_BUSCA_LIMIAR = float(os.getenv("INDICE_BUSCA_LIMIAR", 0.5))
+
+    # Exportações em streaming: linhas lidas do MySQL (e codificadas) por vez
+    EXPORTACAO_TAMANHO_BLOCO = int(os.getenv("EXPORTACAO_TAMANHO_BLOCO", 500))
+
+    # Instrumentação das consultas por requisição (header Server-Timing + linha "[SQL] {...}" no log).
+    # A mesma consulta executada mais de SQL_LIMITE_REPETICOES vezes numa requisição é marcada como N+1
+    SQL_INSTRUMENTACAO_ATIVA = os.getenv("SQL_INSTRUMENTACAO_ATIVA", "1") == "1"
+    SQL_LOG_REQUISICOES = os.getenv("SQL_LOG_REQUISICOES", "1") == "1"
+    SQL_LIMITE_REPETICOES = int(os.getenv("SQL_LIMITE_REPETICOES", 5))
+    # Agregado por worker exibido em /admin/sql-estatisticas: consultas distintas guardadas e amostras para o p95
+    SQL_ESTATISTICAS_MAX_CONSULTAS = int(os.getenv("SQL_ESTATISTICAS_MAX_CONSULTAS", 500))
+    SQL_ESTATISTICAS_AMOSTRAS = int(os.getenv("SQL_ESTATISTICAS_AMOSTRAS", 200))
+
+    # /metrics (Prometheus): com METRICAS_TOKEN definido, exige "Authorization: Bearer <token>"
+    METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+
+    # Rastreamento (traces) por requisição, gravado em JSON lines no formato OTLP/JSON.
+    # RASTREAMENTO_AMOSTRAGEM: fração das requisições sem traceparent de origem que entram na amostra
+    RASTREAMENTO_ATIVO = os.getenv("RASTREAMENTO_ATIVO", "0") == "1"
+    RASTREAMENTO_AMOSTRAGEM = float(os.getenv("RASTREAMENTO_AMOSTRAGEM", 0.1))
+    RASTREAMENTO_ARQUIVO = os.getenv("RASTREAMENTO_ARQUIVO", os.path.join("logs", "rastros.jsonl"))
+
+    # Logs gravados em lote: flush a cada LOGS_TAMANHO_LOTE linhas ou LOGS_INTERVALO_MS.
+    # Buffer cheio: "descartar" a linha nova ou "bloquear" até LOGS_TEMPO_BLOQUEIO_MS
+    LOGS_TAMANHO_LOTE = int(os.getenv("LOGS_TAMANHO_LOTE", 200))
+    LOGS_INTERVALO_MS = int(os.getenv("LOGS_INTERVALO_MS", 500))
+    LOGS_CAPACIDADE = int(os.getenv("LOGS_CAPACIDADE", 10000))
+    LOGS_POLITICA = os.getenv("LOGS_POLITICA", "descartar")
+    LOGS_TEMPO_BLOQUEIO_MS = int(os.getenv("LOGS_TEMPO_BLOQUEIO_MS", 50))
+
+    # Fila de envios (e-mail / WhatsApp)
+    FILA_ENVIOS_AUTOINICIAR = os.getenv("FILA_ENVIOS_AUTOINICIAR", "1") == "1"
+    FILA_ENVIOS_THREADS = int(os.getenv("FILA_ENVIOS_THREADS", 2))
+    FILA_ENVIOS_INTERVALO = int(os.getenv("FILA_ENVIOS_INTERVALO", 5))
+    FILA_ENVIOS_LOTE = int(os.getenv("FILA_ENVIOS_LOTE", 10))
+    FILA_ENVIOS_MAX_TENTATIVAS = int(os.getenv("FILA_ENVIOS_MAX_TENTATIVAS", 5))
+    # Lease (s) de um envio reservado, somado ao pior caso da entrega (timeouts do SMTP/UltraMsg)
+    FILA_ENVIOS_TEMPO_LEASE = int(os.getenv("FILA_ENVIOS_TEMPO_LEASE", 300))
+    FILA_ENVIOS_ESPERA_BASE = int(os.getenv("FILA_ENVIOS_ESPERA_BASE", 30))
+    FILA_ENVIOS_ESPERA_MAXIMA = int(os.getenv("FILA_ENVIOS_ESPERA_MAXIMA", 3600))
+
+    # UltraMsg (WhatsApp)
+    ULTRAMSG_API_URL = os.getenv("ULTRAMSG_API_URL", "https://api.ultramsg.com")
+    ULTRAMSG_INSTANCE = os.getenv("ULTRAMSG_INSTANCE")
+    ULTRAMSG_TOKEN = os.getenv("ULTRAMSG_TOKEN")
+    ULTRAMSG_TIMEOUT_CONEXAO = float(os.getenv("ULTRAMSG_TIMEOUT_CONEXAO", 3))
+    ULTRAMSG_TIMEOUT_LEITURA = float(os.getenv("ULTRAMSG_TIMEOUT_LEITURA", 10))
+    ULTRAMSG_TAMANHO_POOL = int(os.getenv("ULTRAMSG_TAMANHO_POOL", 10))
+    ULTRAMSG_LIMITE_FALHAS = int(os.getenv("ULTRAMSG_LIMITE_FALHAS", 5))
+    ULTRAMSG_TEMPO_REABERTURA = int(os.getenv("ULTRAMSG_TEMPO_REABERTURA", 30))
+
     DEBUG = os.getenv("FLASK_DEBUG", "1") == "1"
     TESTING = os.getenv("FLASK_ENV") == "testing"
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions.db import get_db
+from app.extensions.db import get_db, consultas_em_lote
+from app.utils.cache import obter_cache_dashboard, ttl_ate_proximo, versao_dashboard
+from app.utils.stats_profissional import completar_stats
 import json
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -31,124 +33,137 @@ def dashboard():
 
     try:
         with db.cursor() as cursor:
+            # Só muda quando o usuário (ou o profissional) grava algo; as rotas de escrita
+            # incrementam a versão, então o cache de qualquer worker só vale se ela bater
+            versao = versao_dashboard(cursor, user_id)
+            cache = obter_cache_dashboard()
+            em_cache = cache.obter(user_id)
+            if em_cache is not None and em_cache[0] == versao:
+                return jsonify(em_cache[1]), 200
+            inicio_calculo = cache.agora()
+
             # Perfil do usuário
-            cursor.execute("""
+            consultas = [("""
                 SELECT id_usuario, nome, email, tipo_usuario
                 FROM usuarios
                 WHERE id_usuario = %s AND ativo = TRUE
-            """, (user_id,))
-            perfil = cursor.fetchone()
-
-            if not perfil:
-                return jsonify({'message': 'Usuário não encontrado'}), 404
-
-            dashboard_data = {
-                "perfil": {
-                    "id_usuario": perfil["id_usuario"],
-                    "nome": perfil["nome"],
-                    "email": perfil["email"],
-                    "tipo_usuario": perfil["tipo_usuario"]
-                }
-            }
+            """, (user_id,))]
 
             # ========================
             # DASHBOARD DO ALUNO
             # ========================
             if user_tipo == "aluno":
-                # Agendamentos futuros
-                cursor.execute("""
-                    SELECT id_agendamento, tipo_agendamento, data_hora_inicio
-                    FROM agendamentos
-                    WHERE id_aluno = %s AND status = 'marcado' AND data_hora_inicio >= NOW()
-                    ORDER BY data_hora_inicio ASC
-                    LIMIT 5
-                """, (user_id,))
-                dashboard_data["proximos_agendamentos"] = cursor.fetchall()
-
-                # Avaliações recentes
-                cursor.execute("""
-                    SELECT data_avaliacao, peso, percentual_gordura, imc
-                    FROM avaliacoesfisicas
-                    WHERE id_aluno = %s
-                    ORDER BY data_avaliacao DESC
-                    LIMIT 3
-                """, (user_id,))
-                dashboard_data["avaliacoes_recentes"] = cursor.fetchall()
-
-                # Execuções de treino recentes
-                cursor.execute("""
-                    SELECT t.nome_treino, r.data_execucao, r.observacoes
-                    FROM registrostreino r
-                    JOIN treinos t ON r.id_treino = t.id_treino
-                    WHERE r.id_aluno = %s
-                    ORDER BY r.data_execucao DESC
-                    LIMIT 5
-                """, (user_id,))
-                dashboard_data["execucoes_recentes"] = cursor.fetchall()
-
-                # Plano alimentar atual
-                cursor.execute("""
-                    SELECT id_plano, titulo, descricao_geral
-                    FROM planosalimentares
-                    WHERE id_aluno = %s AND ativo = TRUE
-                    ORDER BY id_plano DESC
-                    LIMIT 1
-                """, (user_id,))
-                plano = cursor.fetchone()
-                dashboard_data["plano_alimentar"] = plano if plano else {}
-
-                # Todos os treinos
-                cursor.execute("""
-                    SELECT id_treino, nome_treino, objetivo
-                    FROM treinos
-                    WHERE id_aluno = %s AND ativo = TRUE
-                    ORDER BY id_treino DESC
-                """, (user_id,))
-                dashboard_data["treinos"] = cursor.fetchall()
-
-                # Todas as avaliações
-                cursor.execute("""
-                    SELECT id_avaliacao, data_avaliacao, peso, altura, imc, percentual_gordura
-                    FROM avaliacoesfisicas
-                    WHERE id_aluno = %s
-                    ORDER BY data_avaliacao DESC
-                """, (user_id,))
-                dashboard_data["avaliacoes"] = cursor.fetchall()
-
-                # Todos os planos alimentares
-                cursor.execute("""
-                    SELECT id_plano, titulo, descricao_geral, ativo
-                    FROM planosalimentares
-                    WHERE id_aluno = %s
-                    ORDER BY id_plano DESC
-                """, (user_id,))
-                dashboard_data["planos"] = cursor.fetchall()
+                consultas += [
+                    # Agendamentos futuros
+                    ("""
+                        SELECT id_agendamento, tipo_agendamento, data_hora_inicio
+                        FROM agendamentos
+                        WHERE id_aluno = %s AND status = 'marcado' AND data_hora_inicio >= NOW()
+                        ORDER BY data_hora_inicio ASC
+                        LIMIT 5
+                    """, (user_id,)),
+                    # Execuções de treino recentes
+                    ("""
+                        SELECT t.nome_treino, r.data_execucao, r.observacoes
+                        FROM registrostreino r
+                        JOIN treinos t ON r.id_treino = t.id_treino
+                        WHERE r.id_aluno = %s
+                        ORDER BY r.data_execucao DESC
+                        LIMIT 5
+                    """, (user_id,)),
+                    # Todos os treinos
+                    ("""
+                        SELECT id_treino, nome_treino, objetivo
+                        FROM treinos
+                        WHERE id_aluno = %s AND ativo = TRUE
+                        ORDER BY id_treino DESC
+                    """, (user_id,)),
+                    # Todas as avaliações (as recentes saem daqui)
+                    ("""
+                        SELECT id_avaliacao, data_avaliacao, peso, altura, imc, percentual_gordura
+                        FROM avaliacoesfisicas
+                        WHERE id_aluno = %s
+                        ORDER BY data_avaliacao DESC
+                    """, (user_id,)),
+                    # Todos os planos alimentares (o atual sai daqui)
+                    ("""
+                        SELECT id_plano, titulo, descricao_geral, ativo
+                        FROM planosalimentares
+                        WHERE id_aluno = %s
+                        ORDER BY id_plano DESC
+                    """, (user_id,)),
+                ]
 
             # ========================
             # DASHBOARD DO PERSONAL / NUTRICIONISTA
             # ========================
             elif user_tipo in ["personal", "nutricionista"]:
-                # Atendimentos futuros
-                cursor.execute("""
-                    SELECT a.id_agendamento, a.tipo_agendamento, a.data_hora_inicio, u.nome AS aluno
-                    FROM agendamentos a
-                    JOIN usuarios u ON a.id_aluno = u.id_usuario
-                    WHERE a.id_profissional = %s AND a.status = 'marcado' AND a.data_hora_inicio >= NOW()
-                    ORDER BY a.data_hora_inicio ASC
-                    LIMIT 5
-                """, (user_id,))
-                dashboard_data["proximos_atendimentos"] = cursor.fetchall()
-
-                # Total de alunos vinculados
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT id_aluno) AS total
-                    FROM agendamentos
-                    WHERE id_profissional = %s
-                """, (user_id,))
-                resultado = cursor.fetchone()
-                dashboard_data["alunos_vinculados"] = resultado["total"] if resultado else 0
-
-            return jsonify(dashboard_data), 200
+                consultas += [
+                    # Atendimentos futuros
+                    ("""
+                        SELECT a.id_agendamento, a.tipo_agendamento, a.data_hora_inicio, u.nome AS aluno
+                        FROM agendamentos a
+                        JOIN usuarios u ON a.id_aluno = u.id_usuario
+                        WHERE a.id_profissional = %s AND a.status = 'marcado' AND a.data_hora_inicio >= NOW()
+                        ORDER BY a.data_hora_inicio ASC
+                        LIMIT 5
+                    """, (user_id,)),
+                    # Resumo mantido pelas rotas de escrita (app/migracoes/0001_esquema_inicial.sql)
+                    ("""
+                        SELECT alunos_vinculados, sessoes_semana, sessoes_validas_ate, treinos_ativos, planos_ativos
+                        FROM profissional_stats
+                        WHERE id_profissional = %s
+                    """, (user_id,)),
+                ]
+
+            # Tudo numa única ida ao banco
+            resultados = consultas_em_lote(consultas)
+
+            stats = None
+            if user_tipo in ["personal", "nutricionista"] and resultados[0]:
+                # Só volta ao banco se o resumo ainda não existe ou as sessões da semana venceram
+                stats = completar_stats(cursor, user_id, resultados[2][0] if resultados[2] else None)
+
+        if not resultados[0]:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
+
+        perfil = resultados[0][0]
+        dashboard_data = {
+            "perfil": {
+                "id_usuario": perfil["id_usuario"],
+                "nome": perfil["nome"],
+                "email": perfil["email"],
+                "tipo_usuario": perfil["tipo_usuario"]
+            }
+        }
+
+        if user_tipo == "aluno":
+            _, agendamentos, execucoes, treinos, avaliacoes, planos = resultados
+            dashboard_data["proximos_agendamentos"] = agendamentos
+            dashboard_data["avaliacoes_recentes"] = [
+                {campo: a[campo] for campo in ("data_avaliacao", "peso", "percentual_gordura", "imc")}
+                for a in avaliacoes[:3]
+            ]
+            dashboard_data["execucoes_recentes"] = execucoes
+            plano = next((p for p in planos if p["ativo"]), None)
+            dashboard_data["plano_alimentar"] = (
+                {campo: plano[campo] for campo in ("id_plano", "titulo", "descricao_geral")} if plano else {}
+            )
+            dashboard_data["treinos"] = treinos
+            dashboard_data["avaliacoes"] = avaliacoes
+            dashboard_data["planos"] = planos
+
+        elif user_tipo in ["personal", "nutricionista"]:
+            dashboard_data["proximos_atendimentos"] = resultados[1]
+            dashboard_data["alunos_vinculados"] = stats["alunos_vinculados"]
+            dashboard_data["sessoes_semana"] = stats["sessoes_semana"]
+            dashboard_data["treinos_ativos"] = stats["treinos_ativos"]
+            dashboard_data["planos_ativos"] = stats["planos_ativos"]
+
+        # Quando o próximo agendamento começa ele sai da lista: o cache não pode passar disso
+        proximos = dashboard_data.get("proximos_agendamentos") or dashboard_data.get("proximos_atendimentos")
+        cache.guardar(user_id, (versao, dashboard_data), ttl=ttl_ate_proximo(proximos), desde=inicio_calculo)
+        return jsonify(dashboard_data), 200
 
     except Exception as e:
         print("Erro no dashboard:", e)
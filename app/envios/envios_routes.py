@@ -0,0 +1,41 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from flask_cors import cross_origin
+from app.utils.admin import verificar_admin
+from app.utils.jwt import extrair_user_id
+from app.utils.fila_envios import obter_envio
+
+envios_bp = Blueprint("envios", __name__)
+
+# =====================================
+# Consultar situação de um envio enfileirado
+# =====================================
+@envios_bp.route("/<int:id_envio>", methods=["GET"])
+@jwt_required()
+@cross_origin()
+def consultar_envio(id_envio):
+    try:
+        envio = obter_envio(id_envio)
+        if not envio:
+            return jsonify({"message": "Envio não encontrado"}), 404
+
+        id_usuario = extrair_user_id()
+        if not verificar_admin() and id_usuario not in (envio["id_solicitante"], envio["id_usuario"]):
+            return jsonify({"message": "Acesso negado"}), 403
+
+        return jsonify({
+            "id_envio": envio["id_envio"],
+            "canal": envio["canal"],
+            "destino": envio["destino"],
+            "status": envio["status"],
+            "tentativas": envio["tentativas"],
+            "max_tentativas": envio["max_tentativas"],
+            "proxima_tentativa": envio["proxima_tentativa"] if envio["status"] == "pendente" else None,
+            "ultimo_erro": envio["ultimo_erro"],
+            "criado_em": envio["criado_em"],
+            "enviado_em": envio["enviado_em"],
+        }), 200
+
+    except Exception as e:
+        print(f"[ERRO] Falha ao consultar envio {id_envio}: {e}")
+        return jsonify({"message": "Erro ao consultar envio"}), 500
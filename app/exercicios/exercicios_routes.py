@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from app.extensions.db import get_db
 from app.utils.jwt import extrair_user_info
+from app.utils.paginacao import Paginacao
+from app.utils.indice_trigramas import obter_indice_exercicios, indexar_exercicio, remover_exercicio
 
 exercicios_bp = Blueprint("exercicios", __name__)
 
@@ -33,6 +35,10 @@ def criar_exercicio():
             """, (nome, grupo, observacoes, video))
             id_exercicio = cursor.lastrowid
             db.commit()
+            indexar_exercicio({
+                "id_exercicio": id_exercicio, "nome": nome, "grupo_muscular": grupo,
+                "observacoes": observacoes, "video": video
+            })
             return jsonify({
                 "message": "Exercício criado com sucesso",
                 "id_exercicio":id_exercicio
@@ -54,24 +60,37 @@ def listar_exercicios():
     tipo = identidade.get("tipo_usuario")
     user_id = identidade.get("id")
     termo = request.args.get("nome", "")
+    pagina = Paginacao.da_requisicao([
+        ("e.nome", "nome", "ASC"),
+        ("e.id_exercicio", "id_exercicio", "ASC"),
+    ])
+
+    # Typeahead do profissional: responde do índice em memória, se ligado
+    indice = obter_indice_exercicios() if tipo != "aluno" and termo and not pagina.ativa else None
+    if indice is not None:
+        try:
+            return jsonify(indice.buscar(termo, current_app.config.get("BUSCA_EXERCICIOS_LIMITE", 50))), 200
+        except Exception as e:
+            print("Erro ao buscar exercícios no índice:", e)
+            return jsonify({"message": "Erro interno"}), 500
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             if tipo == "aluno":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT DISTINCT e.*
                     FROM exercicios e
                     JOIN treinoexercicios te ON te.id_exercicio = e.id_exercicio
                     JOIN treinos t ON t.id_treino = te.id_treino
-                    WHERE t.id_aluno = %s AND t.ativo = TRUE AND e.nome LIKE %s
+                    WHERE t.id_aluno = %s AND t.ativo = TRUE AND e.nome LIKE %s AND {apos_cursor}
                 """, (user_id, f"%{termo}%"))
             else:
-                cursor.execute("""
-                    SELECT * FROM exercicios
-                    WHERE nome LIKE %s
+                resultado = pagina.executar(cursor, """
+                    SELECT e.* FROM exercicios e
+                    WHERE e.nome LIKE %s AND {apos_cursor}
                 """, (f"%{termo}%",))
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("Erro ao listar exercícios:", e)
         return jsonify({"message": "Erro interno"}), 500
@@ -139,6 +158,10 @@ def editar_exercicio(id):
                 WHERE id_exercicio = %s
             """, (nome, grupo, observacoes, video, id))
             db.commit()
+            indexar_exercicio({
+                "id_exercicio": id, "nome": nome, "grupo_muscular": grupo,
+                "observacoes": observacoes, "video": video
+            })
             return jsonify({"message": "Exercício atualizado"}), 200
     except Exception as e:
         print("Erro ao editar exercício:", e)
@@ -162,6 +185,7 @@ def excluir_exercicio(id):
         with db.cursor() as cursor:
             cursor.execute("DELETE FROM exercicios WHERE id_exercicio = %s", (id,))
             db.commit()
+            remover_exercicio(id)
             return jsonify({"message": "Exercício excluído"}), 200
     except Exception as e:
         print("Erro ao excluir exercício:", e)
@@ -1,19 +1,322 @@
+import os
+import threading
+import time
+
 import pymysql
-from flask import current_app
+from flask import current_app, g
 
-def get_db():
-    config = current_app.config.get('DB_CONFIG', {})
+from app.utils.instrumentacao import CursorInstrumentado, obter_metricas
+from app.utils.metricas import ESPERA_POOL, medir
+from app.utils.rastreamento import span
+
+
+# ===============================
+# Pool de conexões (um por worker)
+# ===============================
+class PoolConexoes:
+    """
+    Pool limitado de conexões PyMySQL.
+
+    - no máximo `tamanho_maximo` conexões abertas (livres + em uso);
+    - ping na retirada: conexões que não respondem são descartadas;
+    - conexões mais velhas que `tempo_vida_maximo` segundos são recicladas;
+    - conexões ociosas há mais de `tempo_ocioso_maximo` segundos são fechadas.
+    """
+
+    def __init__(self, fabrica, tamanho_maximo=10, tempo_vida_maximo=1800,
+                 tempo_ocioso_maximo=300, tempo_espera=10):
+        self.fabrica = fabrica
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_vida_maximo = tempo_vida_maximo
+        self.tempo_ocioso_maximo = tempo_ocioso_maximo
+        self.tempo_espera = tempo_espera
+        self.pid = os.getpid()
+
+        self._livres = []  # (conexao, criada_em, devolvida_em) — a mais recente no fim
+        self._em_uso = 0
+        self._condicao = threading.Condition()
+
+    def obter(self):
+        prazo = time.monotonic() + self.tempo_espera
+        # Só a espera por vaga entra na métrica, não o ping nem a abertura da conexão
+        with medir(ESPERA_POOL):
+            with self._condicao:
+                while True:
+                    ociosas = self._retirar_ociosas()
+                    if self._livres:
+                        conexao, criada_em, _ = self._livres.pop()
+                        break
+                    if self._em_uso < self.tamanho_maximo:
+                        conexao, criada_em = None, None
+                        break
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        raise RuntimeError("Pool de conexões esgotado: nenhuma conexão livre com o banco de dados.")
+                    self._condicao.wait(restante)
+                self._em_uso += 1
+
+        for antiga in ociosas:
+            self._fechar(antiga)
+
+        try:
+            if conexao is not None and (self._expirada(criada_em) or not self._responde(conexao)):
+                self._fechar(conexao)
+                conexao = None
+            if conexao is None:
+                conexao = self.fabrica()
+                criada_em = time.monotonic()
+        except Exception:
+            with self._condicao:
+                self._em_uso -= 1
+                self._condicao.notify()
+            raise
+
+        return ConexaoPool(self, conexao, criada_em)
+
+    def devolver(self, conexao, criada_em):
+        descartar = self._expirada(criada_em) or not conexao.open
+        if not descartar:
+            try:
+                # Nunca devolve transação aberta (nem snapshot de leitura) para o próximo uso
+                conexao.rollback()
+            except Exception:
+                descartar = True
+
+        with self._condicao:
+            self._em_uso -= 1
+            if not descartar:
+                self._livres.append((conexao, criada_em, time.monotonic()))
+            self._condicao.notify()
+
+        if descartar:
+            self._fechar(conexao)
+
+    def fechar_todas(self):
+        with self._condicao:
+            livres, self._livres = self._livres, []
+        for conexao, _, _ in livres:
+            self._fechar(conexao)
+
+    def estatisticas(self):
+        with self._condicao:
+            return {"livres": len(self._livres), "em_uso": self._em_uso, "maximo": self.tamanho_maximo}
+
+    def _retirar_ociosas(self):
+        # Chamado com o lock adquirido; as mais antigas ficam no início da lista
+        limite = time.monotonic() - self.tempo_ocioso_maximo
+        ociosas = []
+        while self._livres and self._livres[0][2] < limite:
+            ociosas.append(self._livres.pop(0)[0])
+        return ociosas
+
+    def _expirada(self, criada_em):
+        return time.monotonic() - criada_em > self.tempo_vida_maximo
+
+    @staticmethod
+    def _responde(conexao):
+        try:
+            conexao.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar(conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+
+
+class ConexaoPool:
+    """Conexão emprestada do pool; `close()` devolve ao pool em vez de encerrar o socket."""
+
+    def __init__(self, pool, conexao, criada_em):
+        self._pool = pool
+        self._conexao = conexao
+        self._criada_em = criada_em
+
+    def close(self):
+        conexao, self._conexao = self._conexao, None
+        if conexao is not None:
+            self._pool.devolver(conexao, self._criada_em)
+
+    @property
+    def open(self):
+        return self._conexao is not None and self._conexao.open
+
+    def __getattr__(self, nome):
+        if self._conexao is None:
+            raise pymysql.err.InterfaceError("Conexão já devolvida ao pool")
+        return getattr(self._conexao, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessaoDB(ConexaoPool):
+    """Conexão compartilhada por todo o app context; só é liberada em `encerrar()`."""
+
+    def __init__(self, conexao_pool):
+        super().__init__(conexao_pool._pool, conexao_pool._conexao, conexao_pool._criada_em)
+
+    def close(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+    def cursor(self, *args):
+        """Cursor da conexão; com SQL_INSTRUMENTACAO_ATIVA, medido (ver app/utils/instrumentacao.py)."""
+        return _instrumentar(super().__getattr__("cursor")(*args))
+
+    def encerrar(self, confirmar=True):
+        if self._conexao is None:
+            return
+        try:
+            if confirmar:
+                self._conexao.commit()
+            else:
+                self._conexao.rollback()
+        except Exception as e:
+            print(f"[ERRO] Falha ao encerrar sessão do banco: {e}")
+        finally:
+            ConexaoPool.close(self)
+
+
+def _instrumentar(cursor):
+    metricas = obter_metricas()
+    return cursor if metricas is None else CursorInstrumentado(cursor, metricas)
+
+
+_pool_lock = threading.Lock()
+
+
+def _abrir_conexao(config, multi_statements=False):
     try:
-        conn = pymysql.connect(
+        return pymysql.connect(
             host=config.get('host', 'localhost'),
             user=config.get('user', 'root'),
             password=config.get('password', ''),
             database=config.get('database', ''),
             port=int(config.get('port', 3306)),
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=pymysql.cursors.DictCursor,
+            # Várias consultas num só round trip: só nas conexões do pool de lote
+            client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS if multi_statements else 0
         )
-        return conn
     except pymysql.MySQLError as e:
         db_name = config.get('database', 'desconhecido')
         print(f"[ERRO] Falha ao conectar ao banco '{db_name}': {e}")
         raise RuntimeError(f"Erro ao conectar ao banco de dados '{db_name}'. Verifique a configuração e se o banco está acessível.")
+
+
+def _obter_pool(app, chave, tamanho_maximo, multi_statements=False):
+    pool = app.extensions.get(chave)
+    # Após o fork do gunicorn cada worker cria o seu próprio pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pool_lock:
+        pool = app.extensions.get(chave)
+        if pool is None or pool.pid != os.getpid():
+            config = dict(app.config.get('DB_CONFIG', {}))
+            pool = PoolConexoes(
+                fabrica=lambda: _abrir_conexao(config, multi_statements),
+                tamanho_maximo=tamanho_maximo,
+                tempo_vida_maximo=app.config.get("DB_POOL_TEMPO_VIDA", 1800),
+                tempo_ocioso_maximo=app.config.get("DB_POOL_TEMPO_OCIOSO", 300),
+                tempo_espera=app.config.get("DB_POOL_TEMPO_ESPERA", 10),
+            )
+            app.extensions[chave] = pool
+        return pool
+
+
+def obter_pool(app=None):
+    app = app or current_app._get_current_object()
+    return _obter_pool(app, "db_pool", app.config.get("DB_POOL_TAMANHO", 10))
+
+
+def obter_pool_lote(app=None):
+    """
+    Pool à parte, com CLIENT.MULTI_STATEMENTS, usado só por consultas_em_lote.
+    As conexões de get_db() não aceitam comandos empilhados: uma injeção de
+    SQL em qualquer rota não vira `; DROP ...`.
+    """
+    app = app or current_app._get_current_object()
+    return _obter_pool(app, "db_pool_lote", app.config.get("DB_POOL_LOTE_TAMANHO", 3), multi_statements=True)
+
+
+def get_db():
+    """
+    Sessão de banco da requisição (ou do app context) atual.
+
+    Todas as chamadas dentro do mesmo contexto — verificação do JWT, handler
+    e helpers de log — compartilham a mesma conexão. `close()` na sessão não
+    faz nada: a conexão é confirmada (ou desfeita) e devolvida ao pool no
+    teardown do app context.
+    """
+    sessao = g.get("_sessao_db")
+    if sessao is None:
+        with span("db.conexao"):
+            sessao = SessaoDB(obter_pool().obter())
+        g._sessao_db = sessao
+    return sessao
+
+
+def marcar_falha_sessao(response):
+    if response.status_code >= 500:
+        g._sessao_db_falhou = True
+    return response
+
+
+def encerrar_sessao_db(exc=None):
+    sessao = g.pop("_sessao_db", None)
+    falhou = g.pop("_sessao_db_falhou", False)
+    if sessao is not None:
+        sessao.encerrar(confirmar=exc is None and not falhou)
+
+
+def consultas_em_lote(consultas):
+    """
+    Executa várias consultas de leitura numa única ida ao banco.
+
+    `consultas` é uma lista de (sql, params). Os parâmetros são escapados pelo
+    próprio cursor (mogrify) e as consultas seguem juntas como multi-statement,
+    numa conexão do pool de lote (obter_pool_lote), não na sessão da
+    requisição: só enxergam o que já foi confirmado no banco.
+    Retorna o fetchall() de cada uma, na mesma ordem.
+    """
+    with span("db.conexao", lote=True):
+        conexao = obter_pool_lote().obter()
+    with conexao, _instrumentar(conexao.cursor()) as cursor:
+        sql = ";\n".join(cursor.mogrify(consulta.strip().rstrip(";"), params) for consulta, params in consultas)
+        cursor.execute(sql)
+        resultados = [cursor.fetchall()]
+        while cursor.nextset():
+            resultados.append(cursor.fetchall())
+    return resultados
+
+
+def inserir_em_lote(cursor, tabela, colunas, linhas):
+    """
+    Insere várias linhas com um único INSERT ... VALUES (...), (...).
+
+    O executemany do PyMySQL reescreve o INSERT como multi-row (quebrando em
+    comandos de até ~1 MB), então salvar N filhos custa uma ida ao banco em vez
+    de N. Dentro de um mesmo comando os ids gerados são crescentes, na ordem de
+    `linhas`. Retorna quantas linhas foram inseridas.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return 0
+    marcadores = ", ".join(["%s"] * len(colunas))
+    cursor.executemany(f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({marcadores})", linhas)
+    return len(linhas)
+
+
+def init_db(app):
+    app.after_request(marcar_falha_sessao)
+    app.teardown_appcontext(encerrar_sessao_db)
@@ -1,3 +1,125 @@
+import os
+import smtplib
+import threading
+import time
+
+from flask import current_app
 from flask_mail import Mail
 
+from app.utils.metricas import DURACAO_ENVIO, FALHAS_ENVIO, medir
+from app.utils.rastreamento import CLIENTE, span
+
 mail = Mail()
+
+
+# ===============================
+# Conexão SMTP persistente
+# ===============================
+class MailerPersistente:
+    """
+    Reaproveita uma sessão SMTP já autenticada (uma por thread) entre envios.
+
+    `mail.send()` abre conexão, STARTTLS e login a cada mensagem; aqui a
+    conexão do Flask-Mail fica aberta e é reutilizada. Se ficou ociosa por
+    mais de `tempo_ocioso_maximo` segundos, um NOOP confirma que o servidor
+    ainda está lá antes do próximo envio. Queda de conexão durante o envio
+    gera uma reconexão e uma nova tentativa.
+
+    Toda operação no socket tem `timeout` segundos (o Flask-Mail não define
+    nenhum): um servidor travado vira erro em vez de prender o envio.
+    """
+
+    ERROS_CONEXAO = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+    def __init__(self, mail_ext=None, tempo_ocioso_maximo=60, timeout=30):
+        self.mail_ext = mail_ext or mail
+        self.tempo_ocioso_maximo = tempo_ocioso_maximo
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._local = threading.local()
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        ultimo_uso = getattr(self._local, "ultimo_uso", 0)
+        if conexao is not None and time.monotonic() - ultimo_uso > self.tempo_ocioso_maximo:
+            if not self._responde(conexao):
+                self.fechar()
+                conexao = None
+        if conexao is None:
+            with span("smtp.conectar", CLIENTE):
+                conexao = self.mail_ext.connect()
+                conexao.configure_host = lambda: self._abrir_host(conexao.mail)
+                conexao.__enter__()  # abre o socket, STARTTLS e login
+            self._local.conexao = conexao
+        return conexao
+
+    def _abrir_host(self, config):
+        # Mesmo que Connection.configure_host do Flask-Mail, mas com timeout
+        classe = smtplib.SMTP_SSL if config.use_ssl else smtplib.SMTP
+        host = classe(config.server, config.port, timeout=self.timeout)
+        host.set_debuglevel(int(config.debug))
+        if config.use_tls:
+            host.starttls()
+        if config.username and config.password:
+            host.login(config.username, config.password)
+        return host
+
+    @staticmethod
+    def _responde(conexao):
+        if conexao.host is None:
+            return True
+        try:
+            return conexao.host.noop()[0] == 250
+        except Exception:
+            return False
+
+    def enviar(self, msg):
+        with medir(DURACAO_ENVIO, FALHAS_ENVIO, canal="email"), \
+                span("smtp.enviar", CLIENTE, destinatarios=len(msg.send_to)):
+            try:
+                self._conexao().send(msg)
+            except self.ERROS_CONEXAO:
+                # Servidor derrubou a sessão: reconecta e tenta mais uma vez
+                self.fechar()
+                self._conexao().send(msg)
+        self._local.ultimo_uso = time.monotonic()
+
+    def enviar_lote(self, mensagens):
+        """Envia todas pela mesma sessão. Retorna, na mesma ordem, None ou a mensagem de erro."""
+        erros = []
+        for msg in mensagens:
+            try:
+                self.enviar(msg)
+                erros.append(None)
+            except Exception as e:
+                erros.append(str(e))
+        return erros
+
+    def fechar(self):
+        conexao = getattr(self._local, "conexao", None)
+        self._local.conexao = None
+        if conexao is not None and conexao.host is not None:
+            try:
+                conexao.host.quit()
+            except Exception:
+                conexao.host.close()
+
+
+_mailer_lock = threading.Lock()
+
+
+def obter_mailer(app=None):
+    app = app or current_app._get_current_object()
+    mailer = app.extensions.get("mailer")
+    if mailer is not None and mailer.pid == os.getpid():
+        return mailer
+
+    with _mailer_lock:
+        mailer = app.extensions.get("mailer")
+        if mailer is None or mailer.pid != os.getpid():
+            mailer = MailerPersistente(
+                tempo_ocioso_maximo=app.config.get("MAIL_TEMPO_OCIOSO", 60),
+                timeout=app.config.get("MAIL_TIMEOUT", 30),
+            )
+            app.extensions["mailer"] = mailer
+        return mailer
@@ -0,0 +1,257 @@
+-- Esquema completo, com os índices de que as consultas das rotas dependem.
+-- Aplicado por `flask db upgrade`; em bancos que já existiam antes das
+-- migrações os CREATE TABLE IF NOT EXISTS não fazem nada e a 0002 completa
+-- colunas e índices que faltarem.
+--
+-- Chaves estrangeiras só entre pai e filhos que ele possui (apagar o treino
+-- apaga seus exercícios). Usuários são desativados, não apagados, e um
+-- exercício excluído não leva junto o histórico de cargas.
+
+-- O FULLTEXT de usuarios.nome_busca usa o parser ngram; com stopwords ele
+-- descartaria todo bigrama que contivesse "a", "e", "o"...
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id_usuario INT AUTO_INCREMENT PRIMARY KEY,
+    nome VARCHAR(255) NOT NULL,
+    -- Nome normalizado (minúsculas, sem acento) usado pela busca de alunos
+    nome_busca VARCHAR(255) NOT NULL DEFAULT '',
+    email VARCHAR(255) NOT NULL,
+    senha_hash VARCHAR(255) NOT NULL,
+    tipo_usuario VARCHAR(20) NOT NULL,
+    cpf VARCHAR(14) NULL,
+    telefone VARCHAR(20) NULL,
+    whatsapp VARCHAR(20) NULL,
+    data_nascimento DATE NULL,
+    genero VARCHAR(20) NULL,
+    endereco VARCHAR(255) NULL,
+    cref VARCHAR(50) NULL,
+    crn VARCHAR(50) NULL,
+    foto_perfil VARCHAR(255) NULL,
+    perfil_completo BOOLEAN NOT NULL DEFAULT TRUE,
+    ativo BOOLEAN NOT NULL DEFAULT TRUE,
+    criado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE INDEX uq_usuarios_email (email),
+    UNIQUE INDEX uq_usuarios_cpf (cpf),
+    -- Listagens por tipo (admin, selects de alunos) já ordenadas por nome
+    INDEX idx_usuarios_tipo_nome (tipo_usuario, nome),
+    -- Prefixo do typeahead (nome_busca LIKE 'j%') restrito a alunos ativos
+    INDEX idx_usuarios_nome_busca (tipo_usuario, ativo, nome_busca),
+    FULLTEXT INDEX ft_usuarios_nome_busca (nome_busca) WITH PARSER ngram
+);
+
+CREATE TABLE IF NOT EXISTS exercicios (
+    id_exercicio INT AUTO_INCREMENT PRIMARY KEY,
+    nome VARCHAR(255) NOT NULL,
+    grupo_muscular VARCHAR(100) NULL,
+    observacoes TEXT NULL,
+    video VARCHAR(255) NULL,
+    INDEX idx_exercicios_nome (nome)
+);
+
+CREATE TABLE IF NOT EXISTS treinos (
+    id_treino INT AUTO_INCREMENT PRIMARY KEY,
+    id_aluno INT NOT NULL,
+    id_profissional INT NOT NULL,
+    nome_treino VARCHAR(255) NOT NULL,
+    objetivo VARCHAR(255) NULL,
+    ativo BOOLEAN NOT NULL DEFAULT TRUE,
+    data_criacao DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_treinos_aluno_ativo (id_aluno, ativo),
+    INDEX idx_treinos_profissional_ativo (id_profissional, ativo)
+);
+
+CREATE TABLE IF NOT EXISTS treinoexercicios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    id_treino INT NOT NULL,
+    id_exercicio INT NOT NULL,
+    series INT NULL,
+    repeticoes VARCHAR(50) NULL,
+    observacoes TEXT NULL,
+    INDEX idx_treinoexercicios_treino (id_treino),
+    INDEX idx_treinoexercicios_exercicio (id_exercicio, id_treino),
+    CONSTRAINT fk_treinoexercicios_treino FOREIGN KEY (id_treino)
+        REFERENCES treinos (id_treino) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS registrostreino (
+    id_registro INT AUTO_INCREMENT PRIMARY KEY,
+    id_aluno INT NOT NULL,
+    id_treino INT NOT NULL,
+    observacoes TEXT NULL,
+    data_execucao DATETIME NOT NULL,
+    ativo BOOLEAN NOT NULL DEFAULT TRUE,
+    -- Histórico do aluno: WHERE id_aluno = ? AND ativo = TRUE ORDER BY data_execucao DESC
+    INDEX idx_registrostreino_aluno_ativo_data (id_aluno, ativo, data_execucao),
+    INDEX idx_registrostreino_treino (id_treino)
+);
+
+CREATE TABLE IF NOT EXISTS registrostreino_exercicios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    id_registro INT NOT NULL,
+    id_exercicio INT NOT NULL,
+    carga DECIMAL(6,2) NULL,
+    INDEX idx_registrostreino_exercicios_registro (id_registro),
+    -- Evolução de carga por exercício sem voltar à tabela para achar o registro
+    INDEX idx_registrostreino_exercicios_exercicio (id_exercicio, id_registro),
+    CONSTRAINT fk_registrostreino_exercicios_registro FOREIGN KEY (id_registro)
+        REFERENCES registrostreino (id_registro) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS avaliacoesfisicas (
+    id_avaliacao INT AUTO_INCREMENT PRIMARY KEY,
+    id_aluno INT NOT NULL,
+    id_profissional INT NOT NULL,
+    data_avaliacao DATE NOT NULL,
+    peso DECIMAL(6,2) NULL,
+    altura DECIMAL(4,2) NULL,
+    idade INT NULL,
+    imc DECIMAL(5,2) NULL,
+    percentual_gordura DECIMAL(5,2) NULL,
+    massa_gorda DECIMAL(6,2) NULL,
+    massa_magra DECIMAL(6,2) NULL,
+    pescoco DECIMAL(5,2) NULL,
+    ombro DECIMAL(5,2) NULL,
+    torax DECIMAL(5,2) NULL,
+    cintura DECIMAL(5,2) NULL,
+    abdomen DECIMAL(5,2) NULL,
+    quadril DECIMAL(5,2) NULL,
+    braco_direito DECIMAL(5,2) NULL,
+    braco_esquerdo DECIMAL(5,2) NULL,
+    braco_d_contraido DECIMAL(5,2) NULL,
+    braco_e_contraido DECIMAL(5,2) NULL,
+    antebraco_direito DECIMAL(5,2) NULL,
+    antebraco_esquerdo DECIMAL(5,2) NULL,
+    coxa_direita DECIMAL(5,2) NULL,
+    coxa_esquerda DECIMAL(5,2) NULL,
+    panturrilha_direita DECIMAL(5,2) NULL,
+    panturrilha_esquerda DECIMAL(5,2) NULL,
+    dobra_peitoral DECIMAL(5,2) NULL,
+    dobra_triceps DECIMAL(5,2) NULL,
+    dobra_subescapular DECIMAL(5,2) NULL,
+    dobra_biceps DECIMAL(5,2) NULL,
+    dobra_axilar_media DECIMAL(5,2) NULL,
+    dobra_supra_iliaca DECIMAL(5,2) NULL,
+    observacoes TEXT NULL,
+    INDEX idx_avaliacoesfisicas_aluno_data (id_aluno, data_avaliacao),
+    INDEX idx_avaliacoesfisicas_profissional_data (id_profissional, data_avaliacao)
+);
+
+CREATE TABLE IF NOT EXISTS planosalimentares (
+    id_plano INT AUTO_INCREMENT PRIMARY KEY,
+    id_aluno INT NOT NULL,
+    id_nutricionista INT NOT NULL,
+    titulo VARCHAR(255) NULL,
+    descricao_geral TEXT NULL,
+    ativo BOOLEAN NOT NULL DEFAULT TRUE,
+    data_criacao DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_planosalimentares_aluno_ativo (id_aluno, ativo),
+    INDEX idx_planosalimentares_nutricionista_ativo (id_nutricionista, ativo)
+);
+
+CREATE TABLE IF NOT EXISTS refeicoes (
+    id_refeicao INT AUTO_INCREMENT PRIMARY KEY,
+    id_plano INT NOT NULL,
+    titulo VARCHAR(255) NOT NULL,
+    calorias_estimadas INT NULL,
+    INDEX idx_refeicoes_plano (id_plano),
+    CONSTRAINT fk_refeicoes_plano FOREIGN KEY (id_plano)
+        REFERENCES planosalimentares (id_plano) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS alimentos (
+    id_alimento INT AUTO_INCREMENT PRIMARY KEY,
+    id_refeicao INT NOT NULL,
+    nome VARCHAR(255) NOT NULL,
+    peso VARCHAR(50) NULL,
+    INDEX idx_alimentos_refeicao (id_refeicao),
+    CONSTRAINT fk_alimentos_refeicao FOREIGN KEY (id_refeicao)
+        REFERENCES refeicoes (id_refeicao) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS agendamentos (
+    id_agendamento INT AUTO_INCREMENT PRIMARY KEY,
+    id_aluno INT NOT NULL,
+    id_profissional INT NOT NULL,
+    tipo_agendamento VARCHAR(50) NOT NULL,
+    data_hora_inicio DATETIME NOT NULL,
+    data_hora_fim DATETIME NOT NULL,
+    observacoes TEXT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'marcado',
+    -- Agenda e conflito de horário: WHERE id_profissional = ? AND status = 'marcado' AND data_hora_inicio ...
+    INDEX idx_agendamentos_profissional_status_inicio (id_profissional, status, data_hora_inicio),
+    INDEX idx_agendamentos_aluno_status_inicio (id_aluno, status, data_hora_inicio),
+    -- Sessões da semana por faixa de data (app/utils/stats_profissional.py)
+    INDEX idx_agendamentos_profissional_inicio (id_profissional, data_hora_inicio)
+);
+
+CREATE TABLE IF NOT EXISTS tokensrevogados (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    jti VARCHAR(64) NOT NULL,
+    -- exp do token, para a limpeza da tabela (`flask tokens purgar`)
+    expira_em DATETIME NULL,
+    UNIQUE INDEX uq_tokensrevogados_jti (jti),
+    INDEX idx_tokensrevogados_expira_em (expira_em)
+);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id_log INT AUTO_INCREMENT PRIMARY KEY,
+    tipo_log VARCHAR(20) NOT NULL,
+    -- Envios (e-mail / WhatsApp)
+    id_usuario INT NULL,
+    tipo_envio VARCHAR(20) NULL,
+    destino VARCHAR(255) NULL,
+    conteudo TEXT NULL,
+    status VARCHAR(20) NULL,
+    data_envio DATETIME NULL,
+    -- Ações administrativas
+    usuario VARCHAR(255) NULL,
+    usuario_origem VARCHAR(255) NULL,
+    acao VARCHAR(255) NULL,
+    detalhes TEXT NULL,
+    data DATETIME NULL,
+    INDEX idx_logs_tipo_data (tipo_log, data),
+    INDEX idx_logs_tipo_data_envio (tipo_log, data_envio)
+);
+
+-- Fila persistente de envios consumida por app/utils/fila_envios.py
+-- Requer MySQL 8.0+ (SELECT ... FOR UPDATE SKIP LOCKED)
+CREATE TABLE IF NOT EXISTS filaenvios (
+    id_envio BIGINT AUTO_INCREMENT PRIMARY KEY,
+    canal ENUM('email', 'whatsapp') NOT NULL,
+    id_usuario INT NULL,
+    id_solicitante INT NULL,
+    destino VARCHAR(255) NOT NULL,
+    assunto VARCHAR(255) NULL,
+    conteudo TEXT NOT NULL,
+    descricao_log VARCHAR(255) NULL,
+    anexo_nome VARCHAR(255) NULL,
+    anexo LONGBLOB NULL,
+    status ENUM('pendente', 'processando', 'enviado', 'falhou') NOT NULL DEFAULT 'pendente',
+    tentativas INT NOT NULL DEFAULT 0,
+    max_tentativas INT NOT NULL DEFAULT 5,
+    proxima_tentativa DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ultimo_erro TEXT NULL,
+    criado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    enviado_em DATETIME NULL,
+    INDEX idx_filaenvios_status_proxima (status, proxima_tentativa)
+);
+
+-- Resumo por profissional lido pelo dashboard (mantido por app/utils/stats_profissional.py)
+CREATE TABLE IF NOT EXISTS profissional_stats (
+    id_profissional INT PRIMARY KEY,
+    alunos_vinculados INT NOT NULL DEFAULT 0,
+    sessoes_semana INT NOT NULL DEFAULT 0,
+    -- sessoes_semana vale até a próxima sessão começar ou a semana virar; NULL = recalcular
+    sessoes_validas_ate DATETIME NULL,
+    treinos_ativos INT NOT NULL DEFAULT 0,
+    planos_ativos INT NOT NULL DEFAULT 0,
+    atualizado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Alunos distintos já atendidos por cada profissional (alunos_vinculados = linhas por profissional)
+CREATE TABLE IF NOT EXISTS profissional_alunos (
+    id_profissional INT NOT NULL,
+    id_aluno INT NOT NULL,
+    PRIMARY KEY (id_profissional, id_aluno)
+);
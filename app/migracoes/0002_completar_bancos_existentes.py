@@ -0,0 +1,101 @@
+# Bancos criados antes das migrações: a 0001 não altera tabelas que já
+# existiam, então aqui entram as colunas e os índices que lhes faltarem (o
+# que antes ficava nos scripts avulsos de sql/) e as cargas iniciais. Num
+# banco novo, criado pela 0001, nada disso encontra o que fazer.
+#
+# As cargas ficam copiadas aqui, congeladas como eram nesta versão: mudanças
+# futuras em app/utils/texto.py ou stats_profissional.py não podem mudar o
+# que esta migração faz.
+
+import re
+import unicodedata
+
+from app.utils.migracoes import adicionar_coluna, adicionar_indice
+
+COLUNAS = [
+    ("usuarios", "nome_busca", "VARCHAR(255) NOT NULL DEFAULT '' AFTER nome"),
+    ("tokensrevogados", "expira_em", "DATETIME NULL"),
+    ("logs", "usuario", "VARCHAR(255) NULL"),
+]
+
+INDICES = [
+    ("usuarios", "idx_usuarios_tipo_nome", "(tipo_usuario, nome)", "INDEX"),
+    ("usuarios", "idx_usuarios_nome_busca", "(tipo_usuario, ativo, nome_busca)", "INDEX"),
+    ("usuarios", "ft_usuarios_nome_busca", "(nome_busca) WITH PARSER ngram", "FULLTEXT INDEX"),
+    ("exercicios", "idx_exercicios_nome", "(nome)", "INDEX"),
+    ("treinos", "idx_treinos_aluno_ativo", "(id_aluno, ativo)", "INDEX"),
+    ("treinos", "idx_treinos_profissional_ativo", "(id_profissional, ativo)", "INDEX"),
+    ("treinoexercicios", "idx_treinoexercicios_treino", "(id_treino)", "INDEX"),
+    ("treinoexercicios", "idx_treinoexercicios_exercicio", "(id_exercicio, id_treino)", "INDEX"),
+    ("registrostreino", "idx_registrostreino_aluno_ativo_data", "(id_aluno, ativo, data_execucao)", "INDEX"),
+    ("registrostreino", "idx_registrostreino_treino", "(id_treino)", "INDEX"),
+    ("registrostreino_exercicios", "idx_registrostreino_exercicios_registro", "(id_registro)", "INDEX"),
+    ("registrostreino_exercicios", "idx_registrostreino_exercicios_exercicio", "(id_exercicio, id_registro)", "INDEX"),
+    ("avaliacoesfisicas", "idx_avaliacoesfisicas_aluno_data", "(id_aluno, data_avaliacao)", "INDEX"),
+    ("avaliacoesfisicas", "idx_avaliacoesfisicas_profissional_data", "(id_profissional, data_avaliacao)", "INDEX"),
+    ("planosalimentares", "idx_planosalimentares_aluno_ativo", "(id_aluno, ativo)", "INDEX"),
+    ("planosalimentares", "idx_planosalimentares_nutricionista_ativo", "(id_nutricionista, ativo)", "INDEX"),
+    ("refeicoes", "idx_refeicoes_plano", "(id_plano)", "INDEX"),
+    ("alimentos", "idx_alimentos_refeicao", "(id_refeicao)", "INDEX"),
+    ("agendamentos", "idx_agendamentos_profissional_status_inicio", "(id_profissional, status, data_hora_inicio)", "INDEX"),
+    ("agendamentos", "idx_agendamentos_aluno_status_inicio", "(id_aluno, status, data_hora_inicio)", "INDEX"),
+    ("agendamentos", "idx_agendamentos_profissional_inicio", "(id_profissional, data_hora_inicio)", "INDEX"),
+    ("tokensrevogados", "uq_tokensrevogados_jti", "(jti)", "UNIQUE INDEX"),
+    ("tokensrevogados", "idx_tokensrevogados_expira_em", "(expira_em)", "INDEX"),
+    ("logs", "idx_logs_tipo_data", "(tipo_log, data)", "INDEX"),
+    ("logs", "idx_logs_tipo_data_envio", "(tipo_log, data_envio)", "INDEX"),
+]
+
+
+def aplicar(cursor):
+    for tabela, coluna, definicao in COLUNAS:
+        adicionar_coluna(cursor, tabela, coluna, definicao)
+
+    cursor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    for tabela, indice, colunas, tipo in INDICES:
+        adicionar_indice(cursor, tabela, indice, colunas, tipo)
+
+    # Nenhum token revogado antes de agora vive mais que a validade máxima do JWT
+    cursor.execute("UPDATE tokensrevogados SET expira_em = NOW() + INTERVAL 1 DAY WHERE expira_em IS NULL")
+    preencher_nome_busca(cursor)
+    carregar_stats_profissionais(cursor)
+
+
+def normalizar_nome(nome):
+    """Minúsculas, sem acento e só letras/dígitos: 'João  D'Ávila' -> 'joao d avila'."""
+    if not nome:
+        return ""
+    sem_acento = "".join(c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", sem_acento.lower()).split())
+
+
+def preencher_nome_busca(cursor):
+    cursor.execute("SELECT id_usuario, nome, nome_busca FROM usuarios")
+    pendentes = [
+        (normalizar_nome(linha["nome"]), linha["id_usuario"])
+        for linha in cursor.fetchall()
+        if normalizar_nome(linha["nome"]) != linha["nome_busca"]
+    ]
+    if pendentes:
+        cursor.executemany("UPDATE usuarios SET nome_busca = %s WHERE id_usuario = %s", pendentes)
+
+
+def carregar_stats_profissionais(cursor):
+    cursor.execute("""
+        INSERT IGNORE INTO profissional_alunos (id_profissional, id_aluno)
+        SELECT DISTINCT id_profissional, id_aluno FROM agendamentos
+    """)
+    cursor.execute("""
+        INSERT INTO profissional_stats (id_profissional, alunos_vinculados, treinos_ativos, planos_ativos)
+        SELECT u.id_usuario,
+               (SELECT COUNT(*) FROM profissional_alunos pa WHERE pa.id_profissional = u.id_usuario),
+               (SELECT COUNT(*) FROM treinos t WHERE t.id_profissional = u.id_usuario AND t.ativo = TRUE),
+               (SELECT COUNT(*) FROM planosalimentares p WHERE p.id_nutricionista = u.id_usuario AND p.ativo = TRUE)
+        FROM usuarios u
+        WHERE u.tipo_usuario IN ('personal', 'nutricionista')
+        ON DUPLICATE KEY UPDATE
+            alunos_vinculados = VALUES(alunos_vinculados),
+            treinos_ativos = VALUES(treinos_ativos),
+            planos_ativos = VALUES(planos_ativos),
+            sessoes_validas_ate = NULL
+    """)
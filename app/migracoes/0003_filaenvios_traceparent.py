@@ -0,0 +1,8 @@
+# Trace da requisição que enfileirou o envio (header W3C traceparent), para
+# a entrega feita pelo despachante aparecer ligada a ela (app/utils/rastreamento.py)
+
+from app.utils.migracoes import adicionar_coluna
+
+
+def aplicar(cursor):
+    adicionar_coluna(cursor, "filaenvios", "traceparent", "VARCHAR(55) NULL")
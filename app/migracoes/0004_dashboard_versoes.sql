@@ -0,0 +1,6 @@
+-- Versão do dashboard de cada usuário: invalidar_dashboard incrementa e os
+-- workers comparam antes de servir o que têm em cache (app/utils/cache.py)
+CREATE TABLE IF NOT EXISTS dashboard_versoes (
+    id_usuario INT PRIMARY KEY,
+    versao INT NOT NULL DEFAULT 0
+);
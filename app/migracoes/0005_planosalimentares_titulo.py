@@ -0,0 +1,10 @@
+# Título e descrição do plano, lidos pelo dashboard do aluno e que faltavam
+# na 0001. Bancos criados por ela ficaram sem as colunas; nos anteriores às
+# migrações elas podem já existir.
+
+from app.utils.migracoes import adicionar_coluna
+
+
+def aplicar(cursor):
+    adicionar_coluna(cursor, "planosalimentares", "titulo", "VARCHAR(255) NULL AFTER id_nutricionista")
+    adicionar_coluna(cursor, "planosalimentares", "descricao_geral", "TEXT NULL AFTER titulo")
@@ -1,18 +1,19 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.utils.logs import registrar_log_envio
-from app.extensions.db import get_db
-from app.utils.jwt import extrair_user_info
+from app.extensions.db import get_db, consultas_em_lote, inserir_em_lote
+from app.utils.jwt import extrair_user_info, extrair_user_id
+from app.utils.fila_envios import enfileirar_envio
+from app.utils.cache import invalidar_dashboard
+from app.utils.stats_profissional import ajustar_contador
+from app.utils.paginacao import Paginacao
+from app.utils.busca_alunos import buscar_alunos
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.colors import Color
-from io import BytesIO
-from app.extensions.mail import mail
-from flask_mail import Message
-import os, requests
+from app.utils.pdf_base import DocumentoPDF
+from app.utils.pdf_cache import responder_pdf
+from app.utils.rastreamento import rastrear
+import os
 
 
 planos_bp = Blueprint("planos", __name__)
@@ -34,16 +35,40 @@ def buscar_aluno_por_nome():
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("""
-                SELECT id_usuario, nome, cpf, email, whatsapp
-                FROM usuarios
-                WHERE tipo_usuario = 'aluno' AND nome LIKE %s AND ativo = TRUE
-            """, (f"%{nome}%",))
-            return jsonify(cursor.fetchall()), 200
+            alunos = buscar_alunos(cursor, nome, ("id_usuario", "nome", "cpf", "email", "whatsapp"))
+            return jsonify(alunos), 200
     except Exception as e:
         return jsonify({"message": f"Erro ao buscar aluno: {str(e)}"}), 500
 
 
+# --------------------------------------------------
+# Gravar refeições e alimentos de um plano (em lote)
+# --------------------------------------------------
+def salvar_refeicoes(cursor, id_plano, refeicoes):
+    """
+    Insere as refeições e todos os alimentos com um INSERT multi-row cada,
+    em vez de um comando por linha. O plano não pode ter outras refeições
+    (plano novo ou recém-limpo): os ids gerados são relidos em ordem para
+    ligar cada alimento à sua refeição.
+    """
+    inserir_em_lote(cursor, "refeicoes", ("id_plano", "titulo", "calorias_estimadas"), [
+        (id_plano, r["titulo"], r["calorias_estimadas"]) for r in refeicoes
+    ])
+    cursor.execute("SELECT id_refeicao FROM refeicoes WHERE id_plano=%s ORDER BY id_refeicao", (id_plano,))
+    ids_refeicoes = [linha["id_refeicao"] for linha in cursor.fetchall()]
+
+    alimentos = []
+    for id_refeicao, r in zip(ids_refeicoes, refeicoes):
+        for alimento in r.get("alimentos", []):
+            nome = str(alimento.get("nome", "")).strip()
+            peso = str(alimento.get("peso", "")).strip()
+
+            if not nome or not peso:
+                continue
+            alimentos.append((id_refeicao, nome, peso))
+
+    inserir_em_lote(cursor, "alimentos", ("id_refeicao", "nome", "peso"), alimentos)
+
 # --------------------------------------------------
 # Criar plano alimentar
 # --------------------------------------------------
@@ -80,26 +105,11 @@ def criar_plano():
             id_plano = cursor.lastrowid
 
             # Refeições e alimentos
-            for r in refeicoes:
-                cursor.execute("""
-                    INSERT INTO refeicoes (id_plano, titulo, calorias_estimadas)
-                    VALUES (%s, %s, %s)
-                """, (id_plano, r["titulo"], r["calorias_estimadas"]))
-                id_refeicao = cursor.lastrowid
-
-                for alimento in r.get("alimentos", []):
-                    nome = str(alimento.get("nome", "")).strip()
-                    peso = str(alimento.get("peso", "")).strip()
-
-                    if not nome or not peso:
-                        continue
-
-                    cursor.execute("""
-                        INSERT INTO alimentos (id_refeicao, nome, peso)
-                        VALUES (%s, %s, %s)
-                    """, (id_refeicao, nome, peso))
+            salvar_refeicoes(cursor, id_plano, refeicoes)
 
+            ajustar_contador(cursor, identidade["id"], "planos_ativos", 1)
             db.commit()
+            invalidar_dashboard(id_aluno, identidade["id"])
             return jsonify({"message": "Plano criado com sucesso", "id_plano": id_plano}), 201
 
     except Exception as e:
@@ -125,41 +135,29 @@ def editar_plano(id_plano):
     db = get_db()
     try:
         with db.cursor() as cursor:
-            # plano pertence a este nutri?
+            # plano pertence a este nutri? (FOR UPDATE: edições simultâneas do mesmo plano em fila)
             cursor.execute("""
-                SELECT id_plano FROM planosalimentares
+                SELECT id_plano, id_aluno FROM planosalimentares
                 WHERE id_plano=%s AND id_nutricionista=%s AND ativo=TRUE
+                FOR UPDATE
             """, (id_plano, identidade["id"]))
-            if not cursor.fetchone():
+            plano = cursor.fetchone()
+            if not plano:
                 return jsonify({"message": "Plano não encontrado ou acesso negado"}), 403
 
             # apagar refeições/alimentos antigos
-            cursor.execute("SELECT id_refeicao FROM refeicoes WHERE id_plano=%s", (id_plano,))
-            for ref_ant in cursor.fetchall():
-                cursor.execute("DELETE FROM alimentos WHERE id_refeicao=%s", (ref_ant["id_refeicao"],))
+            cursor.execute("""
+                DELETE a FROM alimentos a
+                JOIN refeicoes r ON a.id_refeicao = r.id_refeicao
+                WHERE r.id_plano=%s
+            """, (id_plano,))
             cursor.execute("DELETE FROM refeicoes WHERE id_plano=%s", (id_plano,))
 
             # inserir novas refeições e alimentos
-            for r in refeicoes:
-                cursor.execute("""
-                    INSERT INTO refeicoes (id_plano, titulo, calorias_estimadas)
-                    VALUES (%s, %s, %s)
-                """, (id_plano, r["titulo"], r["calorias_estimadas"]))
-                id_refeicao = cursor.lastrowid
-
-                for alimento in r.get("alimentos", []):
-                    nome = str(alimento.get("nome", "")).strip()
-                    peso = str(alimento.get("peso", "")).strip()
-
-                    if not nome or not peso:
-                        continue
-
-                    cursor.execute("""
-                        INSERT INTO alimentos (id_refeicao, nome, peso)
-                        VALUES (%s, %s, %s)
-                    """, (id_refeicao, nome, peso))
+            salvar_refeicoes(cursor, id_plano, refeicoes)
 
             db.commit()
+            invalidar_dashboard(plano["id_aluno"])
             return jsonify({"message": "Plano atualizado com sucesso"}), 200
 
     except Exception as e:
@@ -176,12 +174,13 @@ def listar_planos():
     identidade = extrair_user_info()
     user_id = identidade["id"]
     tipo    = identidade["tipo_usuario"]
+    pagina = Paginacao.da_requisicao([("p.id_plano", "id_plano", "DESC")])
 
     db = get_db()
     try:
         with db.cursor() as cursor:
             if tipo == "aluno":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT 
                         p.id_plano,
                         u1.nome AS nome_aluno,
@@ -192,11 +191,11 @@ def listar_planos():
                     JOIN usuarios u1 ON p.id_aluno = u1.id_usuario
                     JOIN usuarios u2 ON p.id_nutricionista = u2.id_usuario
                     LEFT JOIN refeicoes r ON r.id_plano = p.id_plano
-                    WHERE p.id_aluno = %s AND p.ativo = TRUE
+                    WHERE p.id_aluno = %s AND p.ativo = TRUE AND {apos_cursor}
                     GROUP BY p.id_plano
                 """, (user_id,))
             elif tipo == "nutricionista":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT 
                         p.id_plano,
                         u1.nome AS nome_aluno,
@@ -207,13 +206,13 @@ def listar_planos():
                     JOIN usuarios u1 ON p.id_aluno = u1.id_usuario
                     JOIN usuarios u2 ON p.id_nutricionista = u2.id_usuario
                     LEFT JOIN refeicoes r ON r.id_plano = p.id_plano
-                    WHERE p.id_nutricionista = %s AND p.ativo = TRUE
+                    WHERE p.id_nutricionista = %s AND p.ativo = TRUE AND {apos_cursor}
                     GROUP BY p.id_plano
                 """, (user_id,))
             else:
                 return jsonify({"message": "Tipo de usuário não autorizado"}), 403
 
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("[ERRO] Falha ao listar planos:", e)
         return jsonify({"message": f"Erro ao listar planos: {str(e)}"}), 500
@@ -225,45 +224,11 @@ def listar_planos():
 # --------------------------------------------------
 @planos_bp.route("/<int:id_plano>", methods=["GET"])
 @jwt_required()
-def detalhar_plano_para_uso(id_plano):
-    db = get_db()
-    with db.cursor() as cursor:
-        # Buscar dados do plano + nutricionista + aluno
-        cursor.execute("""
-            SELECT u1.nome AS nome_aluno,
-                   u2.nome AS nome_profissional,
-                   u2.email, u2.telefone, u2.endereco, u2.crn
-            FROM planosalimentares p
-            JOIN usuarios u1 ON p.id_aluno = u1.id_usuario
-            JOIN usuarios u2 ON p.id_nutricionista = u2.id_usuario
-            WHERE p.id_plano=%s AND p.ativo=TRUE
-        """, (id_plano,))
-        plano = cursor.fetchone()
-
-        if not plano:
-            return jsonify({"message": "Plano não encontrado"}), 404
-
-        # Buscar refeições
-        cursor.execute("""
-            SELECT id_refeicao, titulo, calorias_estimadas
-            FROM refeicoes
-            WHERE id_plano=%s
-            ORDER BY id_refeicao
-        """, (id_plano,))
-        refeicoes = cursor.fetchall()
-
-        # Buscar alimentos para cada refeição
-        for r in refeicoes:
-            cursor.execute("""
-                SELECT nome, peso
-                FROM alimentos
-                WHERE id_refeicao=%s AND nome IS NOT NULL AND peso IS NOT NULL
-                ORDER BY id_alimento
-            """, (r["id_refeicao"],))
-            r["alimentos"] = cursor.fetchall()
-
-        plano["refeicoes"] = refeicoes
-        return jsonify(plano), 200
+def detalhar_plano(id_plano):
+    plano = carregar_plano(id_plano, somente_ativo=True)
+    if not plano:
+        return jsonify({"message": "Plano não encontrado"}), 404
+    return jsonify(plano), 200
 
 # --------------------------------------------------
 # Desativar plano
@@ -278,20 +243,31 @@ def excluir_plano(id_plano):
     db = get_db()
     try:
         with db.cursor() as cursor:
+            cursor.execute("SELECT id_aluno, id_nutricionista, ativo FROM planosalimentares WHERE id_plano=%s", (id_plano,))
+            plano = cursor.fetchone()
             cursor.execute("UPDATE planosalimentares SET ativo=FALSE WHERE id_plano=%s", (id_plano,))
+            if plano and plano["ativo"]:
+                ajustar_contador(cursor, plano["id_nutricionista"], "planos_ativos", -1)
             db.commit()
+            if plano:
+                invalidar_dashboard(plano["id_aluno"], plano["id_nutricionista"])
             return jsonify({"message": "Plano desativado"}), 200
     except Exception as e:
         return jsonify({"message": f"Erro ao desativar plano: {str(e)}"}), 500
 
 
 # =======================
-# Função auxiliar
+# Função auxiliar: plano completo (JSON, PDF e envios)
 # =======================
-def detalhar_plano_para_uso(id_plano):
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("""
+def carregar_plano(id_plano, somente_ativo=False):
+    """
+    Plano com refeições e alimentos numa única ida ao banco: o cabeçalho e um
+    JOIN refeições x alimentos seguem no mesmo lote e a estrutura aninhada é
+    montada aqui, qualquer que seja o número de refeições.
+    """
+    filtro_ativo = " AND p.ativo = TRUE" if somente_ativo else ""
+    cabecalho, linhas = consultas_em_lote([
+        (f"""
             SELECT p.id_aluno,
                    u1.nome AS nome_aluno,
                    u2.nome AS nome_profissional,
@@ -299,20 +275,38 @@ def detalhar_plano_para_uso(id_plano):
             FROM planosalimentares p
             JOIN usuarios u1 ON p.id_aluno = u1.id_usuario
             JOIN usuarios u2 ON p.id_nutricionista = u2.id_usuario
-            WHERE p.id_plano = %s
-        """, (id_plano,))
-
-        plano = cursor.fetchone()
-        if not plano:
-            return None
-
-        cursor.execute("SELECT * FROM refeicoes WHERE id_plano = %s", (id_plano,))
-        refeicoes = cursor.fetchall()
-        for r in refeicoes:
-            cursor.execute("SELECT nome, peso FROM alimentos WHERE id_refeicao = %s", (r["id_refeicao"],))
-            r["alimentos"] = cursor.fetchall()
-        plano["refeicoes"] = refeicoes
-        return plano
+            WHERE p.id_plano = %s{filtro_ativo}
+        """, (id_plano,)),
+        ("""
+            SELECT r.id_refeicao, r.titulo, r.calorias_estimadas,
+                   a.nome AS nome_alimento, a.peso
+            FROM refeicoes r
+            LEFT JOIN alimentos a ON a.id_refeicao = r.id_refeicao
+                AND a.nome IS NOT NULL AND a.peso IS NOT NULL
+            WHERE r.id_plano = %s
+            ORDER BY r.id_refeicao, a.id_alimento
+        """, (id_plano,)),
+    ])
+
+    if not cabecalho:
+        return None
+
+    plano = cabecalho[0]
+    refeicoes = {}
+    for linha in linhas:
+        refeicao = refeicoes.get(linha["id_refeicao"])
+        if refeicao is None:
+            refeicao = refeicoes[linha["id_refeicao"]] = {
+                "id_refeicao": linha["id_refeicao"],
+                "titulo": linha["titulo"],
+                "calorias_estimadas": linha["calorias_estimadas"],
+                "alimentos": [],
+            }
+        # Refeição sem alimentos vem do LEFT JOIN com nome NULL
+        if linha["nome_alimento"] is not None:
+            refeicao["alimentos"].append({"nome": linha["nome_alimento"], "peso": linha["peso"]})
+    plano["refeicoes"] = list(refeicoes.values())
+    return plano
 
 
 # ========================
@@ -323,13 +317,12 @@ def detalhar_plano_para_uso(id_plano):
 @jwt_required()
 @cross_origin()
 def baixar_pdf(id_plano):
-    plano = detalhar_plano_para_uso(id_plano)
+    plano = carregar_plano(id_plano)
     if not plano:
         return jsonify({"message": "Plano não encontrado"}), 404
 
     try:
-        pdf = gerar_pdf_plano(plano)
-        return send_file(pdf, mimetype="application/pdf", as_attachment=True, download_name="plano_alimentar.pdf")
+        return responder_pdf("plano", plano, gerar_pdf_plano, "plano_alimentar.pdf")
     except Exception as e:
         print(f"[ERRO PDF] {e}")
         return jsonify({"message": "Erro ao gerar PDF"}), 500
@@ -337,85 +330,29 @@ def baixar_pdf(id_plano):
 #============================
 #Função para download PDF
 #============================
+@rastrear("pdf.plano")
 def gerar_pdf_plano(plano, nome_arquivo="plano_temp.pdf", salvar_em_disco=False):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # Marca d'água com logo central e transparente
-    try:
-        logo_path = "app/static/img/alpphas_logo.png"
-        watermark = ImageReader(logo_path)
-        c.saveState()
-        c.translate(width / 2, height / 2)
-        c.setFillColor(Color(0.7, 0.7, 0.7, alpha=0.08))  # Mais suave
-        c.drawImage(watermark, -200, -200, width=400, height=400, mask='auto')
-        c.restoreState()
-    except Exception as e:
-        print(f"Erro ao carregar logo transparente: {e}")
-
-    # Cabeçalho com logo no canto superior esquerdo
-    try:
-        c.drawImage(logo_path, 40, height - 80, width=60, height=60, mask='auto')
-    except Exception as e:
-        print(f"Erro ao carregar logo: {e}")
-
-    # Dados do nutricionista
-    c.setFont("Helvetica", 10)
-    x_dados = 120
-    y_dados = height - 50
-    c.drawString(x_dados, y_dados, f"Nutricionista: {plano['nome_profissional']}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"Telefone: {plano.get('telefone') or 'Não informado'}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"E-mail: {plano.get('email') or 'Não informado'}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"CRN: {plano.get('crn') or 'Não informado'}")
-
-    # Linha horizontal
-    linha_y = y_dados - 10
-    c.setLineWidth(1)
-    c.line(40, linha_y, width - 40, linha_y)
-
-    # Título centralizado
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, linha_y - 30, "Plano Alimentar")
+    doc = DocumentoPDF("Plano Alimentar", [
+        f"Nutricionista: {plano['nome_profissional']}",
+        f"Telefone: {plano.get('telefone') or 'Não informado'}",
+        f"E-mail: {plano.get('email') or 'Não informado'}",
+        f"CRN: {plano.get('crn') or 'Não informado'}",
+    ])
 
     # Dados do aluno
-    y = linha_y - 60
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, f"Aluno: {plano['nome_aluno']}")
-    y -= 20
+    doc.texto(80, f"Aluno: {plano['nome_aluno']}", "Helvetica-Bold", 12, avanco=20)
 
     # Refeições
-    c.setFont("Helvetica", 11)
     for r in plano["refeicoes"]:
-        if y < 100:
-            c.showPage()
-            y = height - 80
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(80, y, f"Refeição: {r['titulo']} ({r['calorias_estimadas']} kcal)")
-        y -= 15
-        c.setFont("Helvetica", 10)
+        doc.garantir_espaco()
+        doc.texto(80, f"Refeição: {r['titulo']} ({r['calorias_estimadas']} kcal)", "Helvetica-Bold", 11, avanco=15)
+        doc.c.setFont("Helvetica", 10)
         for a in r["alimentos"]:
-            c.drawString(100, y, f"- {a['nome']} - {a['peso']}")
-            y -= 13
-        y -= 10
-
-    c.save()
-    buffer.seek(0)
-
-    if salvar_em_disco:
-        caminho = os.path.join("app", "static", "pdfs", nome_arquivo)
-
-        # ✅ Garante que a pasta exista antes de salvar
-        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            doc.c.drawString(100, doc.y, f"- {a['nome']} - {a['peso']}")
+            doc.y -= 13
+        doc.y -= 10
 
-        with open(caminho, "wb") as f:
-            f.write(buffer.getbuffer())
-        return caminho
-    else:
-        return buffer
+    return doc.finalizar(nome_arquivo, salvar_em_disco)
 
 # =======================
 # Enviar plano por WhatsApp (link do PDF)
@@ -425,7 +362,7 @@ def gerar_pdf_plano(plano, nome_arquivo="plano_temp.pdf", salvar_em_disco=False)
 @cross_origin()
 def enviar_plano_whatsapp(id_plano):
     try:
-        plano = detalhar_plano_para_uso(id_plano)
+        plano = carregar_plano(id_plano)
         if not plano:
             return jsonify({"message": "Plano não encontrado"}), 404
 
@@ -457,28 +394,12 @@ def enviar_plano_whatsapp(id_plano):
             f"Atenciosamente,\nEquipe Alpphas GYM"
         )
 
-        instancia = os.getenv("ULTRAMSG_INSTANCE")
-        token = os.getenv("ULTRAMSG_TOKEN")
-        payload = {
-            "token": token,
-            "to": numero,
-            "body": mensagem
-        }
-
-        try:
-            response = requests.post(
-                f"https://api.ultramsg.com/{instancia}/messages/chat",
-                json=payload
-            )
-            response.raise_for_status()
-
-            registrar_log_envio(plano["id_aluno"], "whatsapp", numero, mensagem, "sucesso")
-            return jsonify({"message": "Plano enviado com sucesso via WhatsApp"}), 200
-
-        except Exception as e:
-            print("Erro ao enviar WhatsApp:", e)
-            registrar_log_envio(plano["id_aluno"], "whatsapp", numero, f"Erro no envio WhatsApp: {mensagem}", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar via WhatsApp: {str(e)}"}), 500
+        id_envio = enfileirar_envio(
+            "whatsapp", numero, mensagem,
+            id_usuario=plano["id_aluno"],
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio via WhatsApp agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado no envio:", e)
@@ -492,7 +413,7 @@ def enviar_plano_whatsapp(id_plano):
 @cross_origin()
 def enviar_plano(id_plano):
     try:
-        plano = detalhar_plano_para_uso(id_plano)
+        plano = carregar_plano(id_plano)
         if not plano:
             return jsonify({"message": "Plano não encontrado"}), 404
 
@@ -514,31 +435,21 @@ def enviar_plano(id_plano):
             registrar_log_envio(plano["id_aluno"], "email", email, "Erro ao gerar PDF", "falha")
             return jsonify({"message": "Erro ao gerar o plano em PDF"}), 500
 
-        try:
-            msg = Message(
-                subject="Seu Plano Alimentar - Alpphas GYM",
-                sender=None,
-                recipients=[email],
-                body=(
-                    f"Olá {nome},\n\n"
-                    f"Segue em anexo o seu plano alimentar personalizado.\n\n"
-                    f"Atenciosamente,\nEquipe Alpphas GYM"
-                )
-            )
-            msg.attach(
-                filename=f"plano_alimentar_{id_plano}.pdf",
-                content_type="application/pdf",
-                data=pdf_stream.getvalue()
-            )
-            mail.send(msg)
-
-            registrar_log_envio(plano["id_aluno"], "email", email, "Envio de plano alimentar em PDF", "sucesso")
-            return jsonify({"message": "Plano enviado com sucesso por e-mail."}), 200
-
-        except Exception as e:
-            print("Erro ao enviar e-mail:", e)
-            registrar_log_envio(plano["id_aluno"], "email", email, "Erro ao enviar plano alimentar", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar o e-mail: {str(e)}"}), 500
+        corpo = (
+            f"Olá {nome},\n\n"
+            f"Segue em anexo o seu plano alimentar personalizado.\n\n"
+            f"Atenciosamente,\nEquipe Alpphas GYM"
+        )
+        id_envio = enfileirar_envio(
+            "email", email, corpo,
+            id_usuario=plano["id_aluno"],
+            assunto="Seu Plano Alimentar - Alpphas GYM",
+            anexo=pdf_stream.getvalue(),
+            anexo_nome=f"plano_alimentar_{id_plano}.pdf",
+            descricao_log="Envio de plano alimentar em PDF",
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio por e-mail agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado no envio:", e)
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions.db import get_db
+from app.extensions.db import get_db, inserir_em_lote
 from pymysql.err import IntegrityError
 import json
 from datetime import datetime
 import pytz
 from app.utils.jwt import extrair_user_info
+from app.utils.cache import invalidar_dashboard
+from app.utils.paginacao import Paginacao
+from app.utils.streaming import responder_json_streaming
+from app.utils.busca_alunos import FiltroNome
 
 registrostreino_bp = Blueprint("registrostreino", __name__)
 
@@ -47,13 +51,12 @@ def criar_registro():
             """, (id_aluno, id_treino, observacoes, data_execucao))
             id_registro = cursor.lastrowid
 
-            for item in data.get("cargas", []):
-                cursor.execute("""
-                    INSERT INTO registrostreino_exercicios (id_registro, id_exercicio, carga)
-                    VALUES (%s, %s, %s)
-                """, (id_registro, item["id_exercicio"], item["carga"]))
+            inserir_em_lote(cursor, "registrostreino_exercicios", ("id_registro", "id_exercicio", "carga"), [
+                (id_registro, item["id_exercicio"], item["carga"]) for item in data.get("cargas", [])
+            ])
 
             db.commit()
+            invalidar_dashboard(id_aluno)
             return jsonify({"message": "Registro criado com sucesso", "id_registro": id_registro}), 201
 
     except IntegrityError as e:
@@ -73,29 +76,31 @@ def criar_registro():
 @jwt_required()
 def listar_registros():
     user = extrair_user_info()
+    pagina = Paginacao.da_requisicao([
+        ("r.data_execucao", "data_execucao", "DESC"),
+        ("r.id_registro", "id_registro", "DESC"),
+    ])
     db = get_db()
     try:
         with db.cursor() as cursor:
             if user["tipo_usuario"] == "personal":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT r.id_registro, r.id_treino, t.nome_treino, r.data_execucao, r.observacoes,
                            u.nome AS nome_aluno
                     FROM registrostreino r
                     JOIN treinos t ON r.id_treino = t.id_treino
                     JOIN usuarios u ON r.id_aluno = u.id_usuario
-                    WHERE r.ativo = TRUE
-                    ORDER BY r.data_execucao DESC
+                    WHERE r.ativo = TRUE AND {apos_cursor}
                 """)
             else:
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT r.id_registro, r.id_treino, t.nome_treino, r.data_execucao, r.observacoes
                     FROM registrostreino r
                     JOIN treinos t ON r.id_treino = t.id_treino
-                    WHERE r.id_aluno = %s AND r.ativo = TRUE
-                    ORDER BY r.data_execucao DESC
+                    WHERE r.id_aluno = %s AND r.ativo = TRUE AND {apos_cursor}
                 """, (user["id"],))
 
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         return jsonify({"message": f"Erro ao listar registros: {str(e)}"}), 500
 
@@ -166,13 +171,12 @@ def atualizar_registro(id_registro):
             """, (observacoes, id_registro))
 
             cursor.execute("DELETE FROM registrostreino_exercicios WHERE id_registro = %s", (id_registro,))
-            for item in cargas:
-                cursor.execute("""
-                    INSERT INTO registrostreino_exercicios (id_registro, id_exercicio, carga)
-                    VALUES (%s, %s, %s)
-                """, (id_registro, item["id_exercicio"], item["carga"]))
+            inserir_em_lote(cursor, "registrostreino_exercicios", ("id_registro", "id_exercicio", "carga"), [
+                (id_registro, item["id_exercicio"], item["carga"]) for item in cargas
+            ])
 
             db.commit()
+            invalidar_dashboard(registro["id_aluno"])
             return jsonify({"message": "Registro atualizado com sucesso"}), 200
     except Exception as e:
         db.rollback()
@@ -202,6 +206,7 @@ def excluir_registro(id_registro):
                 UPDATE registrostreino SET ativo = FALSE WHERE id_registro = %s
             """, (id_registro,))
             db.commit()
+            invalidar_dashboard(registro["id_aluno"])
             return jsonify({"message": "Registro excluído com sucesso"}), 200
     except Exception as e:
         db.rollback()
@@ -217,19 +222,19 @@ def buscar_registros_por_nome_aluno():
     if user.get("tipo_usuario") != "personal":
         return jsonify({"message": "Apenas personal pode acessar esta rota"}), 403
 
-    nome = request.args.get("nome", "")
+    condicao, params = FiltroNome(request.args.get("nome", "")).condicao()
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT r.id_registro, r.data_execucao, r.observacoes,
                        u.nome AS nome_aluno, t.nome_treino
                 FROM registrostreino r
                 JOIN treinos t ON r.id_treino = t.id_treino
                 JOIN usuarios u ON r.id_aluno = u.id_usuario
-                WHERE u.nome LIKE %s AND r.ativo = TRUE
+                WHERE {condicao} AND r.ativo = TRUE
                 ORDER BY r.data_execucao DESC
-            """, (f"%{nome}%",))
+            """, params)
             return jsonify(cursor.fetchall()), 200
     except Exception as e:
         return jsonify({"message": "Erro ao buscar registros"}), 500
@@ -258,6 +263,36 @@ def listar_registros_do_aluno():
     except Exception as e:
         return jsonify({"message": f"Erro ao buscar seus registros: {str(e)}"}), 500
 
+# ======================
+# Exportar histórico de registros (JSON em streaming)
+# ======================
+@registrostreino_bp.route("/exportar", methods=["GET"])
+@jwt_required()
+def exportar_registros():
+    user = extrair_user_info()
+    try:
+        if user.get("tipo_usuario") == "personal":
+            # Histórico de todos os alunos
+            return responder_json_streaming("""
+                SELECT r.id_registro, r.id_aluno, u.nome AS nome_aluno,
+                       r.id_treino, t.nome_treino, r.data_execucao, r.observacoes
+                FROM registrostreino r
+                JOIN treinos t ON r.id_treino = t.id_treino
+                JOIN usuarios u ON r.id_aluno = u.id_usuario
+                WHERE r.ativo = TRUE
+                ORDER BY r.data_execucao DESC, r.id_registro DESC
+            """, nome_arquivo="registros_treino.json")
+
+        return responder_json_streaming("""
+            SELECT r.id_registro, r.id_treino, t.nome_treino, r.data_execucao, r.observacoes
+            FROM registrostreino r
+            JOIN treinos t ON r.id_treino = t.id_treino
+            WHERE r.id_aluno = %s AND r.ativo = TRUE
+            ORDER BY r.data_execucao DESC, r.id_registro DESC
+        """, (user["id"],), nome_arquivo="meus_registros.json")
+    except Exception as e:
+        return jsonify({"message": f"Erro ao exportar registros: {str(e)}"}), 500
+
 # ======================
 # Buscar última carga por exercício
 # ======================
@@ -1,25 +1,27 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions.db import get_db
-from app.utils.jwt import extrair_user_info
+from app.extensions.db import get_db, inserir_em_lote
+from app.utils.jwt import extrair_user_info, extrair_user_id
 from app.utils.logs import registrar_log_envio
+from app.utils.fila_envios import enfileirar_envio
+from app.utils.cache import invalidar_dashboard, usuarios_afetados
+from app.utils.stats_profissional import ajustar_contador
+from app.utils.busca_alunos import FiltroNome
 
 
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.colors import Color
-from app.extensions.mail import mail
-from flask_mail import Message
+from app.utils.pdf_base import DocumentoPDF
+from app.utils.pdf_cache import responder_pdf
+from app.utils.rastreamento import rastrear
 
 import json
-import os, requests
+import os
 
 treinos_bp = Blueprint("treinos", __name__)
 
+COLUNAS_TREINOEXERCICIOS = ("id_treino", "id_exercicio", "series", "repeticoes", "observacoes")
+
 def extrair_user_info():
     identidade = get_jwt_identity()
     try:
@@ -56,19 +58,14 @@ def criar_treino():
             """, (id_aluno, identidade.get("id"), nome_treino, objetivo))
             id_treino = cursor.lastrowid
 
-            for ex in exercicios:
-                cursor.execute("""
-                    INSERT INTO treinoexercicios (id_treino, id_exercicio, series, repeticoes, observacoes)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    id_treino,
-                    ex.get("id_exercicio"),
-                    ex.get("series"),
-                    ex.get("repeticoes"),
-                    ex.get("observacoes")
-                ))
+            inserir_em_lote(cursor, "treinoexercicios", COLUNAS_TREINOEXERCICIOS, [
+                (id_treino, ex.get("id_exercicio"), ex.get("series"), ex.get("repeticoes"), ex.get("observacoes"))
+                for ex in exercicios
+            ])
 
+            ajustar_contador(cursor, identidade.get("id"), "treinos_ativos", 1)
             db.commit()
+            invalidar_dashboard(id_aluno, identidade.get("id"))
             return jsonify({
                 "message": "Treino criado com sucesso",
                 "id_treino": id_treino
@@ -91,18 +88,20 @@ def listar_treinos_por_profissional():
     if identidade.get("tipo_usuario") != "personal":
         return jsonify({"message": "Apenas personal pode acessar"}), 403
 
-    nome = request.args.get("nome", "")
+    filtro = FiltroNome(request.args.get("nome", ""))
+    condicao, params = filtro.condicao()
+    ordem, params_ordem = filtro.ordem("u.nome", "u.id_usuario", "t.nome_treino")
 
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT u.id_usuario, u.nome, u.cpf, t.id_treino, t.nome_treino
                 FROM usuarios u
                 JOIN treinos t ON u.id_usuario = t.id_aluno
-                WHERE t.id_profissional = %s AND t.ativo = TRUE AND u.nome LIKE %s
-                ORDER BY u.nome, t.nome_treino
-            """, (identidade.get("id"), f"%{nome}%"))
+                WHERE t.id_profissional = %s AND t.ativo = TRUE AND {condicao}
+                ORDER BY {ordem}
+            """, (identidade.get("id"), *params, *params_ordem))
             dados = cursor.fetchall()
 
             resposta = {}
@@ -185,18 +184,19 @@ def editar_treino(id_treino):
     db = get_db()
     try:
         with db.cursor() as cursor:
+            afetados = usuarios_afetados(cursor, "SELECT id_aluno FROM treinos WHERE id_treino = %s", (id_treino,))
             cursor.execute("""
                 UPDATE treinos SET nome_treino = %s WHERE id_treino = %s
             """, (nome_treino, id_treino))
 
             cursor.execute("DELETE FROM treinoexercicios WHERE id_treino = %s", (id_treino,))
-            for ex in exercicios:
-                cursor.execute("""
-                    INSERT INTO treinoexercicios (id_treino, id_exercicio, series, repeticoes, observacoes)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (id_treino, ex["id_exercicio"], ex["series"], ex["repeticoes"], ex["observacoes"]))
+            inserir_em_lote(cursor, "treinoexercicios", COLUNAS_TREINOEXERCICIOS, [
+                (id_treino, ex["id_exercicio"], ex["series"], ex["repeticoes"], ex["observacoes"])
+                for ex in exercicios
+            ])
 
             db.commit()
+            invalidar_dashboard(*afetados)
             return jsonify({"message": "Treino atualizado com sucesso"}), 200
     except Exception as e:
         print("Erro ao editar treino:", e)
@@ -218,8 +218,14 @@ def excluir_treino(id_treino):
     db = get_db()
     try:
         with db.cursor() as cursor:
+            cursor.execute("SELECT id_aluno, id_profissional, ativo FROM treinos WHERE id_treino = %s", (id_treino,))
+            treino = cursor.fetchone()
             cursor.execute("UPDATE treinos SET ativo = FALSE WHERE id_treino = %s", (id_treino,))
+            if treino and treino["ativo"]:
+                ajustar_contador(cursor, treino["id_profissional"], "treinos_ativos", -1)
             db.commit()
+            if treino:
+                invalidar_dashboard(treino["id_aluno"], treino["id_profissional"])
             return jsonify({"message": "Treino excluído com sucesso"}), 200
     except Exception as e:
         print("Erro ao excluir treino:", e)
@@ -314,87 +320,31 @@ def buscar_dados_treino_completo(id_treino):
 #==================
 #Função Gerar PDF
 #==================
+@rastrear("pdf.treino")
 def gerar_pdf_treino(treino, nome_arquivo="treino_temp.pdf", salvar_em_disco=False):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # Marca d'água com logo no fundo
-    try:
-        logo_path = "app/static/img/alpphas_logo.png"
-        marca = ImageReader(logo_path)
-        c.saveState()
-        c.translate(width / 2, height / 2)
-        c.setFillColor(Color(0.7, 0.7, 0.7, alpha=0.08))
-        c.drawImage(marca, -200, -200, width=400, height=400, mask='auto')
-        c.restoreState()
-    except Exception as e:
-        print(f"Erro ao carregar logo transparente: {e}")
-
-    # Logo no topo
-    try:
-        c.drawImage(logo_path, 40, height - 80, width=60, height=60, mask='auto')
-    except Exception as e:
-        print(f"Erro ao carregar logo: {e}")
-
-    # Cabeçalho - dados do profissional
-    c.setFont("Helvetica", 10)
-    x_dados = 120
-    y_dados = height - 50
-    c.drawString(x_dados, y_dados, f"Profissional: {treino.get('nome_profissional', 'Não informado')}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"Telefone: {treino.get('telefone', 'Não informado')}")
-    y_dados -= 15
-    c.drawString(x_dados, y_dados, f"E-mail: {treino.get('email', 'Não informado')}")
-
-    # Linha separadora
-    linha_y = y_dados - 10
-    c.setLineWidth(1)
-    c.line(40, linha_y, width - 40, linha_y)
-
-    # Título do documento
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, linha_y - 30, "Ficha de Treino")
+    doc = DocumentoPDF("Ficha de Treino", [
+        f"Profissional: {treino.get('nome_profissional', 'Não informado')}",
+        f"Telefone: {treino.get('telefone', 'Não informado')}",
+        f"E-mail: {treino.get('email', 'Não informado')}",
+    ])
 
     # Dados do aluno
-    y = linha_y - 60
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(80, y, f"Aluno: {treino.get('nome_aluno', 'Não informado')}")
-    y -= 20
-    c.drawString(80, y, f"Treino: {treino.get('nome_treino', 'Sem nome')}")
-    y -= 20
+    doc.texto(80, f"Aluno: {treino.get('nome_aluno', 'Não informado')}", "Helvetica-Bold", 12, avanco=20)
+    doc.texto(80, f"Treino: {treino.get('nome_treino', 'Sem nome')}", "Helvetica-Bold", 12, avanco=20)
 
     # Lista de exercícios
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(80, y, "Exercícios:")
-    y -= 15
+    doc.texto(80, "Exercícios:", "Helvetica-Bold", 11, avanco=15)
 
     for ex in treino.get("exercicios", []):
-        if y < 100:
-            c.showPage()
-            y = height - 80
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(90, y, f"{ex.get('nome', 'Exercício')} ({ex.get('grupo_muscular', '-')})")
-        y -= 13
-        c.setFont("Helvetica", 10)
-        c.drawString(
+        doc.garantir_espaco()
+        doc.texto(90, f"{ex.get('nome', 'Exercício')} ({ex.get('grupo_muscular', '-')})", "Helvetica-Bold", 10, avanco=13)
+        doc.texto(
             100,
-            y,
-            f"- Séries: {ex.get('series', '-')}  |  Repetições: {ex.get('repeticoes', '-')}  |  Observações: {ex.get('observacoes') or '-'}"
+            f"- Séries: {ex.get('series', '-')}  |  Repetições: {ex.get('repeticoes', '-')}  |  Observações: {ex.get('observacoes') or '-'}",
+            avanco=20
         )
-        y -= 20
-
-    c.save()
-    buffer.seek(0)
-
-    if salvar_em_disco:
-        caminho = os.path.join("app", "static", "pdfs", nome_arquivo)
-        os.makedirs(os.path.dirname(caminho), exist_ok=True)
-        with open(caminho, "wb") as f:
-            f.write(buffer.getbuffer())
-        return caminho
-    else:
-        return buffer
+
+    return doc.finalizar(nome_arquivo, salvar_em_disco)
     
 #=============================
 #Função para dowload do PDF
@@ -408,8 +358,7 @@ def baixar_pdf_treino(id_treino):
         return jsonify({"message": "Treino não encontrado"}), 404
 
     try:
-        pdf = gerar_pdf_treino(treino)
-        return send_file(pdf, mimetype="application/pdf", as_attachment=True, download_name="treino.pdf")
+        return responder_pdf("treino", treino, gerar_pdf_treino, "treino.pdf")
     except Exception as e:
         print(f"[ERRO PDF] {e}")
         return jsonify({"message": "Erro ao gerar PDF"}), 500
@@ -444,31 +393,21 @@ def enviar_treino(id_treino):
             registrar_log_envio(treino["id_aluno"], "email", email, "Erro ao gerar PDF do treino", "falha")
             return jsonify({"message": "Erro ao gerar o treino em PDF"}), 500
 
-        try:
-            msg = Message(
-                subject="Seu Treino - Alpphas GYM",
-                sender=None,
-                recipients=[email],
-                body=(
-                    f"Olá {nome},\n\n"
-                    f"Segue em anexo sua ficha de treino personalizada.\n\n"
-                    f"Atenciosamente,\nEquipe Alpphas GYM"
-                )
-            )
-            msg.attach(
-                filename=f"treino_{id_treino}.pdf",
-                content_type="application/pdf",
-                data=pdf_stream.getvalue()
-            )
-            mail.send(msg)
-
-            registrar_log_envio(treino["id_aluno"], "email", email, "Envio de ficha de treino em PDF", "sucesso")
-            return jsonify({"message": "Treino enviado com sucesso por e-mail."}), 200
-
-        except Exception as e:
-            print("Erro ao enviar e-mail com treino:", e)
-            registrar_log_envio(treino["id_aluno"], "email", email, "Erro ao enviar treino", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar o e-mail: {str(e)}"}), 500
+        corpo = (
+            f"Olá {nome},\n\n"
+            f"Segue em anexo sua ficha de treino personalizada.\n\n"
+            f"Atenciosamente,\nEquipe Alpphas GYM"
+        )
+        id_envio = enfileirar_envio(
+            "email", email, corpo,
+            id_usuario=treino["id_aluno"],
+            assunto="Seu Treino - Alpphas GYM",
+            anexo=pdf_stream.getvalue(),
+            anexo_nome=f"treino_{id_treino}.pdf",
+            descricao_log="Envio de ficha de treino em PDF",
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio por e-mail agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado ao enviar treino:", e)
@@ -514,28 +453,12 @@ def enviar_treino_whatsapp(id_treino):
             f"Atenciosamente,\nEquipe Alpphas GYM"
         )
 
-        instancia = os.getenv("ULTRAMSG_INSTANCE")
-        token = os.getenv("ULTRAMSG_TOKEN")
-        payload = {
-            "token": token,
-            "to": numero,
-            "body": mensagem
-        }
-
-        try:
-            response = requests.post(
-                f"https://api.ultramsg.com/{instancia}/messages/chat",
-                json=payload
-            )
-            response.raise_for_status()
-
-            registrar_log_envio(treino["id_aluno"], "whatsapp", numero, mensagem, "sucesso")
-            return jsonify({"message": "Treino enviado com sucesso via WhatsApp"}), 200
-
-        except Exception as e:
-            print("Erro ao enviar WhatsApp do treino:", e)
-            registrar_log_envio(treino["id_aluno"], "whatsapp", numero, f"Erro no envio WhatsApp: {mensagem}", f"falha: {str(e)}")
-            return jsonify({"message": f"Erro ao enviar via WhatsApp: {str(e)}"}), 500
+        id_envio = enfileirar_envio(
+            "whatsapp", numero, mensagem,
+            id_usuario=treino["id_aluno"],
+            id_solicitante=extrair_user_id()
+        )
+        return jsonify({"message": "Envio via WhatsApp agendado", "id_envio": id_envio, "status": "pendente"}), 202
 
     except Exception as e:
         print("Erro inesperado no envio:", e)
@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app.extensions.db import get_db
+from app.utils.paginacao import Paginacao
+from app.utils.texto import normalizar_nome
+from app.utils.indice_trigramas import indexar_aluno, remover_aluno
 from datetime import datetime
 import os
 import json
@@ -9,6 +12,9 @@ import json
 usuarios_bp = Blueprint('usuarios', __name__)
 UPLOAD_FOLDER = 'app/static/uploads'
 
+# Ordem estável das listagens de usuários (nome + id para desempate)
+ORDEM_POR_NOME = [("nome", "nome", "ASC"), ("id_usuario", "id_usuario", "ASC")]
+
 
 def extrair_identidade():
     try:
@@ -24,28 +30,29 @@ def extrair_identidade():
 @jwt_required()
 def listar_usuarios():
     tipo = request.args.get('tipo')
+    pagina = Paginacao.da_requisicao(ORDEM_POR_NOME)
     db = get_db()
     try:
         with db.cursor() as cursor:
             if tipo == "aluno":
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT id_usuario, nome, cpf
                     FROM usuarios
-                    WHERE tipo_usuario = %s AND ativo = TRUE
+                    WHERE tipo_usuario = %s AND ativo = TRUE AND {apos_cursor}
                 """, (tipo,))
             elif tipo:
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT id_usuario, nome
                     FROM usuarios
-                    WHERE tipo_usuario = %s AND ativo = TRUE
+                    WHERE tipo_usuario = %s AND ativo = TRUE AND {apos_cursor}
                 """, (tipo,))
             else:
-                cursor.execute("""
+                resultado = pagina.executar(cursor, """
                     SELECT id_usuario, nome
                     FROM usuarios
-                    WHERE ativo = TRUE
+                    WHERE ativo = TRUE AND {apos_cursor}
                 """)
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("Erro ao listar usuários:", e)
         return jsonify({'msg': 'Erro interno'}), 500
@@ -142,23 +149,25 @@ def editar_usuario():
             if tipo_usuario == "personal":
                 cursor.execute("""
                     UPDATE usuarios
-                    SET nome = %s, telefone = %s, data_nascimento = %s, genero = %s, cref = %s
+                    SET nome = %s, nome_busca = %s, telefone = %s, data_nascimento = %s, genero = %s, cref = %s
                     WHERE id_usuario = %s AND ativo = TRUE
-                """, (nome, telefone, data_nascimento, genero, cref, user_id))
+                """, (nome, normalizar_nome(nome), telefone, data_nascimento, genero, cref, user_id))
             elif tipo_usuario == "nutricionista":
                 cursor.execute("""
                     UPDATE usuarios
-                    SET nome = %s, telefone = %s, data_nascimento = %s, genero = %s, crn = %s
+                    SET nome = %s, nome_busca = %s, telefone = %s, data_nascimento = %s, genero = %s, crn = %s
                     WHERE id_usuario = %s AND ativo = TRUE
-                """, (nome, telefone, data_nascimento, genero, crn, user_id))
+                """, (nome, normalizar_nome(nome), telefone, data_nascimento, genero, crn, user_id))
             else:
                 cursor.execute("""
                     UPDATE usuarios
-                    SET nome = %s, telefone = %s, data_nascimento = %s, genero = %s
+                    SET nome = %s, nome_busca = %s, telefone = %s, data_nascimento = %s, genero = %s
                     WHERE id_usuario = %s AND ativo = TRUE
-                """, (nome, telefone, data_nascimento, genero, user_id))
+                """, (nome, normalizar_nome(nome), telefone, data_nascimento, genero, user_id))
 
             db.commit()
+            if tipo_usuario == "aluno":
+                indexar_aluno({"id_usuario": user_id, "nome": nome})
             return jsonify({'msg': 'Perfil atualizado com sucesso'}), 200
     except Exception as e:
         print("Erro ao editar usuário:", e)
@@ -183,6 +192,7 @@ def desativar_usuario():
         with db.cursor() as cursor:
             cursor.execute("UPDATE usuarios SET ativo = FALSE WHERE id_usuario = %s", (user_id,))
             db.commit()
+            remover_aluno(user_id)
             return jsonify({'msg': 'Conta desativada com sucesso'}), 200
     except Exception as e:
         print("Erro ao desativar conta:", e)
@@ -250,16 +260,16 @@ def completar_perfil():
 @usuarios_bp.route('/alunos', methods=['GET'])
 @jwt_required()
 def listar_alunos_para_registro():
+    pagina = Paginacao.da_requisicao(ORDEM_POR_NOME)
     db = get_db()
     try:
         with db.cursor() as cursor:
-            cursor.execute("""
+            resultado = pagina.executar(cursor, """
                 SELECT id_usuario, nome, cpf
                 FROM usuarios
-                WHERE tipo_usuario = 'aluno' AND ativo = TRUE
-                ORDER BY nome
+                WHERE tipo_usuario = 'aluno' AND ativo = TRUE AND {apos_cursor}
             """)
-            return jsonify(cursor.fetchall()), 200
+            return jsonify(resultado), 200
     except Exception as e:
         print("Erro ao buscar alunos:", e)
         return jsonify({"msg": "Erro interno ao buscar alunos"}), 500
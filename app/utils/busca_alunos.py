@@ -0,0 +1,94 @@
+# app/utils/busca_alunos.py
+
+from flask import current_app
+
+from app.utils.indice_trigramas import obter_indice_alunos
+from app.utils.texto import normalizar_nome
+
+# ngram_token_size do MySQL (padrão 2): palavras menores não entram no índice FULLTEXT
+TAMANHO_NGRAM = 2
+
+
+class FiltroNome:
+    """
+    Filtro por nome sobre a coluna `nome_busca` (nome já normalizado).
+
+    Com ao menos uma palavra de TAMANHO_NGRAM letras, usa o índice FULLTEXT
+    (parser ngram, que casa trechos no meio do nome como o antigo LIKE '%...%');
+    com uma letra só (início do typeahead), cai no prefixo LIKE 'x%', que usa o
+    índice comum. Termo vazio não filtra nada.
+    """
+
+    def __init__(self, termo, coluna="u.nome_busca"):
+        self.termo = normalizar_nome(termo)
+        self.coluna = coluna
+
+    def __bool__(self):
+        return bool(self.termo)
+
+    @property
+    def palavras(self):
+        return [p for p in self.termo.split() if len(p) >= TAMANHO_NGRAM]
+
+    def _match(self):
+        # A normalização já removeu os operadores do modo booleano; toda palavra é obrigatória
+        return f"MATCH({self.coluna}) AGAINST (%s IN BOOLEAN MODE)", " ".join(f"+{p}" for p in self.palavras)
+
+    def condicao(self):
+        if not self.termo:
+            return "TRUE", []
+        if not self.palavras:
+            return f"{self.coluna} LIKE %s", [f"{self.termo}%"]
+        match, expressao = self._match()
+        return match, [expressao]
+
+    def ordem(self, *desempate):
+        """Trecho do ORDER BY: nomes que começam com o termo primeiro, depois o score do FULLTEXT."""
+        termos, params = [], []
+        if self.termo:
+            termos.append(f"({self.coluna} LIKE %s) DESC")
+            params.append(f"{self.termo}%")
+            if self.palavras:
+                match, expressao = self._match()
+                termos.append(f"{match} DESC")
+                params.append(expressao)
+        return ", ".join(termos + list(desempate)), params
+
+
+def buscar_alunos(cursor, termo, campos, limite=None):
+    """
+    Alunos ativos cujo nome casa com `termo`, mais relevantes primeiro.
+    Com INDICE_BUSCA_ATIVO, responde do índice em memória sem ir ao banco.
+    """
+    filtro = FiltroNome(termo)
+    if not filtro:
+        return []
+
+    limite = limite or current_app.config.get("BUSCA_ALUNOS_LIMITE", 20)
+    indice = obter_indice_alunos()
+    if indice is not None:
+        return [{campo: aluno.get(campo) for campo in campos} for aluno in indice.buscar(termo, limite)]
+
+    condicao, params = filtro.condicao()
+    ordem, params_ordem = filtro.ordem("u.nome")
+    cursor.execute(f"""
+        SELECT {", ".join(f"u.{campo}" for campo in campos)}
+        FROM usuarios u
+        WHERE u.tipo_usuario = 'aluno' AND u.ativo = TRUE AND {condicao}
+        ORDER BY {ordem}
+        LIMIT %s
+    """, (*params, *params_ordem, limite))
+    return cursor.fetchall()
+
+
+def reindexar_nomes(cursor):
+    """Recalcula `nome_busca` de quem estiver desatualizado; retorna quantos mudaram."""
+    cursor.execute("SELECT id_usuario, nome, nome_busca FROM usuarios")
+    pendentes = [
+        (normalizar_nome(linha["nome"]), linha["id_usuario"])
+        for linha in cursor.fetchall()
+        if normalizar_nome(linha["nome"]) != linha["nome_busca"]
+    ]
+    if pendentes:
+        cursor.executemany("UPDATE usuarios SET nome_busca = %s WHERE id_usuario = %s", pendentes)
+    return len(pendentes)
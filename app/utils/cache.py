@@ -0,0 +1,159 @@
+# app/utils/cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from app.extensions.db import get_db
+
+
+class CacheTTL:
+    """
+    Cache em memória (por worker) com validade por item e limite de itens (LRU).
+
+    `invalidar()` remove a chave e também impede que um cálculo iniciado antes
+    da invalidação grave um valor já desatualizado: `guardar(..., desde=t)`
+    é ignorado se a chave foi invalidada depois de `t` (use `self.agora()`).
+    """
+
+    def __init__(self, ttl=60, max_itens=10000):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.pid = os.getpid()
+
+        self._itens = OrderedDict()  # chave -> (valor, expira_em)
+        self._invalidado_em = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    @staticmethod
+    def agora():
+        return time.monotonic()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[1] <= self.agora():
+                self._itens.pop(chave, None)
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, valor, ttl=None, desde=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return False
+
+        agora = self.agora()
+        with self._lock:
+            invalidado_em = self._invalidado_em.get(chave)
+            if desde is not None and invalidado_em is not None and invalidado_em >= desde:
+                return False
+
+            self._itens[chave] = (valor, agora + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+            # Marcas de invalidação mais velhas que o TTL não barram mais nenhum cálculo
+            if len(self._invalidado_em) > self.max_itens:
+                limite = agora - self.ttl
+                self._invalidado_em = {c: t for c, t in self._invalidado_em.items() if t >= limite}
+        return True
+
+    def invalidar(self, *chaves):
+        agora = self.agora()
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+                self._invalidado_em[chave] = agora
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._invalidado_em.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"itens": len(self._itens), "acertos": self.acertos, "faltas": self.faltas}
+
+
+# ===============================
+# Cache do dashboard (por usuário)
+# ===============================
+_dashboard_lock = threading.Lock()
+
+
+def obter_cache_dashboard(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("dashboard_cache")
+    if cache is not None and cache.pid == os.getpid():
+        return cache
+
+    with _dashboard_lock:
+        cache = app.extensions.get("dashboard_cache")
+        if cache is None or cache.pid != os.getpid():
+            cache = CacheTTL(
+                ttl=app.config.get("DASHBOARD_CACHE_TTL", 60),
+                max_itens=app.config.get("DASHBOARD_CACHE_MAX_ITENS", 10000),
+            )
+            app.extensions["dashboard_cache"] = cache
+        return cache
+
+
+def ttl_ate_proximo(agendamentos):
+    """Segundos até o primeiro agendamento da lista começar (e sair de "próximos")."""
+    if not agendamentos:
+        return None
+    inicio = agendamentos[0].get("data_hora_inicio")
+    if not isinstance(inicio, datetime):
+        return None
+    return max((inicio - datetime.now()).total_seconds(), 0)
+
+
+def versao_dashboard(cursor, id_usuario):
+    """Versão atual do dashboard do usuário; um dashboard em cache só vale se tiver sido montado nela."""
+    cursor.execute("SELECT versao FROM dashboard_versoes WHERE id_usuario = %s", (id_usuario,))
+    linha = cursor.fetchone()
+    return linha["versao"] if linha else 0
+
+
+def invalidar_dashboard(*ids_usuarios):
+    """
+    Descarta o dashboard em cache dos usuários afetados. Chamar depois do commit.
+
+    Este worker descarta na hora; os demais percebem porque a versão do
+    usuário em dashboard_versoes muda e o cache deles deixa de bater com ela.
+    """
+    ids = sorted({int(i) for i in ids_usuarios if i})
+    if not ids:
+        return
+    obter_cache_dashboard().invalidar(*ids)
+
+    db = get_db()
+    try:
+        with db.cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO dashboard_versoes (id_usuario, versao) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE versao = versao + 1
+            """, [(id_usuario, 1) for id_usuario in ids])
+        db.commit()
+    except Exception as e:
+        # Os outros workers ficam com o dashboard antigo até o TTL (DASHBOARD_CACHE_TTL)
+        print(f"[ERRO] Falha ao registrar nova versão do dashboard de {ids}: {e}")
+        db.rollback()
+
+
+def usuarios_afetados(cursor, sql, params):
+    """
+    Ids de usuário retornados pela consulta, para invalidar depois do commit
+    (ex.: SELECT id_aluno, id_profissional FROM agendamentos WHERE id_agendamento = %s).
+    """
+    cursor.execute(sql, params)
+    return [valor for linha in cursor.fetchall() for valor in linha.values()]
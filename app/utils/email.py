@@ -1,11 +1,8 @@
-import os
-from flask_mail import Message
-from app.extensions.mail import mail
-from app.utils.logs import registrar_log_envio
+from app.utils.fila_envios import enfileirar_envio
 
 def enviar_avaliacao_por_email(avaliacao, pdf_buffer):
     """
-    Envia a avaliação física por e-mail com o PDF anexado.
+    Enfileira o envio da avaliação física por e-mail com o PDF anexado.
 
     Parâmetros:
     - avaliacao: dict retornado por detalhar_avaliacao_para_uso
@@ -23,44 +20,33 @@ def enviar_avaliacao_por_email(avaliacao, pdf_buffer):
         }
 
     try:
-        msg = Message(
-            subject="Sua Avaliação Física - Alpphas GYM",
-            recipients=[email_destino],
-            body=(
+        id_envio = enfileirar_envio(
+            "email",
+            email_destino,
+            (
                 f"Olá {nome_destino},\n\n"
                 f"Segue em anexo a sua avaliação física, realizada por {nome_profissional}.\n\n"
                 f"Em caso de dúvidas, estamos à disposição!\n\n"
                 f"Equipe Alpphas GYM"
-            )
+            ),
+            id_usuario=avaliacao["id_aluno"],
+            assunto="Sua Avaliação Física - Alpphas GYM",
+            anexo=pdf_buffer.getvalue(),
+            anexo_nome="avaliacao_fisica.pdf",
+            descricao_log="PDF da avaliação enviado"
         )
 
-        msg.attach(
-            filename="avaliacao_fisica.pdf",
-            content_type="application/pdf",
-            data=pdf_buffer.getvalue()
-        )
-
-        mail.send(msg)
-
-        registrar_log_envio(avaliacao["id_aluno"], "email", email_destino, "PDF da avaliação enviado", "sucesso")
-
         return {
             "success": True,
-            "status": 200,
-            "message": "Avaliação enviada com sucesso por e-mail"
+            "status": 202,
+            "message": "Envio por e-mail agendado",
+            "id_envio": id_envio
         }
 
     except Exception as e:
-        print("[E-MAIL] Erro ao enviar:", e)
-        registrar_log_envio(
-            avaliacao["id_aluno"],
-            "email",
-            email_destino,
-            f"Erro no envio do PDF da avaliação",
-            f"falha: {str(e)}"
-        )
+        print("[E-MAIL] Erro ao enfileirar:", e)
         return {
             "success": False,
             "status": 500,
-            "message": f"Erro ao enviar por e-mail: {str(e)}"
+            "message": f"Erro ao agendar envio por e-mail: {str(e)}"
         }
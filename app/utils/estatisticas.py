@@ -0,0 +1,108 @@
+# app/utils/estatisticas.py
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from app.extensions.db import consultas_em_lote
+from app.utils.cache import CacheTTL
+
+TIPOS_USUARIO = {"aluno": "alunos", "personal": "personal", "nutricionista": "nutricionista"}
+
+
+def _inicio_da_semana(dia):
+    return dia - timedelta(days=dia.weekday())
+
+
+def _preencher_serie(linhas, inicio, passo, quantidade, campo):
+    """Série contínua: baldes sem linha no banco entram com total 0."""
+    totais = {}
+    for linha in linhas:
+        balde = linha[campo]
+        if isinstance(balde, datetime):
+            balde = balde.date()
+        totais[balde] = linha["total"]
+    return [
+        {campo: (inicio + passo * i).isoformat(), "total": totais.get(inicio + passo * i, 0)}
+        for i in range(quantidade)
+    ]
+
+
+def calcular_estatisticas(semanas=12, dias=30, hoje=None):
+    """
+    Totais do sistema e séries por período numa única ida ao banco:
+    um GROUP BY em usuarios, uma consulta com todas as contagens e as duas séries.
+    """
+    hoje = hoje or date.today()
+    inicio_semanas = _inicio_da_semana(hoje) - timedelta(weeks=semanas - 1)
+    inicio_dias = hoje - timedelta(days=dias - 1)
+
+    por_tipo, contagens, novos_usuarios, sessoes = consultas_em_lote([
+        ("""
+            SELECT tipo_usuario, COUNT(*) AS total
+            FROM usuarios
+            GROUP BY tipo_usuario
+        """, ()),
+        ("""
+            SELECT
+                (SELECT COUNT(*) FROM treinos WHERE ativo = TRUE) AS treinos,
+                (SELECT COUNT(*) FROM planosalimentares WHERE ativo = TRUE) AS planos,
+                (SELECT COUNT(*) FROM agendamentos) AS agendamentos,
+                (SELECT COUNT(*) FROM avaliacoesfisicas) AS avaliacoes,
+                (SELECT COUNT(*) FROM exercicios) AS exercicios
+        """, ()),
+        # Novos usuários por semana (segunda-feira de cada semana)
+        ("""
+            SELECT DATE_SUB(DATE(criado_em), INTERVAL WEEKDAY(criado_em) DAY) AS semana, COUNT(*) AS total
+            FROM usuarios
+            WHERE criado_em >= %s
+            GROUP BY semana
+        """, (inicio_semanas,)),
+        # Sessões (agendamentos não cancelados) por dia
+        ("""
+            SELECT DATE(data_hora_inicio) AS dia, COUNT(*) AS total
+            FROM agendamentos
+            WHERE data_hora_inicio >= %s AND data_hora_inicio < %s AND status <> 'cancelado'
+            GROUP BY dia
+        """, (inicio_dias, hoje + timedelta(days=1))),
+    ])
+
+    estatisticas = {chave: 0 for chave in TIPOS_USUARIO.values()}
+    for linha in por_tipo:
+        if linha["tipo_usuario"] in TIPOS_USUARIO:
+            estatisticas[TIPOS_USUARIO[linha["tipo_usuario"]]] = linha["total"]
+    estatisticas.update(contagens[0] if contagens else {})
+    estatisticas["series"] = {
+        "novos_usuarios_semana": _preencher_serie(novos_usuarios, inicio_semanas, timedelta(weeks=1), semanas, "semana"),
+        "sessoes_dia": _preencher_serie(sessoes, inicio_dias, timedelta(days=1), dias, "dia"),
+    }
+    return estatisticas
+
+
+_cache_lock = threading.Lock()
+
+
+def obter_cache_estatisticas(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("estatisticas_cache")
+    if cache is not None and cache.pid == os.getpid():
+        return cache
+
+    with _cache_lock:
+        cache = app.extensions.get("estatisticas_cache")
+        if cache is None or cache.pid != os.getpid():
+            cache = CacheTTL(ttl=app.config.get("ESTATISTICAS_CACHE_TTL", 30), max_itens=64)
+            app.extensions["estatisticas_cache"] = cache
+        return cache
+
+
+def obter_estatisticas(semanas=12, dias=30):
+    """Estatísticas do painel admin, recalculadas no máximo uma vez por TTL em cada worker."""
+    cache = obter_cache_estatisticas()
+    chave = (semanas, dias)
+    estatisticas = cache.obter(chave)
+    if estatisticas is None:
+        estatisticas = calcular_estatisticas(semanas, dias)
+        cache.guardar(chave, estatisticas)
+    return estatisticas
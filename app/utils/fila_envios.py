@@ -0,0 +1,327 @@
+# app/utils/fila_envios.py
+
+import os
+import random
+import threading
+
+from flask import current_app
+from flask_mail import Message
+
+from app.extensions.db import get_db
+from app.extensions.mail import obter_mailer
+from app.utils.logs import registrar_log_envio
+from app.utils.rastreamento import CONSUMIDOR, encerrar_rastro, iniciar_rastro, ler_traceparent, traceparent_atual
+from app.utils.whatsapp import obter_cliente_whatsapp
+
+
+# =========================================
+# Enfileiramento (chamado pelas rotas)
+# =========================================
+def enfileirar_envio(canal, destino, conteudo, id_usuario=None, assunto=None,
+                     anexo=None, anexo_nome=None, descricao_log=None, id_solicitante=None):
+    """
+    Grava o envio na tabela filaenvios e acorda o despachante deste processo.
+    Retorna o id_envio, que pode ser consultado em GET /envios/<id>.
+    """
+    db = get_db()
+    with db.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO filaenvios (canal, id_usuario, id_solicitante, destino, assunto, conteudo,
+                                    descricao_log, anexo_nome, anexo, max_tentativas, traceparent)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (canal, id_usuario, id_solicitante, destino, assunto, conteudo,
+              descricao_log, anexo_nome, anexo, current_app.config.get("FILA_ENVIOS_MAX_TENTATIVAS", 5),
+              traceparent_atual()))
+        id_envio = cursor.lastrowid
+    # Commit já aqui: a thread de envio usa outra conexão e precisa enxergar a linha
+    db.commit()
+
+    if current_app.config.get("FILA_ENVIOS_AUTOINICIAR", True):
+        obter_despachante().acordar()
+    return id_envio
+
+
+def obter_envio(id_envio):
+    db = get_db()
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT id_envio, canal, id_usuario, id_solicitante, destino, status, tentativas,
+                   max_tentativas, proxima_tentativa, ultimo_erro, criado_em, enviado_em
+            FROM filaenvios
+            WHERE id_envio = %s
+        """, (id_envio,))
+        return cursor.fetchone()
+
+
+# =========================================
+# Entrega de fato (executada pelo despachante)
+# =========================================
+def entregar_email(envios):
+    mensagens = []
+    for envio in envios:
+        msg = Message(subject=envio["assunto"], recipients=[envio["destino"]], body=envio["conteudo"])
+        if envio.get("anexo"):
+            msg.attach(
+                filename=envio.get("anexo_nome") or "documento.pdf",
+                content_type="application/pdf",
+                data=envio["anexo"]
+            )
+        mensagens.append(msg)
+    # Uma única sessão SMTP (já autenticada) para o lote inteiro
+    return obter_mailer().enviar_lote(mensagens)
+
+
+def entregar_whatsapp(envios):
+    resultados = obter_cliente_whatsapp().enviar_em_lote(
+        [(envio["destino"], envio["conteudo"]) for envio in envios]
+    )
+    return [resultado["erro"] for resultado in resultados]
+
+
+# Cada entregador recebe os envios de um canal e devolve, na mesma ordem,
+# None (entregue) ou a mensagem de erro
+ENTREGADORES = {
+    "email": entregar_email,
+    "whatsapp": entregar_whatsapp,
+}
+
+
+def calcular_espera(tentativas, base=30, maximo=3600):
+    """Backoff exponencial com jitter de ±20% (em segundos)."""
+    espera = min(maximo, base * 2 ** max(tentativas - 1, 0))
+    return int(espera * random.uniform(0.8, 1.2))
+
+
+# =========================================
+# Despachante (pool de threads por processo)
+# =========================================
+class DespachanteEnvios:
+    """
+    Threads que consomem a tabela filaenvios.
+
+    Cada thread reserva um lote com `SELECT ... FOR UPDATE SKIP LOCKED`
+    (vários workers do gunicorn podem rodar ao mesmo tempo sem pegar o mesmo
+    envio) e empurra `proxima_tentativa` para frente como "lease": se o
+    processo morrer no meio do envio, a linha volta a ficar disponível
+    quando o lease vence.
+
+    Antes de entregar cada canal o lease é renovado para `tempo_lease` mais
+    o pior caso da entrega, `prazos_envio[canal]` segundos por envio (tirado
+    dos timeouts do SMTP e do UltraMsg). Assim um envio lento não vence o
+    lease e não é reservado e mandado de novo por outro worker.
+    """
+
+    def __init__(self, app, num_threads=2, intervalo=5, tamanho_lote=10,
+                 tempo_lease=300, espera_base=30, espera_maxima=3600, prazos_envio=None):
+        self.app = app
+        self.num_threads = num_threads
+        self.intervalo = intervalo
+        self.tamanho_lote = tamanho_lote
+        self.tempo_lease = tempo_lease
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.prazos_envio = prazos_envio or {}
+        self.pid = os.getpid()
+
+        self._threads = []
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        for i in range(self.num_threads):
+            thread = threading.Thread(target=self._executar, name=f"fila-envios-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def parar(self, tempo_espera=5):
+        self._parar.set()
+        self._acordar.set()
+        for thread in self._threads:
+            thread.join(tempo_espera)
+        self._threads = []
+
+    def acordar(self):
+        self._acordar.set()
+
+    def aguardar(self):
+        """Bloqueia enquanto as threads estiverem vivas (modo `flask envios processar --continuo`)."""
+        while any(thread.is_alive() for thread in self._threads):
+            self._threads[0].join(1)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            processados = 0
+            try:
+                with self.app.app_context():
+                    processados = self.processar_lote()
+            except Exception as e:
+                print(f"[ERRO] Falha no despachante de envios: {e}")
+
+            # Fila vazia: dorme até o próximo intervalo ou até um novo enfileiramento
+            if not processados:
+                self._acordar.wait(self.intervalo)
+                self._acordar.clear()
+
+    def processar_lote(self):
+        """Reserva e processa um lote. Precisa de app context. Retorna quantos envios tentou."""
+        envios = self._reservar()
+        if not envios:
+            return 0
+
+        raiz = self._iniciar_rastro(envios)
+        try:
+            por_canal = {}
+            for envio in envios:
+                por_canal.setdefault(envio["canal"], []).append(envio)
+
+            for canal, grupo in por_canal.items():
+                self._renovar_lease(canal, grupo)
+                try:
+                    erros = ENTREGADORES[canal](grupo)
+                except Exception as e:
+                    erros = [str(e)] * len(grupo)
+                for envio, erro in zip(grupo, erros):
+                    self._registrar_resultado(envio, erro)
+        finally:
+            encerrar_rastro(raiz)
+        return len(envios)
+
+    @staticmethod
+    def _iniciar_rastro(envios):
+        """
+        Trace próprio para o lote, com um link para a requisição que enfileirou
+        cada envio. Se alguma dessas requisições entrou na amostra, o lote
+        continua o trace dela, para a entrega aparecer junto com a requisição.
+        """
+        origens = [ler_traceparent(envio.get("traceparent")) for envio in envios]
+        origens = [origem for origem in origens if origem is not None]
+        amostrada = next((origem for origem in origens if origem[2]), None)
+        return iniciar_rastro(
+            "fila.processar_lote",
+            traceparent=f"00-{amostrada[0]}-{amostrada[1]}-01" if amostrada else None,
+            tipo=CONSUMIDOR,
+            links=[(trace_id, span_id) for trace_id, span_id, _ in origens],
+            envios=len(envios),
+        )
+
+    def _reservar(self):
+        db = get_db()
+        with db.cursor() as cursor:
+            cursor.execute("""
+                SELECT id_envio FROM filaenvios
+                WHERE status IN ('pendente', 'processando') AND proxima_tentativa <= NOW()
+                ORDER BY proxima_tentativa
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (self.tamanho_lote,))
+            ids = [linha["id_envio"] for linha in cursor.fetchall()]
+            if not ids:
+                db.commit()
+                return []
+
+            marcadores = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"""
+                UPDATE filaenvios
+                SET status = 'processando', tentativas = tentativas + 1,
+                    proxima_tentativa = NOW() + INTERVAL %s SECOND
+                WHERE id_envio IN ({marcadores})
+            """, (self.tempo_lease, *ids))
+            db.commit()
+
+            cursor.execute(f"SELECT * FROM filaenvios WHERE id_envio IN ({marcadores})", ids)
+            return cursor.fetchall()
+
+    def _renovar_lease(self, canal, grupo):
+        segundos = self.tempo_lease + int(self.prazos_envio.get(canal, 0) * len(grupo))
+        ids = [envio["id_envio"] for envio in grupo]
+        marcadores = ", ".join(["%s"] * len(ids))
+        db = get_db()
+        with db.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE filaenvios
+                SET proxima_tentativa = NOW() + INTERVAL %s SECOND
+                WHERE status = 'processando' AND id_envio IN ({marcadores})
+            """, (segundos, *ids))
+        db.commit()
+
+    def _registrar_resultado(self, envio, erro):
+        descricao = envio.get("descricao_log") or envio["conteudo"]
+        if erro is not None:
+            print(f"[ERRO] Envio {envio['id_envio']} ({envio['canal']}) falhou na tentativa {envio['tentativas']}: {erro}")
+            db = get_db()
+            with db.cursor() as cursor:
+                if envio["tentativas"] >= envio["max_tentativas"]:
+                    cursor.execute("""
+                        UPDATE filaenvios SET status = 'falhou', ultimo_erro = %s WHERE id_envio = %s
+                    """, (erro, envio["id_envio"]))
+                else:
+                    espera = calcular_espera(envio["tentativas"], self.espera_base, self.espera_maxima)
+                    cursor.execute("""
+                        UPDATE filaenvios
+                        SET status = 'pendente', ultimo_erro = %s, proxima_tentativa = NOW() + INTERVAL %s SECOND
+                        WHERE id_envio = %s
+                    """, (erro, espera, envio["id_envio"]))
+            db.commit()
+            if envio["tentativas"] >= envio["max_tentativas"]:
+                registrar_log_envio(envio["id_usuario"], envio["canal"], envio["destino"],
+                                    f"Erro no envio: {descricao}", f"falha: {erro}")
+            return
+
+        # Entregue: descarta corpo e anexo (podem conter senha temporária / dados do aluno)
+        db = get_db()
+        with db.cursor() as cursor:
+            cursor.execute("""
+                UPDATE filaenvios
+                SET status = 'enviado', enviado_em = NOW(), ultimo_erro = NULL,
+                    conteudo = '', anexo = NULL
+                WHERE id_envio = %s
+            """, (envio["id_envio"],))
+        db.commit()
+        registrar_log_envio(envio["id_usuario"], envio["canal"], envio["destino"], descricao, "sucesso")
+
+
+_despachante_lock = threading.Lock()
+
+
+def criar_despachante(app):
+    config = app.config
+    return DespachanteEnvios(
+        app,
+        num_threads=config.get("FILA_ENVIOS_THREADS", 2),
+        intervalo=config.get("FILA_ENVIOS_INTERVALO", 5),
+        tamanho_lote=config.get("FILA_ENVIOS_LOTE", 10),
+        tempo_lease=config.get("FILA_ENVIOS_TEMPO_LEASE", 300),
+        espera_base=config.get("FILA_ENVIOS_ESPERA_BASE", 30),
+        espera_maxima=config.get("FILA_ENVIOS_ESPERA_MAXIMA", 3600),
+        prazos_envio={
+            # E-mails saem um a um pela mesma sessão; cada um pode reconectar uma vez
+            "email": 2 * config.get("MAIL_TIMEOUT", 30),
+            "whatsapp": config.get("ULTRAMSG_TIMEOUT_CONEXAO", 3) + config.get("ULTRAMSG_TIMEOUT_LEITURA", 10),
+        },
+    )
+
+
+def obter_despachante(app=None):
+    """Despachante deste processo; criado e iniciado no primeiro uso (e de novo após o fork)."""
+    app = app or current_app._get_current_object()
+    despachante = app.extensions.get("fila_envios")
+    if despachante is not None and despachante.pid == os.getpid():
+        return despachante
+
+    with _despachante_lock:
+        despachante = app.extensions.get("fila_envios")
+        if despachante is None or despachante.pid != os.getpid():
+            despachante = criar_despachante(app)
+            despachante.iniciar()
+            app.extensions["fila_envios"] = despachante
+        return despachante
+
+
+def iniciar_despachante(app):
+    """
+    Sobe o despachante já no início do worker (ver gunicorn.conf.py), com
+    FILA_ENVIOS_AUTOINICIAR ligado: envios que ficaram pendentes de antes de
+    um deploy ou restart não dependem de um novo enfileiramento neste worker.
+    """
+    if app.config.get("FILA_ENVIOS_AUTOINICIAR", True):
+        obter_despachante(app).acordar()
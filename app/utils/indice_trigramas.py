@@ -0,0 +1,308 @@
+# app/utils/indice_trigramas.py
+
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+
+from app.extensions.db import get_db
+from app.utils.texto import normalizar_nome
+
+
+def trigramas(texto, parcial=False):
+    """
+    Trigramas de cada palavra com borda ("  joao " -> "  j", " jo", "joa", "oao", "ao ").
+    Com `parcial`, a última palavra fica sem a borda final: ainda está sendo digitada.
+    """
+    palavras = texto.split()
+    gramas = set()
+    for i, palavra in enumerate(palavras):
+        borda = f"  {palavra}" if parcial and i == len(palavras) - 1 else f"  {palavra} "
+        gramas.update(borda[j:j + 3] for j in range(len(borda) - 2))
+    return gramas
+
+
+class IndiceTrigramas:
+    """
+    Índice em memória (por worker) para typeahead: trigramas para busca
+    aproximada e lista ordenada de palavras para prefixos curtos.
+
+    `carregar` é a função que devolve todas as linhas (dicts) do banco. O
+    índice é montado no início do worker (`iniciar_indices`, ou no primeiro
+    uso) e remontado a cada `ttl` segundos, o que traz para este worker as
+    escritas feitas em outros; as escritas feitas aqui entram na hora por
+    `adicionar()` / `remover()`.
+
+    A remontagem vencida roda numa thread: a busca que a percebe não espera,
+    e todas continuam respondendo do índice atual até a troca.
+    """
+
+    def __init__(self, carregar, chave, campo_texto="nome", ttl=300, limiar=0.5):
+        self.carregar = carregar
+        self.chave = chave
+        self.campo_texto = campo_texto
+        self.ttl = ttl
+        self.limiar = limiar
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._itens = {}                   # chave -> (texto normalizado, linha)
+        self._gramas = defaultdict(set)    # trigrama -> chaves
+        self._palavras = []                # [(palavra, chave)] ordenada, para prefixos
+        self._escritas = None              # adicionar/remover feitos durante uma remontagem
+        self.carregado_em = None
+
+    # ---------- montagem ----------
+
+    def recarregar(self):
+        """Remonta tudo a partir do banco e troca as estruturas de uma vez."""
+        with self._lock:
+            self._escritas = []
+        try:
+            itens, gramas, palavras = {}, defaultdict(set), []
+            for linha in self.carregar():
+                texto = normalizar_nome(linha.get(self.campo_texto))
+                chave = linha[self.chave]
+                itens[chave] = (texto, dict(linha))
+                for grama in trigramas(texto):
+                    gramas[grama].add(chave)
+                palavras.extend((palavra, chave) for palavra in set(texto.split()))
+            palavras.sort()
+        except Exception:
+            with self._lock:
+                self._escritas = None
+            raise
+
+        with self._lock:
+            self._itens, self._gramas, self._palavras = itens, gramas, palavras
+            # O que este worker gravou enquanto o SELECT rodava pode não estar nele
+            escritas, self._escritas = self._escritas, None
+            for funcao, valor in escritas:
+                funcao(valor)
+            self.carregado_em = time.monotonic()
+        return len(itens)
+
+    def _garantir_carregado(self):
+        if self.carregado_em is None:
+            # Worker que não montou no início: a primeira busca espera a carga
+            with self._lock_carga:
+                if self.carregado_em is None:
+                    self.recarregar()
+            return
+        if time.monotonic() - self.carregado_em < self.ttl:
+            return
+        # Vencido: uma thread remonta; esta busca e as outras seguem no índice atual
+        if self._lock_carga.acquire(blocking=False):
+            threading.Thread(target=self._recarregar_em_segundo_plano, name="indice-trigramas", daemon=True).start()
+
+    def _recarregar_em_segundo_plano(self):
+        try:
+            self.recarregar()
+        except Exception as e:
+            print(f"[ERRO] Falha ao remontar índice de busca: {e}")
+            # Banco fora: tenta de novo depois de outro ttl, não a cada busca
+            self.carregado_em = time.monotonic()
+        finally:
+            self._lock_carga.release()
+
+    def _desindexar(self, chave):
+        texto, _ = self._itens.pop(chave)
+        for grama in trigramas(texto):
+            self._gramas[grama].discard(chave)
+            if not self._gramas[grama]:
+                del self._gramas[grama]
+        for palavra in set(texto.split()):
+            i = bisect.bisect_left(self._palavras, (palavra, chave))
+            if i < len(self._palavras) and self._palavras[i] == (palavra, chave):
+                del self._palavras[i]
+
+    def _indexar(self, linha):
+        chave = linha[self.chave]
+        if chave in self._itens:
+            linha = {**self._itens[chave][1], **linha}
+            self._desindexar(chave)
+        texto = normalizar_nome(linha.get(self.campo_texto))
+        self._itens[chave] = (texto, dict(linha))
+        for grama in trigramas(texto):
+            self._gramas[grama].add(chave)
+        for palavra in set(texto.split()):
+            bisect.insort(self._palavras, (palavra, chave))
+
+    def _remover(self, chave):
+        if chave in self._itens:
+            self._desindexar(chave)
+
+    def adicionar(self, linha):
+        """Inclui uma linha ou atualiza os campos informados de uma já indexada."""
+        with self._lock:
+            self._indexar(linha)
+            if self._escritas is not None:
+                self._escritas.append((self._indexar, linha))
+
+    def remover(self, chave):
+        with self._lock:
+            self._remover(chave)
+            if self._escritas is not None:
+                self._escritas.append((self._remover, chave))
+
+    # ---------- consulta ----------
+
+    def _por_prefixo(self, prefixo):
+        i = bisect.bisect_left(self._palavras, (prefixo,))
+        chaves = set()
+        while i < len(self._palavras) and self._palavras[i][0].startswith(prefixo):
+            chaves.add(self._palavras[i][1])
+            i += 1
+        return chaves
+
+    def buscar(self, termo, limite=20):
+        """
+        Linhas mais parecidas com `termo`: primeiro as que começam com ele,
+        depois as que o contêm, depois as aproximadas (erros de digitação),
+        com pelo menos `limiar` dos trigramas do termo em comum.
+        """
+        termo = normalizar_nome(termo)
+        if not termo:
+            return []
+        self._garantir_carregado()
+
+        with self._lock:
+            if len(termo) < 3:
+                # Uma ou duas letras quase não formam trigramas: só prefixo de palavra
+                candidatos = {chave: 1.0 for chave in self._por_prefixo(termo)}
+            else:
+                gramas = trigramas(termo, parcial=True)
+                contagem = defaultdict(int)
+                for grama in gramas:
+                    for chave in self._gramas.get(grama, ()):
+                        contagem[chave] += 1
+                candidatos = {
+                    chave: comuns / len(gramas)
+                    for chave, comuns in contagem.items()
+                    if comuns / len(gramas) >= self.limiar
+                }
+
+            ranking = []
+            for chave, score in candidatos.items():
+                texto, linha = self._itens[chave]
+                ranking.append((not texto.startswith(termo), termo not in texto, -score, texto, chave, linha))
+        ranking.sort(key=lambda item: item[:5])
+        return [dict(item[5]) for item in ranking[:limite]]
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# ===============================
+# Índices da aplicação (opcionais: INDICE_BUSCA_ATIVO)
+# ===============================
+CAMPOS_ALUNO = ("id_usuario", "nome", "email", "cpf", "whatsapp")
+
+_indices_lock = threading.Lock()
+
+
+def _consultar(sql):
+    with get_db().cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+def _carregar_alunos():
+    return _consultar(f"""
+        SELECT {", ".join(CAMPOS_ALUNO)} FROM usuarios
+        WHERE tipo_usuario = 'aluno' AND ativo = TRUE
+    """)
+
+
+def _carregar_exercicios():
+    return _consultar("SELECT * FROM exercicios")
+
+
+FABRICAS = {
+    "indice_alunos": (_carregar_alunos, "id_usuario"),
+    "indice_exercicios": (_carregar_exercicios, "id_exercicio"),
+}
+
+
+def _no_contexto(app, carregar):
+    # A remontagem pode rodar fora de requisição (início do worker, thread do ttl)
+    with app.app_context():
+        return carregar()
+
+
+def _obter_indice(nome, app=None, criar=True):
+    app = app or current_app._get_current_object()
+    if not app.config.get("INDICE_BUSCA_ATIVO", False):
+        return None
+    indice = app.extensions.get(nome)
+    if indice is not None and indice.pid == os.getpid():
+        return indice
+    if not criar:
+        return None
+
+    with _indices_lock:
+        indice = app.extensions.get(nome)
+        if indice is None or indice.pid != os.getpid():
+            carregar, chave = FABRICAS[nome]
+            indice = IndiceTrigramas(
+                functools.partial(_no_contexto, app, carregar), chave,
+                ttl=app.config.get("INDICE_BUSCA_TTL", 300),
+                limiar=app.config.get("INDICE_BUSCA_LIMIAR", 0.5),
+            )
+            app.extensions[nome] = indice
+        return indice
+
+
+def obter_indice_alunos(app=None):
+    """Índice de alunos ativos deste worker, ou None se desligado."""
+    return _obter_indice("indice_alunos", app)
+
+
+def obter_indice_exercicios(app=None):
+    """Índice de exercicios.nome deste worker, ou None se desligado."""
+    return _obter_indice("indice_exercicios", app)
+
+
+def iniciar_indices(app):
+    """
+    Monta os índices no início do worker (ver gunicorn.conf.py), para que
+    nem a primeira busca de cada worker pague a leitura da tabela inteira.
+    """
+    for nome in FABRICAS:
+        indice = _obter_indice(nome, app)
+        if indice is None:
+            return
+        try:
+            indice.recarregar()
+        except Exception as e:
+            # Fica para a primeira busca
+            print(f"[ERRO] Falha ao montar {nome} no início do worker: {e}")
+
+
+def _atualizar(nome, funcao, valor):
+    # Índice ainda não montado neste worker: a primeira busca já lê do banco
+    indice = _obter_indice(nome, criar=False)
+    if indice is not None:
+        getattr(indice, funcao)(valor)
+
+
+def indexar_aluno(aluno):
+    """Chamar depois do commit de um aluno novo (ou com nome/contato alterado)."""
+    _atualizar("indice_alunos", "adicionar", {campo: aluno[campo] for campo in CAMPOS_ALUNO if campo in aluno})
+
+
+def remover_aluno(id_usuario):
+    _atualizar("indice_alunos", "remover", id_usuario)
+
+
+def indexar_exercicio(exercicio):
+    _atualizar("indice_exercicios", "adicionar", exercicio)
+
+
+def remover_exercicio(id_exercicio):
+    _atualizar("indice_exercicios", "remover", id_exercicio)
@@ -0,0 +1,259 @@
+# app/utils/instrumentacao.py
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import current_app, g, has_request_context, request
+
+from app.utils.rastreamento import CLIENTE, span, span_atual
+
+# Literais e listas viram "?" para que a mesma consulta com valores diferentes
+# tenha a mesma impressão digital
+_LITERAIS = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r"%s|\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),
+    (re.compile(r"(?:\(\?\+\)\s*,\s*)+\(\?\+\)"), "(?+)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def impressao_digital(sql):
+    """SQL normalizado: sem valores, sem espaços repetidos e com IN (...) / VALUES (...) colapsados."""
+    for padrao, troca in _LITERAIS:
+        sql = padrao.sub(troca, sql)
+    return sql.strip().rstrip(";")
+
+
+class EstatisticasSQL:
+    """
+    Agregado por worker, no estilo do pg_stat_statements: para cada (origem,
+    impressão digital) guarda chamadas, tempo total, linhas e as últimas
+    `amostras` durações (de onde sai o p95). A origem é o blueprint da rota.
+
+    Passando de `max_consultas` chaves, as novas entram somadas em "(outras)"
+    para a memória não crescer com SQL montado dinamicamente.
+    """
+
+    OUTRAS = "(outras)"
+
+    def __init__(self, max_consultas=500, amostras=200):
+        self.max_consultas = max_consultas
+        self.amostras = amostras
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._itens = {}  # (origem, sql) -> {"chamadas", "tempo", "linhas", "duracoes"}
+        self.desde = time.time()
+
+    def _item(self, origem, sql):
+        chave = (origem, sql)
+        item = self._itens.get(chave)
+        if item is None:
+            if len(self._itens) >= self.max_consultas:
+                chave = (origem, self.OUTRAS)
+                item = self._itens.get(chave)
+            if item is None:
+                item = {"chamadas": 0, "tempo": 0.0, "linhas": 0, "duracoes": deque(maxlen=self.amostras)}
+                self._itens[chave] = item
+        return item
+
+    def registrar(self, origem, sql, duracao):
+        with self._lock:
+            item = self._item(origem, sql)
+            item["chamadas"] += 1
+            item["tempo"] += duracao
+            item["duracoes"].append(duracao)
+
+    def contar_linhas(self, origem, sql, linhas):
+        with self._lock:
+            self._item(origem, sql)["linhas"] += linhas
+
+    def zerar(self):
+        with self._lock:
+            self._itens.clear()
+            self.desde = time.time()
+
+    def listar(self, ordem="tempo_total_ms", limite=50):
+        """Linhas do agregado (tempos em ms), as mais caras por `ordem` primeiro."""
+        with self._lock:
+            copia = [(chave, dict(item, duracoes=sorted(item["duracoes"]))) for chave, item in self._itens.items()]
+
+        linhas = []
+        for (origem, sql), item in copia:
+            duracoes = item["duracoes"]
+            p95 = duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.95))] if duracoes else 0.0
+            linhas.append({
+                "origem": origem,
+                "sql": sql,
+                "chamadas": item["chamadas"],
+                "tempo_total_ms": round(item["tempo"] * 1000, 2),
+                "tempo_medio_ms": round(item["tempo"] * 1000 / item["chamadas"], 3) if item["chamadas"] else 0.0,
+                "p95_ms": round(p95 * 1000, 3),
+                "linhas": item["linhas"],
+                "linhas_por_chamada": round(item["linhas"] / item["chamadas"], 1) if item["chamadas"] else 0.0,
+            })
+        linhas.sort(key=lambda linha: linha.get(ordem, 0), reverse=True)
+        return linhas[:limite]
+
+
+_estatisticas_lock = threading.Lock()
+
+
+def obter_estatisticas_sql(app=None):
+    app = app or current_app._get_current_object()
+    estatisticas = app.extensions.get("estatisticas_sql")
+    if estatisticas is not None and estatisticas.pid == os.getpid():
+        return estatisticas
+
+    with _estatisticas_lock:
+        estatisticas = app.extensions.get("estatisticas_sql")
+        if estatisticas is None or estatisticas.pid != os.getpid():
+            estatisticas = EstatisticasSQL(
+                max_consultas=app.config.get("SQL_ESTATISTICAS_MAX_CONSULTAS", 500),
+                amostras=app.config.get("SQL_ESTATISTICAS_AMOSTRAS", 200),
+            )
+            app.extensions["estatisticas_sql"] = estatisticas
+        return estatisticas
+
+
+class MetricasRequisicao:
+    """Consultas feitas durante uma requisição (ou app context); repassadas também ao agregado do worker."""
+
+    def __init__(self, estatisticas=None, origem=None):
+        self.estatisticas = estatisticas
+        self.origem = origem
+        self.consultas = 0
+        self.tempo = 0.0
+        self.linhas = 0
+        self.por_sql = Counter()
+        self.ultima = None
+
+    def registrar(self, sql, duracao):
+        self.ultima = impressao_digital(sql)
+        self.consultas += 1
+        self.tempo += duracao
+        self.por_sql[self.ultima] += 1
+        if self.estatisticas is not None:
+            self.estatisticas.registrar(self.origem, self.ultima, duracao)
+
+    def contar_linhas(self, linhas):
+        self.linhas += linhas
+        if self.estatisticas is not None and self.ultima is not None:
+            self.estatisticas.contar_linhas(self.origem, self.ultima, linhas)
+
+    def repetidas(self, limite):
+        """Impressões digitais executadas mais de `limite` vezes: candidatas a N+1."""
+        return [(sql, vezes) for sql, vezes in self.por_sql.most_common() if vezes > limite]
+
+
+class CursorInstrumentado:
+    """
+    Envolve o cursor do PyMySQL medindo cada execute/executemany e contando as
+    linhas lidas. O resto (lastrowid, rowcount, nextset, mogrify...) passa direto.
+    """
+
+    def __init__(self, cursor, metricas):
+        self._cursor = cursor
+        self._metricas = metricas
+
+    def _medir(self, metodo, sql, *args):
+        with span("db.consulta", CLIENTE, **{"db.system": "mysql"}) as atual:
+            inicio = time.perf_counter()
+            try:
+                return metodo(sql, *args)
+            finally:
+                self._metricas.registrar(sql, time.perf_counter() - inicio)
+                if atual is not None:
+                    atual.definir(**{"db.statement": self._metricas.ultima})
+
+    def execute(self, sql, *args):
+        return self._medir(self._cursor.execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._medir(self._cursor.executemany, sql, *args)
+
+    def _lidas(self, linhas):
+        if linhas is not None:
+            self._metricas.contar_linhas(len(linhas) if isinstance(linhas, (list, tuple)) else 1)
+        return linhas
+
+    def fetchone(self):
+        return self._lidas(self._cursor.fetchone())
+
+    def fetchmany(self, *args):
+        return self._lidas(self._cursor.fetchmany(*args))
+
+    def fetchall(self):
+        return self._lidas(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+
+def obter_metricas():
+    """Métricas do contexto atual, ou None com SQL_INSTRUMENTACAO_ATIVA desligada."""
+    if not current_app.config.get("SQL_INSTRUMENTACAO_ATIVA", True):
+        return None
+    metricas = g.get("_metricas_sql")
+    if metricas is None:
+        # Fora de requisição: threads de fundo (logs, fila de envios) e comandos flask
+        origem = (request.blueprint or "app") if has_request_context() else "fundo"
+        metricas = g._metricas_sql = MetricasRequisicao(obter_estatisticas_sql(), origem)
+    return metricas
+
+
+# ===============================
+# Saída por requisição: Server-Timing + linha de log
+# ===============================
+def marcar_inicio():
+    g._inicio_requisicao = time.perf_counter()
+
+
+def emitir_metricas(response):
+    metricas = g.get("_metricas_sql")
+    if metricas is None:
+        return response
+
+    total_ms = (time.perf_counter() - g.get("_inicio_requisicao", time.perf_counter())) * 1000
+    db_ms = metricas.tempo * 1000
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={db_ms:.1f};desc="{metricas.consultas} consultas, {metricas.linhas} linhas", app;dur={total_ms:.1f}'
+    )
+
+    limite = current_app.config.get("SQL_LIMITE_REPETICOES", 5)
+    repetidas = metricas.repetidas(limite)
+    registro = {
+        "metodo": request.method,
+        "rota": request.url_rule.rule if request.url_rule else request.path,
+        "status": response.status_code,
+        "consultas": metricas.consultas,
+        "db_ms": round(db_ms, 1),
+        "total_ms": round(total_ms, 1),
+        "linhas": metricas.linhas,
+        "n_mais_1": [{"sql": sql, "vezes": vezes} for sql, vezes in repetidas],
+    }
+    if span_atual() is not None:
+        registro["trace_id"] = span_atual().rastro.trace_id
+    if repetidas or current_app.config.get("SQL_LOG_REQUISICOES", True):
+        print(f"[SQL{' N+1' if repetidas else ''}] {json.dumps(registro, ensure_ascii=False)}")
+    return response
+
+
+def init_instrumentacao(app):
+    app.before_request(marcar_inicio)
+    app.after_request(emitir_metricas)
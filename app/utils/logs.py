@@ -1,22 +1,158 @@
 # app/utils/logs.py
 
+import atexit
+import os
+import threading
+from collections import deque
 from datetime import datetime
-from app.extensions.db import get_db
+
+from flask import current_app
+from app.extensions.db import get_db, inserir_em_lote
+from app.utils.metricas import LOGS_DESCARTADOS, LOGS_PENDENTES
+
+# Colunas de cada tipo de log; cada flush grava um INSERT multi-linha por tipo.
+# tipo_log segue como valor: o executemany do PyMySQL só junta as linhas num
+# único INSERT quando o VALUES (...) tem apenas marcadores.
+COLUNAS_LOGS = {
+    "envio": ("tipo_log", "id_usuario", "tipo_envio", "destino", "conteudo", "status", "data_envio"),
+    "acao": ("tipo_log", "usuario_origem", "acao", "detalhes", "data"),
+}
+
+
+class BufferLogs:
+    """
+    Acumula as linhas de log em memória e grava em lote numa thread própria.
+
+    O flush acontece quando há `tamanho_lote` linhas pendentes, a cada
+    `intervalo_ms` e no encerramento do processo (atexit). A fila é limitada
+    a `capacidade` linhas; cheia, a política decide:
+    - "descartar": a linha nova é descartada (e contada em `descartadas`);
+    - "bloquear": quem loga espera até `tempo_bloqueio_ms` por espaço antes de descartar.
+    """
+
+    def __init__(self, app, tamanho_lote=200, intervalo_ms=500, capacidade=10000,
+                 politica="descartar", tempo_bloqueio_ms=50):
+        self.app = app
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo_ms / 1000
+        self.capacidade = capacidade
+        self.politica = politica
+        self.tempo_bloqueio = tempo_bloqueio_ms / 1000
+        self.pid = os.getpid()
+
+        self.descartadas = 0
+        self.gravadas = 0
+        self._linhas = deque()
+        self._lock = threading.Lock()
+        self._pronto = threading.Condition(self._lock)
+        self._espaco = threading.Condition(self._lock)
+        self._parar = False
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name="buffer-logs", daemon=True)
+        self._thread.start()
+        atexit.register(self.encerrar)
+
+    def adicionar(self, tipo, linha):
+        with self._lock:
+            if len(self._linhas) >= self.capacidade:
+                if self.politica == "bloquear":
+                    self._pronto.notify()
+                    self._espaco.wait_for(lambda: len(self._linhas) < self.capacidade, self.tempo_bloqueio)
+                if len(self._linhas) >= self.capacidade:
+                    self.descartadas += 1
+                    LOGS_DESCARTADOS.inc()
+                    return False
+            self._linhas.append((tipo, linha))
+            LOGS_PENDENTES.set(len(self._linhas))
+            if len(self._linhas) >= self.tamanho_lote:
+                self._pronto.notify()
+        return True
+
+    def _executar(self):
+        while not self._parar:
+            with self._lock:
+                self._pronto.wait_for(lambda: len(self._linhas) >= self.tamanho_lote or self._parar, self.intervalo)
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava tudo o que está pendente. Retorna o número de linhas gravadas."""
+        with self._lock:
+            if not self._linhas:
+                return 0
+            lote = list(self._linhas)
+            self._linhas.clear()
+            LOGS_PENDENTES.set(0)
+            self._espaco.notify_all()
+
+        por_tipo = {}
+        for tipo, linha in lote:
+            por_tipo.setdefault(tipo, []).append(linha)
+
+        try:
+            with self.app.app_context():
+                db = get_db()
+                with db.cursor() as cursor:
+                    for tipo, linhas in por_tipo.items():
+                        inserir_em_lote(cursor, "logs", COLUNAS_LOGS[tipo], [(tipo, *linha) for linha in linhas])
+                db.commit()
+        except Exception as e:
+            print(f"[ERRO] Falha ao gravar {len(lote)} log(s): {e}")
+            with self._lock:
+                self.descartadas += len(lote)
+            LOGS_DESCARTADOS.inc(len(lote))
+            return 0
+
+        with self._lock:
+            self.gravadas += len(lote)
+        return len(lote)
+
+    def encerrar(self):
+        self._parar = True
+        with self._lock:
+            self._pronto.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.intervalo + 5)
+        self.descarregar()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "pendentes": len(self._linhas),
+                "capacidade": self.capacidade,
+                "gravadas": self.gravadas,
+                "descartadas": self.descartadas,
+            }
+
+
+_buffer_lock = threading.Lock()
+
+
+def obter_buffer_logs(app=None):
+    app = app or current_app._get_current_object()
+    buffer = app.extensions.get("buffer_logs")
+    if buffer is not None and buffer.pid == os.getpid():
+        return buffer
+
+    with _buffer_lock:
+        buffer = app.extensions.get("buffer_logs")
+        if buffer is None or buffer.pid != os.getpid():
+            buffer = BufferLogs(
+                app,
+                tamanho_lote=app.config.get("LOGS_TAMANHO_LOTE", 200),
+                intervalo_ms=app.config.get("LOGS_INTERVALO_MS", 500),
+                capacidade=app.config.get("LOGS_CAPACIDADE", 10000),
+                politica=app.config.get("LOGS_POLITICA", "descartar"),
+                tempo_bloqueio_ms=app.config.get("LOGS_TEMPO_BLOQUEIO_MS", 50),
+            )
+            buffer.iniciar()
+            app.extensions["buffer_logs"] = buffer
+        return buffer
+
 
 def registrar_log_envio(id_usuario, tipo_envio, destino, conteudo, status):
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO logs (id_usuario, tipo_log, tipo_envio, destino, conteudo, status, data_envio)
-            VALUES (%s, 'envio', %s, %s, %s, %s, %s)
-        """, (id_usuario, tipo_envio, destino, conteudo, status, datetime.now()))
-        db.commit()
+    obter_buffer_logs().adicionar("envio", (id_usuario, tipo_envio, destino, conteudo, status, datetime.now()))
 
 def registrar_log_acao(usuario_origem, acao, detalhes=""):
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO logs (tipo_log, usuario_origem, acao, detalhes, data)
-            VALUES ('acao', %s, %s, %s, %s)
-        """, (usuario_origem, acao, detalhes, datetime.now()))
-        db.commit()
+    obter_buffer_logs().adicionar("acao", (usuario_origem, acao, detalhes, datetime.now()))
@@ -0,0 +1,109 @@
+# app/utils/metricas.py
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# Métricas no formato do Prometheus, expostas em /metrics.
+#
+# Com PROMETHEUS_MULTIPROC_DIR definido (ver gunicorn.conf.py) cada worker
+# grava os seus valores em arquivos mmap nessa pasta e o /metrics, atendido
+# por qualquer worker, soma todos. Sem ela (flask run, testes) vale o registro
+# em memória do próprio processo.
+
+_BUCKETS_HTTP = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BUCKETS_ESPERA = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+REQUISICOES = Counter(
+    "alpphas_http_requisicoes_total", "Requisições atendidas.",
+    ["blueprint", "endpoint", "metodo", "status"],
+)
+DURACAO_REQUISICAO = Histogram(
+    "alpphas_http_requisicao_duracao_segundos", "Tempo até o handler devolver a resposta.",
+    ["blueprint", "endpoint", "metodo"], buckets=_BUCKETS_HTTP,
+)
+ESPERA_POOL = Histogram(
+    "alpphas_db_pool_espera_segundos", "Espera por uma conexão livre no pool do banco.",
+    buckets=_BUCKETS_ESPERA,
+)
+DURACAO_PDF = Histogram(
+    "alpphas_pdf_duracao_segundos", "Renderização de PDFs por tipo de documento.",
+    ["documento"], buckets=_BUCKETS_HTTP,
+)
+DURACAO_ENVIO = Histogram(
+    "alpphas_envio_duracao_segundos", "Chamadas ao SMTP e ao UltraMsg.",
+    ["canal"], buckets=_BUCKETS_HTTP,
+)
+FALHAS_ENVIO = Counter(
+    "alpphas_envio_falhas_total", "Chamadas ao SMTP e ao UltraMsg que falharam.",
+    ["canal"],
+)
+LOGS_PENDENTES = Gauge(
+    "alpphas_logs_buffer_pendentes", "Linhas de log aguardando gravação no banco.",
+    multiprocess_mode="livesum",
+)
+LOGS_DESCARTADOS = Counter(
+    "alpphas_logs_descartados_total", "Linhas de log descartadas (buffer cheio ou falha ao gravar).",
+)
+
+
+@contextmanager
+def medir(histograma, falhas=None, **rotulos):
+    """Observa a duração do bloco; com `falhas`, conta também as exceções que escaparem dele."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if falhas is not None:
+            (falhas.labels(**rotulos) if rotulos else falhas).inc()
+        raise
+    finally:
+        (histograma.labels(**rotulos) if rotulos else histograma).observe(time.perf_counter() - inicio)
+
+
+# ===============================
+# Requisições HTTP e endpoint /metrics
+# ===============================
+def _marcar_inicio():
+    g._inicio_metricas = time.perf_counter()
+
+
+def _observar_requisicao(response):
+    inicio = g.get("_inicio_metricas")
+    if inicio is None:
+        return response
+    rotulos = {
+        "blueprint": request.blueprint or "app",
+        "endpoint": request.endpoint or "(sem rota)",
+        "metodo": request.method,
+    }
+    DURACAO_REQUISICAO.labels(**rotulos).observe(time.perf_counter() - inicio)
+    REQUISICOES.labels(status=str(response.status_code), **rotulos).inc()
+    return response
+
+
+def exportar_metricas():
+    token = current_app.config.get("METRICAS_TOKEN")
+    if token:
+        enviado = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(enviado, token):
+            return Response("Acesso negado\n", status=403, mimetype="text/plain")
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return Response(generate_latest(registro), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metricas(app):
+    app.before_request(_marcar_inicio)
+    app.after_request(_observar_requisicao)
+    app.add_url_rule("/metrics", "metricas", exportar_metricas, methods=["GET"])
@@ -0,0 +1,164 @@
+# app/utils/migracoes.py
+
+import importlib.util
+import os
+import re
+from collections import namedtuple
+
+# Arquivos numerados em app/migracoes/: 0001_esquema_inicial.sql, 0002_....py
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migracoes")
+TABELA_VERSOES = "schema_versoes"
+NOME_LOCK = "alpphas_gym_migracoes"
+
+Migracao = namedtuple("Migracao", "versao nome caminho")
+
+_PADRAO_ARQUIVO = re.compile(r"^(\d+)_(\w+)\.(sql|py)$")
+
+
+def listar_migracoes(pasta=PASTA_MIGRACOES):
+    """Migrações da pasta em ordem de versão. Duas com o mesmo número é erro."""
+    migracoes = {}
+    for arquivo in sorted(os.listdir(pasta)):
+        encontrado = _PADRAO_ARQUIVO.match(arquivo)
+        if not encontrado:
+            continue
+        versao = int(encontrado.group(1))
+        if versao in migracoes:
+            raise ValueError(f"Versão {versao} repetida: {migracoes[versao].nome} e {arquivo}")
+        migracoes[versao] = Migracao(versao, arquivo, os.path.join(pasta, arquivo))
+    return [migracoes[versao] for versao in sorted(migracoes)]
+
+
+def dividir_sql(texto):
+    """
+    Quebra um script em comandos: um comando termina em ';' no fim da linha.
+    Linhas de comentário (--) são descartadas.
+    """
+    comandos, atual = [], []
+    for linha in texto.splitlines():
+        if linha.strip().startswith("--"):
+            continue
+        atual.append(linha)
+        if linha.rstrip().endswith(";"):
+            comando = "\n".join(atual).strip().rstrip(";").strip()
+            if comando:
+                comandos.append(comando)
+            atual = []
+    resto = "\n".join(atual).strip()
+    if resto:
+        comandos.append(resto)
+    return comandos
+
+
+# ===============================
+# Utilitários para migrações em Python
+# ===============================
+def coluna_existe(cursor, tabela, coluna):
+    cursor.execute("""
+        SELECT COUNT(*) AS total FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (tabela, coluna))
+    return cursor.fetchone()["total"] > 0
+
+
+def indice_existe(cursor, tabela, indice):
+    cursor.execute("""
+        SELECT COUNT(*) AS total FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (tabela, indice))
+    return cursor.fetchone()["total"] > 0
+
+
+def adicionar_coluna(cursor, tabela, coluna, definicao):
+    """ALTER TABLE ... ADD COLUMN só se a coluna ainda não existir. Retorna se criou."""
+    if coluna_existe(cursor, tabela, coluna):
+        return False
+    cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+    return True
+
+
+def adicionar_indice(cursor, tabela, indice, colunas, tipo="INDEX"):
+    """
+    ALTER TABLE ... ADD <tipo> só se o índice ainda não existir. `colunas` é o
+    que vem depois do nome, ex.: "(id_aluno, data_avaliacao)". Retorna se criou.
+    """
+    if indice_existe(cursor, tabela, indice):
+        return False
+    cursor.execute(f"ALTER TABLE {tabela} ADD {tipo} {indice} {colunas}")
+    return True
+
+
+# ===============================
+# Execução
+# ===============================
+def versoes_aplicadas(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_VERSOES} (
+            versao INT PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"SELECT versao FROM {TABELA_VERSOES}")
+    return {linha["versao"] for linha in cursor.fetchall()}
+
+
+def _executar(cursor, migracao):
+    if migracao.caminho.endswith(".sql"):
+        with open(migracao.caminho, encoding="utf-8") as arquivo:
+            for comando in dividir_sql(arquivo.read()):
+                cursor.execute(comando)
+        return
+
+    spec = importlib.util.spec_from_file_location(f"migracao_{migracao.versao:04d}", migracao.caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.aplicar(cursor)
+
+
+def pendentes(db, pasta=PASTA_MIGRACOES):
+    with db.cursor() as cursor:
+        aplicadas = versoes_aplicadas(cursor)
+    db.commit()
+    return [m for m in listar_migracoes(pasta) if m.versao not in aplicadas]
+
+
+def aplicar_migracoes(db, alvo=None, pasta=PASTA_MIGRACOES):
+    """
+    Aplica, em ordem, as migrações ainda não registradas em schema_versoes
+    (até a versão `alvo`, se informada) e retorna as que foram aplicadas.
+
+    Cada migração é confirmada junto com o seu registro. DDL no MySQL faz
+    commit implícito, então uma migração que falhe no meio não é desfeita:
+    escreva-as idempotentes (IF NOT EXISTS, adicionar_coluna/adicionar_indice)
+    para que rodar de novo depois da correção seja seguro. Um GET_LOCK impede
+    que dois deploys simultâneos migrem o mesmo banco.
+    """
+    with db.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, 60) AS obtido", (NOME_LOCK,))
+        if not cursor.fetchone()["obtido"]:
+            raise RuntimeError("Outro processo está aplicando migrações neste banco")
+
+    aplicadas = []
+    try:
+        for migracao in pendentes(db, pasta):
+            if alvo is not None and migracao.versao > alvo:
+                break
+            try:
+                with db.cursor() as cursor:
+                    _executar(cursor, migracao)
+                    cursor.execute(
+                        f"INSERT INTO {TABELA_VERSOES} (versao, nome) VALUES (%s, %s)",
+                        (migracao.versao, migracao.nome)
+                    )
+                db.commit()
+            except Exception as e:
+                print(f"[ERRO MIGRACAO {migracao.nome}]", e)
+                db.rollback()
+                raise
+            aplicadas.append(migracao)
+    finally:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOME_LOCK,))
+        db.commit()
+    return aplicadas
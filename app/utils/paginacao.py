@@ -0,0 +1,104 @@
+# app/utils/paginacao.py
+
+import base64
+import json
+
+from flask import current_app, request
+from werkzeug.exceptions import BadRequest
+
+MARCADOR = "{apos_cursor}"
+
+
+class ErroPaginacao(BadRequest):
+    """`limit` ou `cursor` inválido: vira 400 pelo handler de HTTPException."""
+
+
+def codificar_cursor(valores):
+    texto = json.dumps(valores, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor, quantidade):
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        valores = json.loads(texto)
+    except (ValueError, UnicodeDecodeError):
+        raise ErroPaginacao("Cursor de paginação inválido")
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise ErroPaginacao("Cursor de paginação inválido")
+    return valores
+
+
+class Paginacao:
+    """
+    Paginação por keyset compartilhada pelas rotas de listagem.
+
+    `ordem` é a lista de (expressão SQL, campo no resultado, "ASC"/"DESC");
+    a última chave precisa ser única (normalmente o id) para a ordem ser
+    estável. O SQL recebe o marcador `{apos_cursor}` dentro do WHERE, depois
+    de todos os outros parâmetros, e não deve ter ORDER BY nem LIMIT:
+
+        WHERE a.id_aluno = %s AND {apos_cursor}
+
+    Sem `?limit=` nem `?cursor=` na requisição, a rota devolve a lista
+    completa como antes. Com eles, devolve {"itens": [...], "next_cursor": ...},
+    em que `next_cursor` é None na última página.
+    """
+
+    def __init__(self, ordem, limite=None, cursor=None):
+        self.ordem = ordem
+        self.limite = limite
+        self.posicao = decodificar_cursor(cursor, len(ordem)) if cursor else None
+
+    @classmethod
+    def da_requisicao(cls, ordem):
+        limite = request.args.get("limit")
+        cursor = request.args.get("cursor") or None
+        if limite is None and cursor is None:
+            return cls(ordem)
+
+        maximo = current_app.config.get("PAGINACAO_LIMITE_MAXIMO", 200)
+        if limite is None:
+            limite = current_app.config.get("PAGINACAO_LIMITE_PADRAO", 50)
+        try:
+            limite = int(limite)
+        except (TypeError, ValueError):
+            raise ErroPaginacao("Parâmetro limit inválido")
+        if limite < 1:
+            raise ErroPaginacao("Parâmetro limit inválido")
+        return cls(ordem, min(limite, maximo), cursor)
+
+    @property
+    def ativa(self):
+        return self.limite is not None
+
+    def _condicao(self):
+        """(c1 < v1) OR (c1 = v1 AND c2 < v2) ... respeitando a direção de cada chave."""
+        if self.posicao is None:
+            return "TRUE", []
+        termos, params = [], []
+        for i, (expressao, _, direcao) in enumerate(self.ordem):
+            iguais = [f"{e} = %s" for e, _, _ in self.ordem[:i]]
+            operador = "<" if direcao.upper() == "DESC" else ">"
+            termos.append("(" + " AND ".join(iguais + [f"{expressao} {operador} %s"]) + ")")
+            params.extend(self.posicao[:i] + [self.posicao[i]])
+        return "(" + " OR ".join(termos) + ")", params
+
+    def executar(self, cursor, sql, params=()):
+        condicao, params_cursor = self._condicao()
+        ordem_sql = ", ".join(f"{expressao} {direcao}" for expressao, _, direcao in self.ordem)
+        sql = f"{sql.replace(MARCADOR, condicao)} ORDER BY {ordem_sql}"
+        params = tuple(params) + tuple(params_cursor)
+
+        if not self.ativa:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+        # Uma linha a mais só para saber se existe próxima página
+        cursor.execute(f"{sql} LIMIT %s", params + (self.limite + 1,))
+        itens = list(cursor.fetchall())
+        proximo = None
+        if len(itens) > self.limite:
+            itens = itens[:self.limite]
+            proximo = codificar_cursor([itens[-1][campo] for _, campo, _ in self.ordem])
+        return {"itens": itens, "next_cursor": proximo}
@@ -0,0 +1,164 @@
+# app/utils/pdf_base.py
+
+import copy
+import os
+import time
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib.colors import Color
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader, _digester
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+
+from app.utils.metricas import DURACAO_PDF
+from app.utils.texto import normalizar_nome
+
+LOGO_PATH = os.path.join("app", "static", "img", "alpphas_logo.png")
+PASTA_PDFS = os.path.join("app", "static", "pdfs")
+
+
+# =========================================
+# Cache de imagens decodificadas (por processo)
+# =========================================
+@lru_cache(maxsize=None)
+def carregar_imagem(caminho):
+    """ImageReader com o arquivo lido uma única vez por processo."""
+    with open(caminho, "rb") as f:
+        leitor = ImageReader(BytesIO(f.read()))
+    leitor.getRGBData()  # decodifica agora; o ImageReader guarda o resultado
+    return leitor
+
+
+# O XObject compartilhado depende de internals do ReportLab (_digester,
+# PDFImageXObject, c._doc, c._code): por isso a versão fica fixa em
+# requirements.txt e tests/test_pdf_base.py falha se eles mudarem. Pelo
+# drawImage() público cada documento recomprime o logo (~15x mais lento).
+@lru_cache(maxsize=None)
+def _xobject_imagem(caminho):
+    """
+    XObject da imagem já decodificado e comprimido, pronto para ser copiado
+    para cada documento. É o que o ReportLab refaria a cada drawImage().
+    """
+    leitor = carregar_imagem(caminho)
+    mascara = leitor._dataA.getRGBData() if leitor._dataA else b"auto"
+    nome = _digester(leitor.getRGBData() + mascara)
+    modelo = pdfdoc.PDFImageXObject(nome, leitor, mask="auto")
+    modelo.name = nome
+    return modelo, getattr(modelo, "_smask", None)
+
+
+def _registrar_imagem(c, caminho):
+    modelo, smask_modelo = _xobject_imagem(caminho)
+    nome_reg = c._doc.getXObjectName(modelo.name)
+    if c._doc.idToObject.get(nome_reg) is None:
+        imagem = copy.copy(modelo)
+        imagem.__dict__.pop("_smask", None)
+        c._setXObjects(imagem)
+        c._doc.Reference(imagem, nome_reg)
+        c._doc.addForm(modelo.name, imagem)
+        if smask_modelo is not None:
+            smask = copy.copy(smask_modelo)
+            c._setXObjects(smask)
+            imagem.smask = c._doc.Reference(smask, c._doc.getXObjectName(smask.name))
+    return nome_reg, modelo.name
+
+
+def desenhar_imagem(c, caminho, x, y, largura, altura):
+    """Equivalente a c.drawImage(..., mask='auto') reaproveitando o XObject em cache."""
+    try:
+        nome_reg, nome = _registrar_imagem(c, caminho)
+    except AttributeError as e:
+        # Internals do ReportLab mudaram: cai para a API pública com o leitor em cache
+        print(f"[ERRO] XObject em cache indisponível nesta versão do ReportLab, usando drawImage: {e}")
+        c.drawImage(carregar_imagem(caminho), x, y, width=largura, height=altura, mask="auto")
+        return
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.translate(x, y)
+    c.scale(largura, altura)
+    c._code.append(f"/{nome_reg} Do")
+    c.restoreState()
+    c._formsinuse.append(nome)
+
+
+# =========================================
+# Documento padrão Alpphas (marca d'água + cabeçalho + paginação)
+# =========================================
+class DocumentoPDF:
+    margem_inferior = 100
+
+    def __init__(self, titulo, linhas_cabecalho):
+        # Rótulo da métrica de renderização: "Ficha de Treino" -> "ficha_de_treino"
+        self.documento = normalizar_nome(titulo).replace(" ", "_")
+        self.inicio = time.perf_counter()
+        self.buffer = BytesIO()
+        self.c = canvas.Canvas(self.buffer, pagesize=A4)
+        self.width, self.height = A4
+        self.topo = self.height - 80
+
+        self._desenhar_marca_dagua()
+        self.y = self._desenhar_cabecalho(titulo, linhas_cabecalho)
+
+    def _desenhar_marca_dagua(self):
+        # Logo central e transparente
+        try:
+            self.c.saveState()
+            self.c.translate(self.width / 2, self.height / 2)
+            self.c.setFillColor(Color(0.7, 0.7, 0.7, alpha=0.08))
+            desenhar_imagem(self.c, LOGO_PATH, -200, -200, 400, 400)
+        except Exception as e:
+            print(f"Erro ao carregar logo transparente: {e}")
+        finally:
+            self.c.restoreState()
+
+    def _desenhar_cabecalho(self, titulo, linhas_cabecalho):
+        # Logo no canto superior esquerdo
+        try:
+            desenhar_imagem(self.c, LOGO_PATH, 40, self.height - 80, 60, 60)
+        except Exception as e:
+            print(f"Erro ao carregar logo: {e}")
+
+        # Dados do profissional
+        self.c.setFont("Helvetica", 10)
+        y_dados = self.height - 50
+        for i, linha in enumerate(linhas_cabecalho):
+            if i:
+                y_dados -= 15
+            self.c.drawString(120, y_dados, linha)
+
+        # Linha horizontal e título
+        linha_y = y_dados - 10
+        self.c.setLineWidth(1)
+        self.c.line(40, linha_y, self.width - 40, linha_y)
+        self.c.setFont("Helvetica-Bold", 16)
+        self.c.drawCentredString(self.width / 2, linha_y - 30, titulo)
+
+        return linha_y - 60
+
+    def nova_pagina(self):
+        self.c.showPage()
+        self.y = self.topo
+
+    def garantir_espaco(self):
+        if self.y < self.margem_inferior:
+            self.nova_pagina()
+
+    def texto(self, x, texto, fonte="Helvetica", tamanho=10, avanco=0):
+        self.c.setFont(fonte, tamanho)
+        self.c.drawString(x, self.y, texto)
+        self.y -= avanco
+
+    def finalizar(self, nome_arquivo="documento_temp.pdf", salvar_em_disco=False):
+        self.c.save()
+        self.buffer.seek(0)
+        DURACAO_PDF.labels(documento=self.documento).observe(time.perf_counter() - self.inicio)
+
+        if salvar_em_disco:
+            caminho = os.path.join(PASTA_PDFS, nome_arquivo)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, "wb") as f:
+                f.write(self.buffer.getbuffer())
+            return caminho
+        return self.buffer
@@ -0,0 +1,195 @@
+# app/utils/pdf_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from io import BytesIO
+
+from flask import current_app, send_file
+
+from app.utils.pdf_base import PASTA_PDFS
+
+
+def chave_pdf(tipo, dados):
+    """Hash do tipo de documento + dicionário usado na renderização."""
+    conteudo = json.dumps({"tipo": tipo, "dados": dados}, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CachePDF:
+    """
+    Cache LRU de PDFs já renderizados, limitado pelo total de bytes.
+
+    A chave é o hash dos dados de entrada: se as linhas do banco mudam, a
+    chave muda e o PDF antigo simplesmente deixa de ser usado até ser
+    despejado. Com `pasta_disco`, os PDFs despejados da memória são gravados
+    em disco (até `limite_bytes_disco`) e promovidos de volta num acerto.
+    """
+
+    def __init__(self, limite_bytes=64 * 1024 * 1024, pasta_disco=None, limite_bytes_disco=256 * 1024 * 1024):
+        self.limite_bytes = limite_bytes
+        self.pasta_disco = pasta_disco
+        self.limite_bytes_disco = limite_bytes_disco
+        self.pid = os.getpid()
+
+        self._itens = OrderedDict()  # chave -> (conteudo, gerado_em)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item
+
+        item = self._ler_disco(chave)
+        with self._lock:
+            if item is None:
+                self.faltas += 1
+                return None
+            self.acertos += 1
+        self.guardar(chave, *item)
+        return item
+
+    def guardar(self, chave, conteudo, gerado_em=None):
+        gerado_em = gerado_em or time.time()
+        if len(conteudo) > self.limite_bytes:
+            self._gravar_disco(chave, conteudo)
+            return
+
+        despejados = []
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._total_bytes -= len(antigo[0])
+            self._itens[chave] = (conteudo, gerado_em)
+            self._total_bytes += len(conteudo)
+
+            while self._total_bytes > self.limite_bytes:
+                chave_antiga, (dados, _) = self._itens.popitem(last=False)
+                self._total_bytes -= len(dados)
+                despejados.append((chave_antiga, dados))
+
+        for chave_antiga, dados in despejados:
+            self._gravar_disco(chave_antiga, dados)
+
+    def obter_ou_gerar(self, tipo, dados, gerar):
+        """Retorna (conteudo, chave, gerado_em), renderizando só em caso de falta."""
+        chave = chave_pdf(tipo, dados)
+        item = self.obter(chave)
+        if item is None:
+            conteudo = gerar(dados).getvalue()
+            item = (conteudo, time.time())
+            self.guardar(chave, *item)
+        return item[0], chave, item[1]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._total_bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": self._total_bytes,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+            }
+
+    # ----- disco -----
+    def _caminho(self, chave):
+        return os.path.join(self.pasta_disco, f"{chave}.pdf")
+
+    def _ler_disco(self, chave):
+        if not self.pasta_disco:
+            return None
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            return conteudo, os.path.getmtime(caminho)
+        except OSError:
+            return None
+
+    def _gravar_disco(self, chave, conteudo):
+        if not self.pasta_disco:
+            return
+        try:
+            os.makedirs(self.pasta_disco, exist_ok=True)
+            temporario = self._caminho(chave) + ".tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, self._caminho(chave))
+            self._podar_disco()
+        except OSError as e:
+            print(f"[ERRO] Falha ao gravar PDF em cache no disco: {e}")
+
+    def _podar_disco(self):
+        arquivos = []
+        for nome in os.listdir(self.pasta_disco):
+            if nome.endswith(".pdf"):
+                caminho = os.path.join(self.pasta_disco, nome)
+                info = os.stat(caminho)
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+            except OSError:
+                pass
+
+
+_cache_lock = threading.Lock()
+
+
+def obter_cache_pdf(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("pdf_cache")
+    if cache is not None and cache.pid == os.getpid():
+        return cache
+
+    with _cache_lock:
+        cache = app.extensions.get("pdf_cache")
+        if cache is None or cache.pid != os.getpid():
+            cache = CachePDF(
+                limite_bytes=app.config.get("PDF_CACHE_LIMITE_BYTES", 64 * 1024 * 1024),
+                pasta_disco=os.path.join(PASTA_PDFS, "cache") if app.config.get("PDF_CACHE_DISCO") else None,
+                limite_bytes_disco=app.config.get("PDF_CACHE_LIMITE_BYTES_DISCO", 256 * 1024 * 1024),
+            )
+            app.extensions["pdf_cache"] = cache
+        return cache
+
+
+def responder_pdf(tipo, dados, gerar, download_name):
+    """
+    Envia o PDF (do cache ou recém-gerado) com ETag/Last-Modified.
+    Um `If-None-Match` ou `If-Modified-Since` válido recebe 304 sem corpo.
+    """
+    conteudo, chave, gerado_em = obter_cache_pdf().obter_ou_gerar(tipo, dados, gerar)
+    resposta = send_file(
+        BytesIO(conteudo),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=download_name,
+        etag=chave,
+        last_modified=datetime.fromtimestamp(gerado_em, timezone.utc),
+        max_age=0,
+        conditional=True,
+    )
+    # Documento do aluno: só o navegador pode guardar, sempre revalidando
+    resposta.cache_control.private = True
+    return resposta
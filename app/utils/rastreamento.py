@@ -0,0 +1,283 @@
+# app/utils/rastreamento.py
+
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+
+# Tipos de span do OTLP (SpanKind)
+INTERNO, SERVIDOR, CLIENTE, PRODUTOR, CONSUMIDOR = 1, 2, 3, 4, 5
+STATUS_OK, STATUS_ERRO = 1, 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+
+
+def ler_traceparent(valor):
+    """Header W3C `traceparent` -> (trace_id, span_id, amostrado), ou None se inválido."""
+    encontrado = _TRACEPARENT.match((valor or "").strip().lower())
+    if not encontrado:
+        return None
+    trace_id, span_id, flags = encontrado.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def _atributo_otlp(chave, valor):
+    if isinstance(valor, bool):
+        return {"key": chave, "value": {"boolValue": valor}}
+    if isinstance(valor, int):
+        return {"key": chave, "value": {"intValue": str(valor)}}
+    if isinstance(valor, float):
+        return {"key": chave, "value": {"doubleValue": valor}}
+    return {"key": chave, "value": {"stringValue": str(valor)}}
+
+
+class Rastro:
+    """Um trace: os spans encerrados ficam aqui até a raiz terminar e o trace ser exportado."""
+
+    def __init__(self, trace_id, amostrado, exportador):
+        self.trace_id = trace_id
+        self.amostrado = amostrado
+        self.exportador = exportador
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def guardar(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    def __init__(self, rastro, nome, pai_id=None, tipo=INTERNO, atributos=None, links=()):
+        self.rastro = rastro
+        self.nome = nome
+        self.span_id = os.urandom(8).hex()
+        self.pai_id = pai_id
+        self.tipo = tipo
+        self.atributos = dict(atributos or {})
+        self.links = list(links)
+        self.status = None
+        self.inicio = time.time_ns()
+        self.fim = None
+        self.anterior = None  # token do contextvar, só na raiz
+
+    @property
+    def traceparent(self):
+        return f"00-{self.rastro.trace_id}-{self.span_id}-{'01' if self.rastro.amostrado else '00'}"
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def registrar_erro(self, erro):
+        self.status = {"code": STATUS_ERRO, "message": str(erro)[:500]}
+        self.atributos["exception.type"] = type(erro).__name__
+
+    def encerrar(self):
+        if self.fim is not None:
+            return
+        self.fim = time.time_ns()
+        if self.rastro.amostrado:
+            self.rastro.guardar(self)
+
+    def para_otlp(self):
+        span = {
+            "traceId": self.rastro.trace_id,
+            "spanId": self.span_id,
+            "name": self.nome,
+            "kind": self.tipo,
+            "startTimeUnixNano": str(self.inicio),
+            "endTimeUnixNano": str(self.fim),
+            "attributes": [_atributo_otlp(chave, valor) for chave, valor in self.atributos.items()],
+            "status": self.status or {"code": STATUS_OK},
+        }
+        if self.pai_id:
+            span["parentSpanId"] = self.pai_id
+        if self.links:
+            span["links"] = [{"traceId": trace_id, "spanId": span_id} for trace_id, span_id in self.links]
+        return span
+
+
+# ===============================
+# Exportação: uma linha JSON (OTLP/JSON) por trace
+# ===============================
+class ExportadorJSONL:
+    """
+    Acrescenta cada trace terminado ao arquivo como um ExportTraceServiceRequest
+    em JSON, uma linha por trace (formato lido pelo receptor OTLP/JSON do
+    OpenTelemetry Collector). O arquivo é reaberto a cada escrita, então
+    pode ser rotacionado por fora.
+    """
+
+    def __init__(self, caminho, servico="alpphas-gym-backend"):
+        self.caminho = caminho
+        self.servico = servico
+        self.pid = os.getpid()
+        self.exportados = 0
+        self._lock = threading.Lock()
+
+    def exportar(self, spans):
+        if not spans:
+            return
+        linha = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [
+                _atributo_otlp("service.name", self.servico),
+                _atributo_otlp("process.pid", os.getpid()),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [span.para_otlp() for span in spans],
+            }],
+        }]}, ensure_ascii=False)
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+                with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(linha + "\n")
+                self.exportados += 1
+        except OSError as e:
+            print(f"[ERRO] Falha ao gravar trace em {self.caminho}: {e}")
+
+
+_exportador_lock = threading.Lock()
+
+
+def obter_exportador(app=None):
+    """Exportador deste worker, ou None com RASTREAMENTO_ATIVO desligado."""
+    app = app or current_app._get_current_object()
+    if not app.config.get("RASTREAMENTO_ATIVO", False):
+        return None
+    exportador = app.extensions.get("rastreamento")
+    if exportador is not None and exportador.pid == os.getpid():
+        return exportador
+
+    with _exportador_lock:
+        exportador = app.extensions.get("rastreamento")
+        if exportador is None or exportador.pid != os.getpid():
+            exportador = ExportadorJSONL(app.config.get("RASTREAMENTO_ARQUIVO", os.path.join("logs", "rastros.jsonl")))
+            app.extensions["rastreamento"] = exportador
+        return exportador
+
+
+# ===============================
+# API usada pelo resto do código
+# ===============================
+def iniciar_rastro(nome, traceparent=None, tipo=SERVIDOR, links=(), **atributos):
+    """
+    Abre o span raiz deste processo e o torna o atual. Com um `traceparent`
+    válido, continua o trace de quem chamou e segue a decisão de amostragem
+    dele; sem, sorteia com RASTREAMENTO_AMOSTRAGEM. Retorna None com o
+    rastreamento desligado. Encerre com `encerrar_rastro`.
+    """
+    exportador = obter_exportador()
+    if exportador is None:
+        return None
+
+    pai = ler_traceparent(traceparent)
+    if pai is not None:
+        trace_id, pai_id, amostrado = pai
+    else:
+        trace_id, pai_id = os.urandom(16).hex(), None
+        amostrado = random.random() < current_app.config.get("RASTREAMENTO_AMOSTRAGEM", 0.1)
+
+    raiz = Span(Rastro(trace_id, amostrado, exportador), nome, pai_id, tipo, atributos, links)
+    raiz.anterior = _span_atual.set(raiz)
+    return raiz
+
+
+def encerrar_rastro(raiz, erro=None):
+    if raiz is None:
+        return
+    if erro is not None:
+        raiz.registrar_erro(erro)
+    raiz.encerrar()
+    try:
+        _span_atual.reset(raiz.anterior)
+    except ValueError:
+        # Encerrado em outro contexto (ex.: fim de uma resposta em streaming)
+        _span_atual.set(None)
+    if raiz.rastro.amostrado:
+        raiz.rastro.exportador.exportar(raiz.rastro.spans)
+
+
+def span_atual():
+    return _span_atual.get()
+
+
+def traceparent_atual():
+    """`traceparent` do span atual, para levar o trace adiante (header HTTP, fila de envios)."""
+    atual = _span_atual.get()
+    return atual.traceparent if atual is not None else None
+
+
+@contextmanager
+def span(nome, tipo=INTERNO, **atributos):
+    """
+    Span filho do atual durante o bloco (o bloco recebe o Span, ou None).
+    Sem trace em andamento ou com ele fora da amostra, não faz nada.
+    """
+    pai = _span_atual.get()
+    if pai is None or not pai.rastro.amostrado:
+        yield None
+        return
+
+    filho = Span(pai.rastro, nome, pai.span_id, tipo, atributos)
+    token = _span_atual.set(filho)
+    try:
+        yield filho
+    except BaseException as e:
+        filho.registrar_erro(e)
+        raise
+    finally:
+        _span_atual.reset(token)
+        filho.encerrar()
+
+
+def rastrear(nome, tipo=INTERNO):
+    """Decorador: a função inteira vira um span `nome`."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with span(nome, tipo):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+# ===============================
+# Integração com o Flask: um trace por requisição
+# ===============================
+def _iniciar_requisicao():
+    g._rastro = iniciar_rastro(
+        f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.target": request.path},
+    )
+
+
+def _anotar_resposta(response):
+    raiz = g.get("_rastro")
+    if raiz is not None:
+        raiz.definir(**{"http.status_code": response.status_code})
+        if response.status_code >= 500:
+            raiz.status = {"code": STATUS_ERRO}
+    return response
+
+
+def _encerrar_requisicao(exc=None):
+    encerrar_rastro(g.pop("_rastro", None), exc)
+
+
+def init_rastreamento(app):
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_anotar_resposta)
+    app.teardown_request(_encerrar_requisicao)
@@ -0,0 +1,179 @@
+# app/utils/revogacao.py
+
+import os
+import threading
+import time
+from datetime import timedelta
+from flask import current_app
+from app.extensions.db import get_db
+
+
+class CacheRevogacao:
+    """
+    Cópia em memória (por worker) dos `jti` revogados.
+
+    O hot path do token_in_blocklist_loader só consulta o dicionário. A cada
+    `intervalo_sincronizacao` segundos o worker compara o maior `id` de
+    tokensrevogados com a marca d'água local e baixa apenas as linhas novas,
+    o que propaga os logouts feitos em outros workers. Cada entrada vale até o
+    `exp` do próprio token: depois disso o JWT já seria recusado por expiração.
+    """
+
+    def __init__(self, intervalo_sincronizacao=5, validade_maxima=900):
+        self.intervalo_sincronizacao = intervalo_sincronizacao
+        self.validade_maxima = validade_maxima  # None = tokens sem expiração
+        self.pid = os.getpid()
+
+        self._expira_em = {}  # jti -> timestamp (None = nunca)
+        self._ultimo_id = 0
+        self._carregado = False
+        self._proxima_sincronizacao = 0
+        self._lock = threading.Lock()
+
+    def revogado(self, jti):
+        agora = time.time()
+        if not self._carregado or agora >= self._proxima_sincronizacao:
+            self.sincronizar()
+
+        if jti not in self._expira_em:
+            return False
+        expira_em = self._expira_em.get(jti)
+        if expira_em is not None and expira_em <= agora:
+            self._expira_em.pop(jti, None)
+            return False
+        return True
+
+    def adicionar(self, jti, exp=None):
+        self._expira_em[jti] = exp if exp is not None else self._validade_padrao()
+
+    def sincronizar(self):
+        # Outra thread já está sincronizando: segue com o cache atual
+        if not self._lock.acquire(blocking=not self._carregado):
+            return
+        try:
+            if self._carregado and time.time() < self._proxima_sincronizacao:
+                return
+            try:
+                self._baixar_novos()
+            except Exception as e:
+                if not self._carregado:
+                    raise
+                print(f"[ERRO] Falha ao sincronizar tokens revogados: {e}")
+            self._proxima_sincronizacao = time.time() + self.intervalo_sincronizacao
+        finally:
+            self._lock.release()
+
+    def _baixar_novos(self):
+        db = get_db()
+        with db.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) AS ultimo_id FROM tokensrevogados")
+            ultimo_id = cursor.fetchone()["ultimo_id"]
+
+            if not self._carregado or ultimo_id < self._ultimo_id:
+                # Primeira carga ou tabela recriada/truncada: recarrega os tokens ainda vivos
+                cursor.execute("""
+                    SELECT id, jti, UNIX_TIMESTAMP(expira_em) AS exp
+                    FROM tokensrevogados
+                    WHERE expira_em IS NULL OR expira_em > NOW()
+                """)
+                self._expira_em = {}
+            elif ultimo_id > self._ultimo_id:
+                cursor.execute("""
+                    SELECT id, jti, UNIX_TIMESTAMP(expira_em) AS exp
+                    FROM tokensrevogados
+                    WHERE id > %s
+                """, (self._ultimo_id,))
+            else:
+                self._remover_expirados()
+                return
+
+            for linha in cursor.fetchall():
+                exp = float(linha["exp"]) if linha.get("exp") is not None else self._validade_padrao()
+                self._expira_em.setdefault(linha["jti"], exp)
+
+        self._ultimo_id = ultimo_id
+        self._carregado = True
+        self._remover_expirados()
+
+    def _validade_padrao(self):
+        # Um token revogado agora não pode viver além da validade máxima de um token
+        if self.validade_maxima is None:
+            return None
+        return time.time() + self.validade_maxima
+
+    def _remover_expirados(self):
+        agora = time.time()
+        expirados = [jti for jti, exp in list(self._expira_em.items()) if exp is not None and exp <= agora]
+        for jti in expirados:
+            self._expira_em.pop(jti, None)
+
+    def __len__(self):
+        return len(self._expira_em)
+
+
+_cache_lock = threading.Lock()
+
+
+def obter_cache_revogacao(app=None):
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get("revogacao")
+    if cache is not None and cache.pid == os.getpid():
+        return cache
+
+    with _cache_lock:
+        cache = app.extensions.get("revogacao")
+        if cache is None or cache.pid != os.getpid():
+            validade = app.config.get("JWT_ACCESS_TOKEN_EXPIRES", timedelta(minutes=15))
+            if isinstance(validade, timedelta):
+                validade = validade.total_seconds()
+            cache = CacheRevogacao(
+                intervalo_sincronizacao=app.config.get("REVOGACAO_INTERVALO_SINCRONIZACAO", 5),
+                validade_maxima=validade or None,
+            )
+            app.extensions["revogacao"] = cache
+        return cache
+
+
+def token_revogado(jti):
+    return obter_cache_revogacao().revogado(jti)
+
+
+def registrar_revogacao(jti, exp=None):
+    obter_cache_revogacao().adicionar(jti, exp)
+
+
+def purgar_tokens_expirados(tamanho_lote=1000):
+    """Apaga, em lotes, as linhas de tokens que já expiraram. Retorna o total removido."""
+    db = get_db()
+    total = 0
+    while True:
+        with db.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM tokensrevogados WHERE expira_em < NOW() LIMIT %s",
+                (tamanho_lote,)
+            )
+            removidas = cursor.rowcount
+        # Commit por lote para não segurar locks durante toda a limpeza
+        db.commit()
+        total += removidas
+        if removidas < tamanho_lote:
+            return total
+
+
+def contar_tokens_revogados():
+    db = get_db()
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(expira_em < NOW()), 0) AS expirados
+            FROM tokensrevogados
+        """)
+        resultado = cursor.fetchone()
+    total = int(resultado["total"])
+    expirados = int(resultado["expirados"])
+    return {
+        "total": total,
+        "expirados": expirados,
+        "ativos": total - expirados,
+        "em_cache": len(obter_cache_revogacao()),
+    }
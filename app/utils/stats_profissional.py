@@ -0,0 +1,126 @@
+# app/utils/stats_profissional.py
+
+from datetime import datetime, timedelta
+
+# Tabelas em app/migracoes/0001_esquema_inicial.sql. As funções recebem o cursor da rota
+# que fez a escrita, para que o resumo seja gravado na mesma transação.
+
+CONTADORES = ("treinos_ativos", "planos_ativos")
+
+
+def fim_da_semana(agora):
+    """Segunda-feira seguinte, 00:00."""
+    segunda = (agora - timedelta(days=agora.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return segunda + timedelta(days=7)
+
+
+def _atualizar_resumo(cursor, id_profissional, sql, params):
+    """
+    Aplica o incremento se o profissional já tem resumo. Sem linha ainda, o
+    resumo é montado do zero (a escrita da rota já está visível na transação).
+    """
+    cursor.execute("SELECT id_profissional FROM profissional_stats WHERE id_profissional = %s FOR UPDATE",
+                   (id_profissional,))
+    if cursor.fetchone() is None:
+        recalcular_stats(cursor, id_profissional)
+    else:
+        cursor.execute(sql, params)
+
+
+def registrar_vinculo(cursor, id_profissional, id_aluno):
+    """Primeiro agendamento do aluno com o profissional soma 1 em alunos_vinculados."""
+    cursor.execute("""
+        INSERT IGNORE INTO profissional_alunos (id_profissional, id_aluno) VALUES (%s, %s)
+    """, (id_profissional, id_aluno))
+    if cursor.rowcount:
+        _atualizar_resumo(cursor, id_profissional, """
+            UPDATE profissional_stats SET alunos_vinculados = alunos_vinculados + 1 WHERE id_profissional = %s
+        """, (id_profissional,))
+
+
+def ajustar_contador(cursor, id_profissional, campo, delta):
+    """Soma `delta` em treinos_ativos ou planos_ativos."""
+    if campo not in CONTADORES:
+        raise ValueError(f"Contador inválido: {campo}")
+    _atualizar_resumo(cursor, id_profissional, f"""
+        UPDATE profissional_stats SET {campo} = GREATEST({campo} + %s, 0) WHERE id_profissional = %s
+    """, (delta, id_profissional))
+
+
+def recalcular_sessoes_semana(cursor, id_profissional, agora=None):
+    """
+    Conta as sessões marcadas de agora até o fim da semana (faixa no índice
+    id_profissional + data_hora_inicio). O valor vale até a próxima dessas
+    sessões começar; depois disso a leitura recalcula.
+    """
+    agora = agora or datetime.now()
+    fim = fim_da_semana(agora)
+    cursor.execute("""
+        SELECT COUNT(*) AS total, MIN(data_hora_inicio) AS proxima
+        FROM agendamentos
+        WHERE id_profissional = %s AND status = 'marcado'
+          AND data_hora_inicio >= %s AND data_hora_inicio < %s
+    """, (id_profissional, agora, fim))
+    linha = cursor.fetchone()
+    total = linha["total"] if linha else 0
+    validas_ate = (linha["proxima"] if linha else None) or fim
+
+    # Sem linha ainda, nada a fazer: a primeira leitura monta o resumo inteiro
+    cursor.execute("""
+        UPDATE profissional_stats SET sessoes_semana = %s, sessoes_validas_ate = %s
+        WHERE id_profissional = %s
+    """, (total, validas_ate, id_profissional))
+    return total, validas_ate
+
+
+def recalcular_stats(cursor, id_profissional=None):
+    """
+    Reconstrói o resumo a partir das tabelas de origem (carga inicial ou
+    correção de desvios). Sem `id_profissional`, recalcula todos.
+    Retorna o número de profissionais atualizados.
+    """
+    filtro_agendamentos, filtro_usuarios, params = "", "", ()
+    if id_profissional is not None:
+        filtro_agendamentos = "WHERE id_profissional = %s"
+        filtro_usuarios = "AND u.id_usuario = %s"
+        params = (id_profissional,)
+
+    cursor.execute(f"""
+        INSERT IGNORE INTO profissional_alunos (id_profissional, id_aluno)
+        SELECT DISTINCT id_profissional, id_aluno FROM agendamentos {filtro_agendamentos}
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO profissional_stats (id_profissional, alunos_vinculados, treinos_ativos, planos_ativos)
+        SELECT u.id_usuario,
+               (SELECT COUNT(*) FROM profissional_alunos pa WHERE pa.id_profissional = u.id_usuario),
+               (SELECT COUNT(*) FROM treinos t WHERE t.id_profissional = u.id_usuario AND t.ativo = TRUE),
+               (SELECT COUNT(*) FROM planosalimentares p WHERE p.id_nutricionista = u.id_usuario AND p.ativo = TRUE)
+        FROM usuarios u
+        WHERE u.tipo_usuario IN ('personal', 'nutricionista') {filtro_usuarios}
+        ON DUPLICATE KEY UPDATE
+            alunos_vinculados = VALUES(alunos_vinculados),
+            treinos_ativos = VALUES(treinos_ativos),
+            planos_ativos = VALUES(planos_ativos),
+            sessoes_validas_ate = NULL
+    """, params)
+    cursor.execute(f"SELECT COUNT(*) AS total FROM usuarios u WHERE u.tipo_usuario IN ('personal', 'nutricionista') {filtro_usuarios}", params)
+    return cursor.fetchone()["total"]
+
+
+def completar_stats(cursor, id_profissional, stats, agora=None):
+    """
+    Recebe a linha de profissional_stats já lida (ou None) e recalcula só o
+    que faltar: a linha inteira se o profissional ainda não tem resumo, e as
+    sessões da semana se a validade passou.
+    """
+    agora = agora or datetime.now()
+    if stats is None:
+        recalcular_stats(cursor, id_profissional)
+        cursor.execute("SELECT * FROM profissional_stats WHERE id_profissional = %s", (id_profissional,))
+        stats = cursor.fetchone() or {"alunos_vinculados": 0, "treinos_ativos": 0, "planos_ativos": 0}
+
+    stats = dict(stats)
+    validas_ate = stats.get("sessoes_validas_ate")
+    if validas_ate is None or validas_ate <= agora:
+        stats["sessoes_semana"], stats["sessoes_validas_ate"] = recalcular_sessoes_semana(cursor, id_profissional, agora)
+    return stats
@@ -0,0 +1,55 @@
+# app/utils/streaming.py
+
+import pymysql
+from flask import Response, current_app, stream_with_context
+
+from app.extensions.db import get_db
+
+
+def gerar_array_json(cursor, tamanho_bloco=500, codificar=None):
+    """
+    Codifica as linhas do cursor como um array JSON, um bloco por vez.
+    Só `tamanho_bloco` linhas ficam em memória; o cursor é fechado no final
+    (ou se o cliente desconectar no meio).
+    """
+    codificar = codificar or current_app.json.dumps
+    try:
+        yield "["
+        primeiro = True
+        while True:
+            linhas = cursor.fetchmany(tamanho_bloco)
+            if not linhas:
+                break
+            trecho = ",".join(codificar(linha) for linha in linhas)
+            yield trecho if primeiro else "," + trecho
+            primeiro = False
+        yield "]"
+    except Exception as e:
+        # Cabeçalhos já enviados: o cliente recebe um JSON truncado
+        print(f"[ERRO] Falha no meio da exportação: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def responder_json_streaming(sql, params=(), nome_arquivo=None):
+    """
+    Resposta JSON (array) gerada enquanto as linhas chegam do MySQL.
+
+    Usa SSDictCursor (sem buffer no cliente): o worker nunca guarda o
+    resultado inteiro nem a string JSON completa. A consulta é executada
+    aqui, antes da resposta, para que erros de SQL ainda virem 500. Enquanto
+    a exportação corre, a sessão de banco da requisição fica ocupada com ela.
+    """
+    cursor = get_db().cursor(pymysql.cursors.SSDictCursor)
+    try:
+        cursor.execute(sql, params)
+    except Exception:
+        cursor.close()
+        raise
+
+    tamanho_bloco = current_app.config.get("EXPORTACAO_TAMANHO_BLOCO", 500)
+    resposta = Response(stream_with_context(gerar_array_json(cursor, tamanho_bloco)), mimetype="application/json")
+    if nome_arquivo:
+        resposta.headers["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
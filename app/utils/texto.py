@@ -0,0 +1,12 @@
+# app/utils/texto.py
+
+import re
+import unicodedata
+
+
+def normalizar_nome(nome):
+    """Minúsculas, sem acento e só letras/dígitos: 'João  D'Ávila' -> 'joao d avila'."""
+    if not nome:
+        return ""
+    sem_acento = "".join(c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", sem_acento.lower()).split())
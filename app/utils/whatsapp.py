@@ -1,10 +1,179 @@
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from app.utils.logs import registrar_log_envio
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+from app.utils.metricas import DURACAO_ENVIO, FALHAS_ENVIO, medir
+from app.utils.rastreamento import CLIENTE, span, traceparent_atual
+
+
+# =========================================
+# Cliente UltraMsg (sessão keep-alive + circuit breaker)
+# =========================================
+class ErroUltraMsg(Exception):
+    pass
+
+
+class CircuitoAberto(ErroUltraMsg):
+    """UltraMsg falhou repetidamente; as chamadas falham na hora até `tempo_reabertura`."""
+
+
+class ClienteUltraMsg:
+    """
+    Cliente único para a API do UltraMsg.
+
+    - uma `requests.Session` com pool de conexões keep-alive (TCP/TLS reaproveitados);
+    - timeouts de conexão e leitura em toda chamada;
+    - circuit breaker: após `limite_falhas` falhas seguidas (rede, timeout,
+      5xx/429) o circuito abre e as chamadas falham imediatamente; passado
+      `tempo_reabertura`, uma chamada de teste decide se ele fecha de novo;
+    - `enviar_em_lote` envia várias mensagens em paralelo pela mesma sessão.
+    """
+
+    def __init__(self, url_api, instancia, token, timeout_conexao=3, timeout_leitura=10,
+                 tamanho_pool=10, limite_falhas=5, tempo_reabertura=30):
+        self.url_api = url_api.rstrip("/")
+        self.instancia = instancia
+        self.token = token
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tamanho_pool = tamanho_pool
+        self.limite_falhas = limite_falhas
+        self.tempo_reabertura = tempo_reabertura
+        self.pid = os.getpid()
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho_pool, max_retries=0)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+
+        self._falhas = 0
+        self._aberto_ate = 0
+        self._testando = False
+        self._lock = threading.Lock()
+
+    # ----- circuit breaker -----
+    @property
+    def estado(self):
+        if self._falhas < self.limite_falhas:
+            return "fechado"
+        return "aberto" if time.monotonic() < self._aberto_ate else "meio-aberto"
+
+    def _liberar_chamada(self):
+        with self._lock:
+            if self._falhas < self.limite_falhas:
+                return
+            if time.monotonic() < self._aberto_ate or self._testando:
+                raise CircuitoAberto("UltraMsg indisponível: circuito aberto")
+            self._testando = True  # meio-aberto: só esta chamada passa
 
+    def _registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._testando = False
+
+    def _registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._testando = False
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.tempo_reabertura
+
+    # ----- envio -----
+    def enviar(self, numero, mensagem):
+        self._liberar_chamada()
+        # Recusas do UltraMsg (4xx, "error" na resposta) também contam como falha de envio
+        with medir(DURACAO_ENVIO, FALHAS_ENVIO, canal="whatsapp"), \
+                span("ultramsg.enviar", CLIENTE, **{"http.method": "POST"}) as atual:
+            resposta, status = self._postar(numero, mensagem)
+            if atual is not None:
+                atual.definir(**{"http.status_code": status})
+            return resposta
+
+    def _postar(self, numero, mensagem):
+        traceparent = traceparent_atual()
+        try:
+            response = self.sessao.post(
+                f"{self.url_api}/{self.instancia}/messages/chat",
+                json={"token": self.token, "to": numero, "body": mensagem},
+                headers={"traceparent": traceparent} if traceparent else None,
+                timeout=self.timeout
+            )
+            if response.status_code >= 500 or response.status_code == 429:
+                response.raise_for_status()
+        except Exception:
+            self._registrar_falha()
+            raise
+
+        # Erro do cliente (número inválido, token errado...) não indica UltraMsg fora do ar
+        self._registrar_sucesso()
+        response.raise_for_status()
+        try:
+            resposta = response.json()
+        except ValueError:
+            resposta = {}
+        if isinstance(resposta, dict) and resposta.get("error"):
+            raise ErroUltraMsg(f"UltraMsg recusou a mensagem: {resposta['error']}")
+        return resposta, response.status_code
+
+    def enviar_em_lote(self, mensagens):
+        """
+        Envia [(numero, mensagem), ...] em paralelo reaproveitando as conexões do pool.
+        Retorna uma lista na mesma ordem: {"numero", "sucesso", "erro"}.
+        """
+        def enviar_uma(item):
+            numero, mensagem = item
+            try:
+                self.enviar(numero, mensagem)
+                return {"numero": numero, "sucesso": True, "erro": None}
+            except Exception as e:
+                return {"numero": numero, "sucesso": False, "erro": str(e)}
+
+        if not mensagens:
+            return []
+        # Cada envio roda com uma cópia do contexto de quem chamou: os spans continuam no mesmo trace
+        contextos = [contextvars.copy_context() for _ in mensagens]
+        with ThreadPoolExecutor(max_workers=min(self.tamanho_pool, len(mensagens))) as executor:
+            return list(executor.map(lambda contexto, item: contexto.run(enviar_uma, item), contextos, mensagens))
+
+
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente_whatsapp(app=None):
+    app = app or current_app._get_current_object()
+    cliente = app.extensions.get("ultramsg")
+    if cliente is not None and cliente.pid == os.getpid():
+        return cliente
+
+    with _cliente_lock:
+        cliente = app.extensions.get("ultramsg")
+        if cliente is None or cliente.pid != os.getpid():
+            config = app.config
+            cliente = ClienteUltraMsg(
+                url_api=config.get("ULTRAMSG_API_URL", "https://api.ultramsg.com"),
+                instancia=config.get("ULTRAMSG_INSTANCE"),
+                token=config.get("ULTRAMSG_TOKEN"),
+                timeout_conexao=config.get("ULTRAMSG_TIMEOUT_CONEXAO", 3),
+                timeout_leitura=config.get("ULTRAMSG_TIMEOUT_LEITURA", 10),
+                tamanho_pool=config.get("ULTRAMSG_TAMANHO_POOL", 10),
+                limite_falhas=config.get("ULTRAMSG_LIMITE_FALHAS", 5),
+                tempo_reabertura=config.get("ULTRAMSG_TEMPO_REABERTURA", 30),
+            )
+            app.extensions["ultramsg"] = cliente
+        return cliente
+
+
+# =========================================
+# Helpers de alto nível
+# =========================================
 def enviar_avaliacao_por_whatsapp(avaliacao, url_pdf):
     """
-    Envia o link da avaliação física via WhatsApp para o aluno.
+    Enfileira o envio do link da avaliação física via WhatsApp para o aluno.
 
     Parâmetros:
     - avaliacao: dict retornado por detalhar_avaliacao_para_uso
@@ -26,40 +195,23 @@ def enviar_avaliacao_por_whatsapp(avaliacao, url_pdf):
         f"Atenciosamente,\nEquipe Alpphas GYM"
     )
 
-    instancia = os.getenv("ULTRAMSG_INSTANCE")
-    token = os.getenv("ULTRAMSG_TOKEN")
-    payload = {
-        "token": token,
-        "to": numero,
-        "body": mensagem
-    }
+    # Import local: a fila usa o cliente deste módulo para entregar
+    from app.utils.fila_envios import enfileirar_envio
 
     try:
-        response = requests.post(
-            f"https://api.ultramsg.com/{instancia}/messages/chat",
-            json=payload
-        )
-        response.raise_for_status()
-
-        registrar_log_envio(avaliacao["id_aluno"], "whatsapp", numero, mensagem, "sucesso")
+        id_envio = enfileirar_envio("whatsapp", numero, mensagem, id_usuario=avaliacao["id_aluno"])
 
         return {
             "success": True,
-            "status": 200,
-            "message": "Avaliação enviada com sucesso via WhatsApp"
+            "status": 202,
+            "message": "Envio via WhatsApp agendado",
+            "id_envio": id_envio
         }
 
     except Exception as e:
-        print("[WhatsApp] Erro ao enviar:", e)
-        registrar_log_envio(
-            avaliacao["id_aluno"],
-            "whatsapp",
-            numero,
-            f"Erro no envio WhatsApp: {mensagem}",
-            f"falha: {str(e)}"
-        )
+        print("[WhatsApp] Erro ao enfileirar:", e)
         return {
             "success": False,
             "status": 500,
-            "message": f"Erro ao enviar via WhatsApp: {str(e)}"
+            "message": f"Erro ao agendar envio via WhatsApp: {str(e)}"
         }
@@ -7,6 +7,7 @@ load_dotenv(dotenv_path=".env.test")
 
 from app import create_app
 from app.extensions.db import get_db
+from app.utils.migracoes import aplicar_migracoes
 
 @pytest.fixture(scope="session")
 def app():
@@ -17,6 +18,10 @@ def app():
         "⚠️ Você está tentando rodar os testes em um banco que não é de testes!"
     )
 
+    # Banco de testes sempre com o esquema da versão atual
+    with app.app_context():
+        aplicar_migracoes(get_db())
+
     return app
 
 @pytest.fixture(scope="function")
@@ -41,6 +46,8 @@ def limpar_banco(app):
                     "planosalimentares",
                     "refeicoes",
                     "agendamentos",
+                    "profissional_alunos",
+                    "profissional_stats",
                     "usuarios",
                     "tokensrevogados"
                 ]
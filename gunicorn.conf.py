@@ -0,0 +1,30 @@
+# gunicorn.conf.py — usado pelo render.yaml (gunicorn -c gunicorn.conf.py app:app)
+
+import os
+import shutil
+
+# Cada worker grava as métricas do Prometheus em arquivos nesta pasta e o
+# /metrics soma todos (app/utils/metricas.py). Precisa estar no ambiente
+# antes de o app ser importado, por isso fica aqui e não no Config.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/alpphas_metricas")
+
+
+def on_starting(server):
+    # Arquivos de uma execução anterior somariam valores de processos que já não existem
+    pasta = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.makedirs(pasta, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Com o app já carregado no worker: retoma a fila de envios sem esperar um
+    # enfileiramento aqui e monta os índices do typeahead antes da primeira busca
+    from app.utils.fila_envios import iniciar_despachante
+    from app.utils.indice_trigramas import iniciar_indices
+    iniciar_despachante(worker.wsgi)
+    iniciar_indices(worker.wsgi)
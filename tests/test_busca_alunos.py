@@ -0,0 +1,68 @@
+from flask import Flask
+from app.utils.busca_alunos import FiltroNome, buscar_alunos, normalizar_nome, reindexar_nomes
+
+
+class CursorFalso:
+    def __init__(self, linhas=None):
+        self.linhas = linhas or []
+        self.execucoes = []
+        self.atualizacoes = []
+
+    def execute(self, sql, params=None):
+        self.execucoes.append((sql, params))
+
+    def fetchall(self):
+        return self.linhas
+
+    def executemany(self, sql, linhas):
+        self.atualizacoes.extend(linhas)
+
+
+class TestBuscaAlunos:
+    def setup_method(self):
+        self.app = Flask(__name__)
+        self.app.config["BUSCA_ALUNOS_LIMITE"] = 20
+
+    def test_01_normaliza_acentos_caixa_e_pontuacao(self):
+        assert normalizar_nome("  João  D'Ávila ") == "joao d avila"
+        assert normalizar_nome("CONCEIÇÃO") == "conceicao"
+        assert normalizar_nome(None) == ""
+
+    def test_02_termo_com_palavras_usa_fulltext(self):
+        condicao, params = FiltroNome("Joao Sílva").condicao()
+        assert condicao == "MATCH(u.nome_busca) AGAINST (%s IN BOOLEAN MODE)"
+        assert params == ["+joao +silva"]
+
+    def test_03_uma_letra_usa_prefixo_e_vazio_nao_filtra(self):
+        assert FiltroNome("J").condicao() == ("u.nome_busca LIKE %s", ["j%"])
+        assert FiltroNome("").condicao() == ("TRUE", [])
+        assert FiltroNome("").ordem("u.nome") == ("u.nome", [])
+
+    def test_04_operadores_do_modo_booleano_sao_neutralizados(self):
+        _, params = FiltroNome('ana" -maria*').condicao()
+        assert params == ["+ana +maria"]
+
+    def test_05_busca_ordena_por_prefixo_e_limita(self):
+        cursor = CursorFalso([{"id_usuario": 1, "nome": "João"}])
+        with self.app.app_context():
+            resultado = buscar_alunos(cursor, "jo", ("id_usuario", "nome"))
+
+        sql, params = cursor.execucoes[0]
+        assert resultado == [{"id_usuario": 1, "nome": "João"}]
+        assert "LIKE" not in sql.split("ORDER BY")[0]
+        assert "(u.nome_busca LIKE %s) DESC" in sql
+        assert params == ("+jo", "jo%", "+jo", 20)
+
+    def test_06_termo_so_com_simbolos_nao_consulta(self):
+        cursor = CursorFalso()
+        with self.app.app_context():
+            assert buscar_alunos(cursor, "%%", ("nome",)) == []
+        assert cursor.execucoes == []
+
+    def test_07_reindexa_so_os_desatualizados(self):
+        cursor = CursorFalso([
+            {"id_usuario": 1, "nome": "Ágata", "nome_busca": ""},
+            {"id_usuario": 2, "nome": "Bruno", "nome_busca": "bruno"},
+        ])
+        assert reindexar_nomes(cursor) == 1
+        assert cursor.atualizacoes == [("agata", 1)]
@@ -0,0 +1,154 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from app.dashboard.dashboard_routes import dashboard_bp
+from app.extensions.db import PoolConexoes, init_db
+from app.utils.cache import CacheTTL, invalidar_dashboard, ttl_ate_proximo
+
+
+class TestCacheTTL:
+    def test_01_item_expira_apos_o_ttl(self):
+        cache = CacheTTL(ttl=0.05)
+        cache.guardar("a", 1)
+        assert cache.obter("a") == 1
+        time.sleep(0.06)
+        assert cache.obter("a") is None
+
+    def test_02_ttl_do_item_nunca_passa_do_ttl_do_cache(self):
+        cache = CacheTTL(ttl=0.05)
+        cache.guardar("a", 1, ttl=3600)
+        time.sleep(0.06)
+        assert cache.obter("a") is None
+        assert not cache.guardar("b", 1, ttl=0)
+
+    def test_03_despeja_o_menos_usado(self):
+        cache = CacheTTL(max_itens=2)
+        cache.guardar("a", 1)
+        cache.guardar("b", 2)
+        cache.obter("a")
+        cache.guardar("c", 3)
+        assert cache.obter("b") is None
+        assert cache.obter("a") == 1
+
+    def test_04_calculo_anterior_a_invalidacao_nao_e_gravado(self):
+        cache = CacheTTL()
+        inicio = cache.agora()
+        cache.invalidar("a")  # escrita concluída enquanto o valor era calculado
+        assert not cache.guardar("a", "antigo", desde=inicio)
+        assert cache.obter("a") is None
+        assert cache.guardar("a", "novo", desde=cache.agora())
+
+    def test_05_ttl_ate_o_proximo_agendamento(self):
+        daqui_a_pouco = datetime.now() + timedelta(seconds=30)
+        assert 25 < ttl_ate_proximo([{"data_hora_inicio": daqui_a_pouco}]) <= 30
+        assert ttl_ate_proximo([]) is None
+
+
+# ===============================
+# Banco falso que conta as idas ao servidor
+# ===============================
+class BancoDashboard:
+    def __init__(self):
+        self.execucoes = 0
+        self.versoes = {}
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, sql, params):
+        return sql % params
+
+    def executemany(self, sql, linhas):
+        # INSERT INTO dashboard_versoes ... ON DUPLICATE KEY UPDATE versao = versao + 1
+        for id_usuario, _ in linhas:
+            self.versoes[id_usuario] = self.versoes.get(id_usuario, 0) + 1
+
+    def fetchone(self):
+        return self.versao
+
+    def execute(self, sql, params=None):
+        if "FROM dashboard_versoes" in sql:
+            self.versao = {"versao": self.versoes[params[0]]} if params[0] in self.versoes else None
+            return
+        self.execucoes += 1
+        self.resultados = [
+            [{"id_usuario": 7, "nome": "Aluno", "email": "aluno@teste.com", "tipo_usuario": "aluno"}],
+            [], [], [],
+            [{"id_avaliacao": i, "data_avaliacao": "2025-01-0%d" % i, "peso": 80, "altura": 1.8,
+              "imc": 24.7, "percentual_gordura": 15} for i in range(5, 0, -1)],
+            [{"id_plano": 2, "titulo": "Cutting", "descricao_geral": "", "ativo": 1},
+             {"id_plano": 1, "titulo": "Antigo", "descricao_geral": "", "ativo": 0}],
+        ]
+
+    def fetchall(self):
+        return self.resultados.pop(0)
+
+    def nextset(self):
+        return True if self.resultados else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestDashboardEmCache:
+    def setup_method(self):
+        self.banco = BancoDashboard()
+        self.app = Flask(__name__)
+        self.app.config.update(JWT_SECRET_KEY="chave-de-teste-com-pelo-menos-32-bytes", DASHBOARD_CACHE_TTL=60)
+        JWTManager(self.app)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.banco, tamanho_maximo=1)
+        self.app.extensions["db_pool_lote"] = PoolConexoes(lambda: self.banco, tamanho_maximo=1)
+        self.app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
+        with self.app.app_context():
+            token = create_access_token(identity=json.dumps({"id": 7, "tipo_usuario": "aluno"}))
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.cliente = self.app.test_client()
+
+    def test_01_segunda_carga_nao_consulta_o_banco(self):
+        primeira = self.cliente.get("/dashboard/", headers=self.headers)
+        segunda = self.cliente.get("/dashboard/", headers=self.headers)
+
+        assert self.banco.execucoes == 1
+        assert primeira.get_json() == segunda.get_json()
+        dados = segunda.get_json()
+        assert [a["data_avaliacao"] for a in dados["avaliacoes_recentes"]] == ["2025-01-05", "2025-01-04", "2025-01-03"]
+        assert dados["plano_alimentar"] == {"id_plano": 2, "titulo": "Cutting", "descricao_geral": ""}
+
+    def test_02_escrita_invalida_o_dashboard_do_aluno(self):
+        self.cliente.get("/dashboard/", headers=self.headers)
+        with self.app.app_context():
+            invalidar_dashboard(7)
+        assert self.banco.versoes == {7: 1}
+        self.cliente.get("/dashboard/", headers=self.headers)
+        assert self.banco.execucoes == 2
+
+    def test_03_escrita_em_outro_worker_invalida_pela_versao_no_banco(self):
+        self.cliente.get("/dashboard/", headers=self.headers)
+        self.cliente.get("/dashboard/", headers=self.headers)
+        assert self.banco.execucoes == 1
+
+        # Outro worker gravou e chamou invalidar_dashboard(7): o cache local continua lá
+        self.banco.versoes[7] = 1
+        self.cliente.get("/dashboard/", headers=self.headers)
+        self.cliente.get("/dashboard/", headers=self.headers)
+        assert self.banco.execucoes == 2
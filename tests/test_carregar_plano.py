@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+from flask import Flask
+from app.extensions.db import PoolConexoes, init_db
+from app.planos.planos_routes import carregar_plano, salvar_refeicoes
+
+
+class BancoPlanos:
+    def __init__(self, cabecalho, linhas):
+        self.cabecalho = cabecalho
+        self.linhas = linhas
+        self.execucoes = []
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, sql, params):
+        return sql % tuple(repr(p) for p in params)
+
+    def execute(self, sql, params=None):
+        self.execucoes.append(sql)
+        self.resultados = [list(self.cabecalho), list(self.linhas)]
+
+    def fetchall(self):
+        return self.resultados.pop(0)
+
+    def nextset(self):
+        return True if self.resultados else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+CABECALHO = [{"id_aluno": 7, "nome_aluno": "Aluno", "nome_profissional": "Nutri",
+              "email": "n@x.com", "telefone": None, "endereco": None, "crn": "123"}]
+
+
+def refeicao(id_refeicao, titulo, nome=None, peso=None):
+    return {"id_refeicao": id_refeicao, "titulo": titulo, "calorias_estimadas": 500,
+            "nome_alimento": nome, "peso": peso}
+
+
+class TestCarregarPlano:
+    def carregar(self, cabecalho, linhas, **kwargs):
+        self.banco = BancoPlanos(cabecalho, linhas)
+        app = Flask(__name__)
+        init_db(app)
+        app.extensions["db_pool_lote"] = PoolConexoes(lambda: self.banco, tamanho_maximo=1)
+        with app.app_context():
+            return carregar_plano(42, **kwargs)
+
+    def test_01_plano_inteiro_numa_unica_ida_ao_banco(self):
+        linhas = [refeicao(i, f"Refeição {i}", f"Alimento {i}.{j}", Decimal(100)) for i in range(1, 9) for j in range(3)]
+        plano = self.carregar(CABECALHO, linhas)
+
+        assert len(self.banco.execucoes) == 1
+        assert len(plano["refeicoes"]) == 8
+        assert all(len(r["alimentos"]) == 3 for r in plano["refeicoes"])
+        assert plano["refeicoes"][0]["alimentos"][0] == {"nome": "Alimento 1.0", "peso": Decimal(100)}
+        assert plano["nome_profissional"] == "Nutri"
+
+    def test_02_refeicao_sem_alimentos_fica_com_lista_vazia(self):
+        plano = self.carregar(CABECALHO, [refeicao(1, "Café"), refeicao(2, "Almoço", "Arroz", 150)])
+        assert [r["titulo"] for r in plano["refeicoes"]] == ["Café", "Almoço"]
+        assert plano["refeicoes"][0]["alimentos"] == []
+
+    def test_03_plano_inexistente_ou_inativo(self):
+        assert self.carregar([], [], somente_ativo=True) is None
+        assert "p.ativo = TRUE" in self.banco.execucoes[0]
+
+
+class CursorLote:
+    def __init__(self):
+        self.lotes = []
+        self.execucoes = 0
+
+    def executemany(self, sql, linhas):
+        self.lotes.append((sql, list(linhas)))
+
+    def execute(self, sql, params=None):
+        self.execucoes += 1
+
+    def fetchall(self):
+        return [{"id_refeicao": 31}, {"id_refeicao": 32}]
+
+
+class TestSalvarRefeicoes:
+    def test_01_um_insert_por_tabela_e_alimentos_na_refeicao_certa(self):
+        cursor = CursorLote()
+        salvar_refeicoes(cursor, 42, [
+            {"titulo": "Café", "calorias_estimadas": 300, "alimentos": [{"nome": "Pão", "peso": "50g"}]},
+            {"titulo": "Almoço", "calorias_estimadas": 600, "alimentos": [
+                {"nome": "Arroz", "peso": "150g"}, {"nome": "", "peso": "10g"}, {"nome": "Frango", "peso": "200g"},
+            ]},
+        ])
+
+        (sql_ref, refeicoes), (sql_ali, alimentos) = cursor.lotes
+        assert sql_ref.startswith("INSERT INTO refeicoes")
+        assert refeicoes == [(42, "Café", 300), (42, "Almoço", 600)]
+        assert alimentos == [(31, "Pão", "50g"), (32, "Arroz", "150g"), (32, "Frango", "200g")]
+        assert cursor.execucoes == 1  # só a releitura dos ids
@@ -21,7 +21,8 @@ class TestDashboard:
                     "registrostreino_exercicios", "registrostreino",
                     "treinoexercicios", "treinos", "exercicios",
                     "avaliacoesfisicas", "planosalimentares", "refeicoes",
-                    "agendamentos", "usuarios", "tokensrevogados"
+                    "agendamentos", "profissional_alunos", "profissional_stats",
+                    "usuarios", "tokensrevogados"
                 ]:
                     cursor.execute(f"TRUNCATE TABLE {tabela}")
                 cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -72,6 +73,11 @@ class TestDashboard:
         assert "avaliacoes" in data
         assert "planos" in data
         assert "treinos" in data
+        assert data["avaliacoes_recentes"] == [
+            {k: a[k] for k in ("data_avaliacao", "peso", "percentual_gordura", "imc")}
+            for a in data["avaliacoes"][:3]
+        ]
+        assert "plano_alimentar" in data
 
     def test_02_dashboard_personal(self):
         res = self.client.get("/dashboard/", headers={
@@ -82,6 +88,8 @@ class TestDashboard:
         assert data["perfil"]["tipo_usuario"] == "personal"
         assert "proximos_atendimentos" in data
         assert "alunos_vinculados" in data
+        assert data["sessoes_semana"] == 0
+        assert data["treinos_ativos"] == 0
 
     def test_03_dashboard_nutricionista(self):
         res = self.client.get("/dashboard/", headers={
@@ -0,0 +1,94 @@
+from datetime import date
+
+from flask import Flask
+from app.extensions.db import PoolConexoes, init_db
+from app.utils.estatisticas import calcular_estatisticas, obter_estatisticas
+
+
+class BancoEstatisticas:
+    def __init__(self):
+        self.execucoes = []
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, sql, params):
+        return sql % tuple(repr(str(p)) for p in params)
+
+    def execute(self, sql, params=None):
+        self.execucoes.append(sql)
+        self.resultados = [
+            [{"tipo_usuario": "aluno", "total": 40}, {"tipo_usuario": "personal", "total": 3},
+             {"tipo_usuario": "admin", "total": 1}],
+            [{"treinos": 12, "planos": 5, "agendamentos": 90, "avaliacoes": 20, "exercicios": 60}],
+            [{"semana": date(2025, 3, 10), "total": 4}],
+            [{"dia": date(2025, 3, 12), "total": 7}, {"dia": date(2025, 3, 14), "total": 2}],
+        ]
+
+    def fetchall(self):
+        return self.resultados.pop(0)
+
+    def nextset(self):
+        return True if self.resultados else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestEstatisticas:
+    def setup_method(self):
+        self.banco = BancoEstatisticas()
+        self.app = Flask(__name__)
+        self.app.config["ESTATISTICAS_CACHE_TTL"] = 30
+        init_db(self.app)
+        self.app.extensions["db_pool_lote"] = PoolConexoes(lambda: self.banco, tamanho_maximo=1)
+
+    def test_01_totais_numa_unica_ida_ao_banco(self):
+        with self.app.app_context():
+            estatisticas = calcular_estatisticas(semanas=2, dias=3, hoje=date(2025, 3, 14))
+
+        assert len(self.banco.execucoes) == 1
+        assert "GROUP BY tipo_usuario" in self.banco.execucoes[0]
+        assert estatisticas["alunos"] == 40
+        assert estatisticas["personal"] == 3
+        assert estatisticas["nutricionista"] == 0
+        assert estatisticas["treinos"] == 12
+        assert "admin" not in estatisticas
+
+    def test_02_series_sem_buracos(self):
+        with self.app.app_context():
+            series = calcular_estatisticas(semanas=2, dias=3, hoje=date(2025, 3, 14))["series"]
+
+        assert series["novos_usuarios_semana"] == [
+            {"semana": "2025-03-03", "total": 0},
+            {"semana": "2025-03-10", "total": 4},
+        ]
+        assert series["sessoes_dia"] == [
+            {"dia": "2025-03-12", "total": 7},
+            {"dia": "2025-03-13", "total": 0},
+            {"dia": "2025-03-14", "total": 2},
+        ]
+
+    def test_03_painel_consultando_de_novo_usa_o_cache(self):
+        with self.app.app_context():
+            primeira = obter_estatisticas()
+        with self.app.app_context():
+            segunda = obter_estatisticas()
+        assert primeira == segunda
+        assert len(self.banco.execucoes) == 1
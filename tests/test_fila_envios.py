@@ -0,0 +1,283 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask
+from app.extensions.db import PoolConexoes, init_db
+from app.extensions.mail import mail, obter_mailer
+from app.utils.fila_envios import ENTREGADORES, DespachanteEnvios, calcular_espera, enfileirar_envio, iniciar_despachante
+from app.utils.logs import obter_buffer_logs
+
+
+# ===============================
+# SMTP local (stand-in do servidor de e-mail)
+# ===============================
+class SMTPFalso(socketserver.StreamRequestHandler):
+    def responder(self, linha):
+        self.wfile.write(linha.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.sessoes += 1
+        self.responder("220 localhost SMTP falso")
+        while True:
+            linha = self.rfile.readline().decode().strip()
+            if not linha:
+                return
+            comando = linha.split(" ")[0].upper()
+            self.server.comandos.append(comando)
+            if comando == "EHLO":
+                self.responder("250 localhost")
+            elif comando == "DATA":
+                self.responder("354 fim com <CRLF>.<CRLF>")
+                dados = []
+                while True:
+                    parte = self.rfile.readline()
+                    if parte in (b".\r\n", b""):
+                        break
+                    dados.append(parte)
+                self.server.mensagens.append(b"".join(dados).decode())
+                self.responder("250 OK")
+                if getattr(self.server, "derrubar", False):
+                    self.server.derrubar = False
+                    return  # servidor fecha a sessão sem QUIT
+            elif comando == "QUIT":
+                self.responder("221 tchau")
+                return
+            else:
+                self.responder("250 OK")
+
+
+# ===============================
+# API UltraMsg falsa
+# ===============================
+class UltraMsgFalsa(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.recebidas.append((self.path, json.loads(corpo)))
+        self.server.conexoes.add(self.client_address)
+        status = self.server.respostas.pop(0) if self.server.respostas else 200
+        resposta = b'{"sent": "true"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+    def log_message(self, *args):
+        pass
+
+
+# ===============================
+# Tabelas filaenvios/logs em memória
+# ===============================
+class FilaFalsa:
+    def __init__(self):
+        self.envios = {}
+        self.logs = []
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        agora = time.time()
+        self.resultado = []
+        if sql.startswith("INSERT INTO filaenvios"):
+            self.lastrowid = len(self.envios) + 1
+            campos = ["canal", "id_usuario", "id_solicitante", "destino", "assunto", "conteudo",
+                      "descricao_log", "anexo_nome", "anexo", "max_tentativas", "traceparent"]
+            envio = dict(zip(campos, params), id_envio=self.lastrowid, status="pendente",
+                         tentativas=0, proxima_tentativa=agora, ultimo_erro=None)
+            self.envios[self.lastrowid] = envio
+        elif sql.startswith("SELECT id_envio FROM filaenvios"):
+            prontos = [e for e in self.envios.values()
+                       if e["status"] in ("pendente", "processando") and e["proxima_tentativa"] <= agora]
+            self.resultado = [{"id_envio": e["id_envio"]} for e in prontos][:params[0]]
+        elif "SET status = 'processando'" in sql:
+            for id_envio in params[1:]:
+                envio = self.envios[id_envio]
+                envio.update(status="processando", tentativas=envio["tentativas"] + 1,
+                             proxima_tentativa=agora + params[0])
+        elif sql.startswith("UPDATE filaenvios SET proxima_tentativa"):
+            for id_envio in params[1:]:
+                if self.envios[id_envio]["status"] == "processando":
+                    self.envios[id_envio]["proxima_tentativa"] = agora + params[0]
+        elif sql.startswith("SELECT * FROM filaenvios"):
+            self.resultado = [dict(self.envios[i]) for i in params]
+        elif "SET status = 'falhou'" in sql:
+            self.envios[params[1]].update(status="falhou", ultimo_erro=params[0])
+        elif "SET status = 'pendente'" in sql:
+            self.envios[params[2]].update(status="pendente", ultimo_erro=params[0],
+                                          proxima_tentativa=agora + params[1])
+        elif "SET status = 'enviado'" in sql:
+            self.envios[params[0]].update(status="enviado", conteudo="", anexo=None)
+
+    def executemany(self, sql, linhas):
+        if " ".join(sql.split()).startswith("INSERT INTO logs"):
+            self.logs.extend(linhas)
+
+    def fetchall(self):
+        return self.resultado
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestFilaEnvios:
+    def setup_method(self):
+        self.smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPFalso)
+        self.smtp.daemon_threads = True
+        self.smtp.mensagens = []
+        self.smtp.sessoes = 0
+        self.smtp.comandos = []
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), UltraMsgFalsa)
+        self.http.daemon_threads = True
+        self.http.recebidas = []
+        self.http.respostas = []
+        self.http.conexoes = set()
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+        self.fila = FilaFalsa()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            MAIL_SERVER="127.0.0.1",
+            MAIL_PORT=self.smtp.server_address[1],
+            MAIL_USE_TLS=False,
+            MAIL_DEFAULT_SENDER="academia@alpphasgym.com",
+            ULTRAMSG_API_URL=f"http://127.0.0.1:{self.http.server_address[1]}",
+            ULTRAMSG_INSTANCE="instancia1",
+            ULTRAMSG_TOKEN="token",
+            FILA_ENVIOS_AUTOINICIAR=False,
+            FILA_ENVIOS_MAX_TENTATIVAS=2,
+        )
+        mail.init_app(self.app)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.fila, tamanho_maximo=1)
+        self.despachante = DespachanteEnvios(self.app, espera_base=60)
+
+    def teardown_method(self):
+        with self.app.app_context():
+            obter_mailer().fechar()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        self.http.shutdown()
+        self.http.server_close()
+
+    def processar(self):
+        with self.app.app_context():
+            processados = self.despachante.processar_lote()
+        obter_buffer_logs(self.app).descarregar()
+        return processados
+
+    def test_01_email_com_anexo_entregue_pelo_smtp(self):
+        with self.app.app_context():
+            id_envio = enfileirar_envio("email", "aluno@teste.com", "Olá!", id_usuario=7,
+                                        assunto="Seu Treino", anexo=b"%PDF-1.4", anexo_nome="treino_1.pdf")
+        assert self.processar() == 1
+
+        assert len(self.smtp.mensagens) == 1
+        assert "Subject: Seu Treino" in self.smtp.mensagens[0]
+        assert 'filename="treino_1.pdf"' in self.smtp.mensagens[0]
+        assert self.fila.envios[id_envio]["status"] == "enviado"
+        assert self.fila.logs[0][-2] == "sucesso"
+
+    def test_02_whatsapp_com_falha_volta_para_fila_com_backoff(self):
+        self.http.respostas = [500]
+        with self.app.app_context():
+            id_envio = enfileirar_envio("whatsapp", "5511999999999", "link do treino", id_usuario=7)
+
+        self.processar()
+        envio = self.fila.envios[id_envio]
+        assert envio["status"] == "pendente"
+        assert envio["tentativas"] == 1
+        assert envio["proxima_tentativa"] > time.time() + 30
+        assert self.processar() == 0  # ainda aguardando o backoff
+
+        envio["proxima_tentativa"] = time.time()
+        self.processar()
+        assert envio["status"] == "enviado"
+        caminho, payload = self.http.recebidas[-1]
+        assert caminho == "/instancia1/messages/chat"
+        assert payload == {"token": "token", "to": "5511999999999", "body": "link do treino"}
+
+    def test_03_desiste_apos_o_maximo_de_tentativas(self):
+        self.http.respostas = [503, 503]
+        with self.app.app_context():
+            id_envio = enfileirar_envio("whatsapp", "5511999999999", "oi", id_usuario=7)
+
+        self.processar()
+        self.fila.envios[id_envio]["proxima_tentativa"] = time.time()
+        self.processar()
+
+        envio = self.fila.envios[id_envio]
+        assert envio["status"] == "falhou"
+        assert "503" in envio["ultimo_erro"]
+        assert self.fila.logs[-1][-2].startswith("falha")
+
+    def test_04_lease_renovado_cobre_o_pior_caso_da_entrega(self):
+        self.despachante.prazos_envio = {"whatsapp": 100}
+        renovacoes = []
+        entregar = ENTREGADORES["whatsapp"]
+
+        def entregar_observando(grupo):
+            renovacoes.extend(self.fila.envios[envio["id_envio"]]["proxima_tentativa"] for envio in grupo)
+            return entregar(grupo)
+
+        with self.app.app_context():
+            for i in range(3):
+                enfileirar_envio("whatsapp", f"551199999999{i}", "oi", id_usuario=7)
+        ENTREGADORES["whatsapp"] = entregar_observando
+        try:
+            inicio = time.time()
+            self.processar()
+        finally:
+            ENTREGADORES["whatsapp"] = entregar
+
+        # tempo_lease (300) + 3 envios x 100 s
+        assert len(renovacoes) == 3
+        assert all(inicio + 600 <= lease <= time.time() + 600 for lease in renovacoes)
+
+    def test_05_despachante_sobe_no_inicio_do_worker(self):
+        with self.app.app_context():
+            id_envio = enfileirar_envio("email", "aluno@teste.com", "Olá!", id_usuario=7, assunto="Pendente")
+
+        iniciar_despachante(self.app)
+        assert "fila_envios" not in self.app.extensions  # FILA_ENVIOS_AUTOINICIAR=0
+
+        self.app.config["FILA_ENVIOS_AUTOINICIAR"] = True
+        iniciar_despachante(self.app)
+        despachante = self.app.extensions["fila_envios"]
+        try:
+            fim = time.monotonic() + 5
+            while self.fila.envios[id_envio]["status"] != "enviado":
+                assert time.monotonic() < fim, "envio pendente não foi retomado"
+                time.sleep(0.02)
+        finally:
+            despachante.parar()
+
+    def test_06_backoff_exponencial_limitado(self):
+        assert 24 <= calcular_espera(1, base=30) <= 36
+        assert 96 <= calcular_espera(3, base=30) <= 144
+        assert calcular_espera(20, base=30, maximo=3600) <= 3600 * 1.2
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from flask import Flask
+from app.utils import indice_trigramas
+from app.utils.busca_alunos import buscar_alunos
+from app.utils.indice_trigramas import (
+    IndiceTrigramas, iniciar_indices, indexar_aluno, obter_indice_alunos, obter_indice_exercicios, remover_aluno,
+)
+
+ALUNOS = [
+    {"id_usuario": 1, "nome": "João Silva", "email": "joao@x.com"},
+    {"id_usuario": 2, "nome": "Joana Prado", "email": "joana@x.com"},
+    {"id_usuario": 3, "nome": "Mariana Joaquina", "email": "mari@x.com"},
+    {"id_usuario": 4, "nome": "Pedro Álvares", "email": "pedro@x.com"},
+]
+
+
+class TestIndiceTrigramas:
+    def setup_method(self):
+        self.cargas = 0
+        self.indice = IndiceTrigramas(self.carregar, "id_usuario", ttl=300)
+
+    def carregar(self):
+        self.cargas += 1
+        return ALUNOS
+
+    def ids(self, termo, limite=20):
+        return [linha["id_usuario"] for linha in self.indice.buscar(termo, limite)]
+
+    def test_01_prefixo_vem_antes_de_quem_so_contem(self):
+        assert self.ids("joa") == [2, 1, 3]
+        assert self.ids("joa", limite=1) == [2]
+        assert self.cargas == 1
+
+    def test_02_sem_acento_e_letras_curtas(self):
+        assert self.ids("alvares") == [4]
+        assert self.ids("p") == [4, 2]  # "Pedro" começa com p; "Joana Prado" só contém
+        assert self.ids("") == []
+
+    def test_03_aproximada_tolera_erro_de_digitacao(self):
+        assert self.ids("mariama") == [3]
+        assert self.ids("xyzw") == []
+
+    def test_04_escritas_entram_na_hora(self):
+        self.indice.buscar("x")
+        self.indice.adicionar({"id_usuario": 5, "nome": "Joaquim Souza"})
+        assert self.ids("joaq")[:2] == [5, 3]
+
+        self.indice.adicionar({"id_usuario": 1, "nome": "Carlos Silva"})
+        assert 1 not in self.ids("joao")
+        assert self.indice.buscar("carlos")[0]["email"] == "joao@x.com"  # campos não informados são mantidos
+
+        self.indice.remover(2)
+        assert 2 not in self.ids("joana")
+
+    def esperar_remontagem(self):
+        for thread in threading.enumerate():
+            if thread.name == "indice-trigramas":
+                thread.join(timeout=2)
+
+    def test_05_remonta_depois_do_ttl(self):
+        self.indice.ttl = 0.01
+        self.indice.buscar("joa")
+        time.sleep(0.02)
+        self.indice.buscar("joa")
+        self.esperar_remontagem()
+        assert self.cargas == 2
+
+    def test_06_busca_nao_espera_a_remontagem(self):
+        self.indice.buscar("joa")
+        liberar = threading.Event()
+        self.indice.carregar = lambda: liberar.wait(2) and ALUNOS[:1]
+        self.indice.ttl = 0
+
+        inicio = time.monotonic()
+        assert self.ids("joa") == [2, 1, 3]  # vencido: responde do índice atual
+        assert self.ids("joa") == [2, 1, 3]  # e só uma thread remonta
+        assert time.monotonic() - inicio < 0.5
+
+        self.indice.adicionar({"id_usuario": 5, "nome": "Joaquim Souza"})
+        self.indice.ttl = 300
+        liberar.set()
+        self.esperar_remontagem()
+        # Carga nova trocou as estruturas e não perdeu o que foi gravado durante ela
+        assert self.ids("joa") == [1, 5]
+
+    def test_07_falha_na_remontagem_mantem_o_indice(self):
+        self.indice.buscar("joa")
+        self.indice.carregar = lambda: 1 / 0
+        self.indice.ttl = 0
+        assert self.ids("joa") == [2, 1, 3]
+        self.esperar_remontagem()
+        self.indice.ttl = 300
+        assert self.ids("pedro") == [4]
+        assert self.indice._escritas is None
+
+
+class TestIndiceNaAplicacao:
+    def setup_method(self):
+        self.app = Flask(__name__)
+        self.app.config["INDICE_BUSCA_ATIVO"] = True
+
+    def test_01_desligado_nao_cria_indice(self):
+        self.app.config["INDICE_BUSCA_ATIVO"] = False
+        with self.app.app_context():
+            assert obter_indice_alunos() is None
+            indexar_aluno({"id_usuario": 1, "nome": "Ana"})  # não faz nada
+        assert "indice_alunos" not in self.app.extensions
+
+    def test_02_busca_de_alunos_responde_do_indice(self):
+        with self.app.app_context():
+            obter_indice_alunos().carregar = lambda: ALUNOS
+            assert len(buscar_alunos(None, "jo", ("id_usuario",))) == 3
+
+            indexar_aluno({"id_usuario": 9, "nome": "Joelma", "email": "jo@x.com", "senha_hash": "nao"})
+            remover_aluno(2)
+            resultado = buscar_alunos(None, "jo", ("id_usuario", "nome", "email"))
+
+        assert [a["id_usuario"] for a in resultado] == [1, 9, 3]  # empate no prefixo: ordem alfabética
+        assert set(resultado[0]) == {"id_usuario", "nome", "email"}
+
+    def test_03_monta_no_inicio_do_worker(self, monkeypatch):
+        cargas = []
+        monkeypatch.setitem(indice_trigramas.FABRICAS, "indice_alunos", (lambda: cargas.append("alunos") or ALUNOS, "id_usuario"))
+        monkeypatch.setitem(indice_trigramas.FABRICAS, "indice_exercicios", (lambda: cargas.append("exercicios") or [], "id_exercicio"))
+
+        iniciar_indices(self.app)
+        assert cargas == ["alunos", "exercicios"]
+        with self.app.app_context():
+            assert [a["id_usuario"] for a in buscar_alunos(None, "joa", ("id_usuario",))] == [2, 1, 3]
+            assert len(obter_indice_exercicios()) == 0
+        assert cargas == ["alunos", "exercicios"]
+
+    def test_04_inicio_desligado_nao_carrega(self, monkeypatch):
+        monkeypatch.setitem(indice_trigramas.FABRICAS, "indice_alunos", (lambda: 1 / 0, "id_usuario"))
+        self.app.config["INDICE_BUSCA_ATIVO"] = False
+        iniciar_indices(self.app)
+        assert "indice_alunos" not in self.app.extensions
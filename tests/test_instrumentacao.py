@@ -0,0 +1,144 @@
+import json
+
+from flask import Flask, jsonify
+from app.extensions.db import PoolConexoes, get_db, init_db
+from app.utils.instrumentacao import EstatisticasSQL, impressao_digital, init_instrumentacao, obter_estatisticas_sql
+
+
+class BancoFalso:
+    def __init__(self):
+        self.open = True
+        self.execucoes = []
+
+    def cursor(self, *args):
+        return self
+
+    def execute(self, sql, params=None):
+        self.execucoes.append(sql)
+
+    def fetchall(self):
+        return [{"id": 1}, {"id": 2}]
+
+    def fetchone(self):
+        return {"id": 1}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def criar_app(**config):
+    app = Flask(__name__)
+    app.config.update(SQL_LIMITE_REPETICOES=3, **config)
+    init_db(app)
+    init_instrumentacao(app)
+    banco = BancoFalso()
+    app.extensions["db_pool"] = PoolConexoes(lambda: banco, tamanho_maximo=1)
+
+    @app.route("/plano/<int:refeicoes>")
+    def plano(refeicoes):
+        with get_db().cursor() as cursor:
+            cursor.execute("SELECT * FROM refeicoes WHERE id_plano = %s", (1,))
+            for linha in cursor.fetchall():
+                for _ in range(refeicoes):
+                    cursor.execute("SELECT nome, peso FROM alimentos WHERE id_refeicao = %s", (linha["id"],))
+                    cursor.fetchone()
+        return jsonify({})
+
+    @app.route("/sem-banco")
+    def sem_banco():
+        return jsonify({})
+
+    return app
+
+
+class TestInstrumentacao:
+    def test_01_impressao_digital_ignora_valores(self):
+        a = impressao_digital("SELECT * FROM usuarios\n  WHERE id_usuario = 7 AND nome = 'Ana'")
+        b = impressao_digital("SELECT * FROM usuarios WHERE id_usuario = %s AND nome = %s")
+        assert a == b == "SELECT * FROM usuarios WHERE id_usuario = ? AND nome = ?"
+        assert impressao_digital("WHERE id IN (1, 2, 3)") == impressao_digital("WHERE id IN (%s)")
+        assert impressao_digital("VALUES (%s, %s), (%s, %s);") == "VALUES (?+)"
+
+    def test_02_server_timing_e_linha_de_log(self, capsys):
+        resposta = criar_app().test_client().get("/plano/1")
+
+        timing = resposta.headers["Server-Timing"]
+        assert timing.startswith("db;dur=")
+        assert 'desc="3 consultas, 4 linhas"' in timing
+        assert "app;dur=" in timing
+
+        saida = capsys.readouterr().out
+        linha = next(l for l in saida.splitlines() if l.startswith("[SQL]"))
+        registro = json.loads(linha.split(" ", 1)[1])
+        assert registro["rota"] == "/plano/<int:refeicoes>"
+        assert registro["consultas"] == 3
+        assert registro["n_mais_1"] == []
+
+    def test_03_detecta_n_mais_1(self, capsys):
+        criar_app().test_client().get("/plano/2")
+
+        linha = next(l for l in capsys.readouterr().out.splitlines() if l.startswith("[SQL N+1]"))
+        registro = json.loads(linha.split("] ", 1)[1])
+        assert registro["n_mais_1"] == [
+            {"sql": "SELECT nome, peso FROM alimentos WHERE id_refeicao = ?", "vezes": 4}
+        ]
+
+    def test_04_desligada_ou_sem_consultas_nao_emite(self, capsys):
+        cliente = criar_app(SQL_INSTRUMENTACAO_ATIVA=False).test_client()
+        assert "Server-Timing" not in cliente.get("/plano/2").headers
+        assert "Server-Timing" not in criar_app().test_client().get("/sem-banco").headers
+        assert "[SQL" not in capsys.readouterr().out
+
+
+class TestEstatisticasSQL:
+    def test_01_agrega_por_origem_e_consulta(self):
+        estatisticas = EstatisticasSQL()
+        for ms in range(1, 101):
+            estatisticas.registrar("planos", "SELECT ?", ms / 1000)
+        estatisticas.contar_linhas("planos", "SELECT ?", 300)
+        estatisticas.registrar("admin", "SELECT ?", 0.5)
+
+        primeira, segunda = estatisticas.listar("tempo_medio_ms")
+        assert (primeira["origem"], primeira["chamadas"]) == ("admin", 1)
+        assert segunda["tempo_total_ms"] == 5050.0
+        assert segunda["tempo_medio_ms"] == 50.5
+        assert segunda["p95_ms"] == 96.0
+        assert segunda["linhas_por_chamada"] == 3.0
+        assert [l["origem"] for l in estatisticas.listar("chamadas")] == ["planos", "admin"]
+
+    def test_02_limite_de_consultas_e_zerar(self):
+        estatisticas = EstatisticasSQL(max_consultas=2, amostras=10)
+        for i in range(5):
+            estatisticas.registrar("app", f"SELECT {i}", 0.001)
+        assert {l["sql"] for l in estatisticas.listar()} == {"SELECT 0", "SELECT 1", EstatisticasSQL.OUTRAS}
+        assert next(l for l in estatisticas.listar() if l["sql"] == EstatisticasSQL.OUTRAS)["chamadas"] == 3
+
+        estatisticas.zerar()
+        assert estatisticas.listar() == []
+
+    def test_03_requisicoes_alimentam_o_agregado_do_worker(self):
+        app = criar_app()
+        cliente = app.test_client()
+        cliente.get("/plano/1")
+        cliente.get("/plano/1")
+
+        with app.app_context():
+            consultas = {l["sql"]: l for l in obter_estatisticas_sql().listar()}
+        alimentos = consultas["SELECT nome, peso FROM alimentos WHERE id_refeicao = ?"]
+        assert (alimentos["origem"], alimentos["chamadas"], alimentos["linhas"]) == ("app", 4, 4)
+        assert consultas["SELECT * FROM refeicoes WHERE id_plano = ?"]["linhas"] == 4
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from flask import Flask
+from app.extensions.db import PoolConexoes, init_db
+from app.utils.logs import BufferLogs, obter_buffer_logs, registrar_log_acao, registrar_log_envio
+from tests.test_pool_conexoes import CursorGravador
+
+
+# ===============================
+# Tabela logs em memória
+# ===============================
+class LogsFalsos:
+    def __init__(self):
+        self.lotes = []
+        self.falhar = False
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, linhas):
+        if self.falhar:
+            raise RuntimeError("MySQL fora do ar")
+        self.lotes.append((" ".join(sql.split()), list(linhas)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def linhas(self):
+        return [linha for _, linhas in self.lotes for linha in linhas]
+
+
+class TestBufferLogs:
+    def setup_method(self):
+        self.banco = LogsFalsos()
+        self.app = Flask(__name__)
+        self.app.config.update(LOGS_INTERVALO_MS=60000, LOGS_TAMANHO_LOTE=1000)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.banco, tamanho_maximo=2)
+
+    def test_01_registrar_nao_toca_no_banco_ate_o_flush(self):
+        with self.app.test_request_context():
+            for i in range(5):
+                registrar_log_acao("admin@teste.com", "login", f"tentativa {i}")
+            registrar_log_envio(7, "email", "aluno@teste.com", "Treino", "sucesso")
+        assert self.banco.lotes == []
+
+        assert obter_buffer_logs(self.app).descarregar() == 6
+        # Um INSERT multi-linha por tipo de log
+        assert len(self.banco.lotes) == 2
+        sql_acao, linhas_acao = self.banco.lotes[0]
+        assert sql_acao.startswith("INSERT INTO logs (tipo_log, usuario_origem")
+        assert [linha[3] for linha in linhas_acao] == [f"tentativa {i}" for i in range(5)]
+        assert self.banco.lotes[1][1][0][:6] == ("envio", 7, "email", "aluno@teste.com", "Treino", "sucesso")
+
+    def test_02_flush_automatico_por_tamanho_e_por_tempo(self):
+        por_tamanho = BufferLogs(self.app, tamanho_lote=3, intervalo_ms=60000)
+        por_tamanho.iniciar()
+        for i in range(3):
+            por_tamanho.adicionar("acao", ("a@teste.com", "login", str(i), None))
+        self._esperar(lambda: len(self.banco.linhas) == 3)
+        por_tamanho.encerrar()
+
+        por_tempo = BufferLogs(self.app, tamanho_lote=1000, intervalo_ms=50)
+        por_tempo.iniciar()
+        por_tempo.adicionar("acao", ("a@teste.com", "logout", "", None))
+        self._esperar(lambda: len(self.banco.linhas) == 4)
+        por_tempo.encerrar()
+
+    def test_03_buffer_cheio_descarta_e_conta(self):
+        buffer = BufferLogs(self.app, capacidade=2, politica="descartar")
+        assert buffer.adicionar("acao", ("a", "x", "", None))
+        assert buffer.adicionar("acao", ("a", "x", "", None))
+        assert not buffer.adicionar("acao", ("a", "x", "", None))
+        assert buffer.estatisticas()["descartadas"] == 1
+        assert buffer.estatisticas()["pendentes"] == 2
+
+    def test_04_politica_bloquear_espera_o_flush_liberar_espaco(self):
+        buffer = BufferLogs(self.app, capacidade=1, politica="bloquear", tempo_bloqueio_ms=2000)
+        buffer.adicionar("acao", ("a", "x", "1", None))
+        threading.Timer(0.1, buffer.descarregar).start()
+
+        inicio = time.monotonic()
+        assert buffer.adicionar("acao", ("a", "x", "2", None))
+        assert time.monotonic() - inicio >= 0.05
+        assert buffer.estatisticas()["descartadas"] == 0
+
+    def test_05_falha_no_banco_nao_propaga_para_quem_loga(self):
+        self.banco.falhar = True
+        buffer = BufferLogs(self.app)
+        buffer.adicionar("envio", (1, "email", "a@teste.com", "x", "sucesso", None))
+        assert buffer.descarregar() == 0
+        assert buffer.estatisticas() == {"pendentes": 0, "capacidade": 10000, "gravadas": 0, "descartadas": 1}
+
+    def test_06_flush_vira_um_unico_insert_no_pymysql(self):
+        cursor = CursorGravador()
+        self.banco.cursor = lambda: cursor
+        buffer = BufferLogs(self.app)
+        for i in range(20):
+            buffer.adicionar("acao", ("admin@teste.com", "login", f"tentativa {i}", None))
+
+        assert buffer.descarregar() == 20
+        assert len(cursor.executados) == 1
+        assert cursor.executados[0].startswith("INSERT INTO logs (tipo_log, usuario_origem, acao, detalhes, data) VALUES ('acao', ")
+        assert cursor.rowcount == 20
+
+    @staticmethod
+    def _esperar(condicao, limite=2):
+        fim = time.monotonic() + limite
+        while not condicao():
+            assert time.monotonic() < fim, "flush não aconteceu"
+            time.sleep(0.01)
@@ -0,0 +1,77 @@
+import socket
+import socketserver
+import threading
+import time
+
+from flask import Flask
+from flask_mail import Message
+from app.extensions.mail import MailerPersistente, mail
+from tests.test_fila_envios import SMTPFalso
+
+
+class TestMailerPersistente:
+    def setup_method(self):
+        self.smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPFalso)
+        self.smtp.daemon_threads = True
+        self.smtp.mensagens = []
+        self.smtp.sessoes = 0
+        self.smtp.comandos = []
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+
+        self.app = Flask(__name__)
+        self.app.config.update(
+            MAIL_SERVER="127.0.0.1",
+            MAIL_PORT=self.smtp.server_address[1],
+            MAIL_USE_TLS=False,
+            MAIL_DEFAULT_SENDER="academia@alpphasgym.com",
+        )
+        mail.init_app(self.app)
+        self.mailer = MailerPersistente()
+
+    def teardown_method(self):
+        with self.app.app_context():
+            self.mailer.fechar()
+        self.smtp.shutdown()
+        self.smtp.server_close()
+
+    def mensagens(self, quantidade):
+        return [Message(f"Treino {i}", recipients=[f"aluno{i}@teste.com"], body="Segue o treino") for i in range(quantidade)]
+
+    def test_01_lote_usa_uma_unica_sessao_smtp(self):
+        with self.app.app_context():
+            erros = self.mailer.enviar_lote(self.mensagens(5))
+        assert erros == [None] * 5
+        assert len(self.smtp.mensagens) == 5
+        assert self.smtp.sessoes == 1
+        assert self.smtp.comandos.count("EHLO") == 1
+
+    def test_02_reconecta_quando_o_servidor_derruba_a_sessao(self):
+        self.smtp.derrubar = True
+        with self.app.app_context():
+            erros = self.mailer.enviar_lote(self.mensagens(3))
+        assert erros == [None] * 3
+        assert len(self.smtp.mensagens) == 3
+        assert self.smtp.sessoes == 2
+
+    def test_03_sessao_ociosa_e_verificada_com_noop(self):
+        self.mailer.tempo_ocioso_maximo = 0
+        with self.app.app_context():
+            self.mailer.enviar_lote(self.mensagens(2))
+        assert self.smtp.comandos.count("NOOP") == 1
+        assert self.smtp.sessoes == 1
+
+    def test_04_servidor_travado_vira_erro_pelo_timeout(self):
+        travado = socket.socket()
+        travado.bind(("127.0.0.1", 0))
+        travado.listen()  # aceita a conexão e nunca responde o 220
+        self.app.config["MAIL_PORT"] = travado.getsockname()[1]
+        mail.init_app(self.app)
+        self.mailer.timeout = 0.2
+        try:
+            with self.app.app_context():
+                inicio = time.monotonic()
+                erros = self.mailer.enviar_lote(self.mensagens(1))
+            assert erros[0] is not None
+            assert time.monotonic() - inicio < 2
+        finally:
+            travado.close()
@@ -0,0 +1,78 @@
+import pytest
+from flask import Blueprint, Flask, jsonify
+from prometheus_client import REGISTRY
+
+from app.utils.metricas import DURACAO_ENVIO, FALHAS_ENVIO, init_metricas, medir
+from app.utils.pdf_base import DocumentoPDF
+
+
+def amostra(nome, **rotulos):
+    return REGISTRY.get_sample_value(nome, rotulos) or 0
+
+
+def criar_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    init_metricas(app)
+
+    bp = Blueprint("exemplo", __name__)
+
+    @bp.route("/<int:id>")
+    def detalhar(id):
+        return jsonify({"id": id}), 200 if id else 404
+
+    app.register_blueprint(bp, url_prefix="/exemplo")
+    return app
+
+
+class TestMetricas:
+    def test_01_requisicoes_por_blueprint_endpoint_e_status(self):
+        rotulos = {"blueprint": "exemplo", "endpoint": "exemplo.detalhar", "metodo": "GET"}
+        antes_ok = amostra("alpphas_http_requisicoes_total", status="200", **rotulos)
+        antes_404 = amostra("alpphas_http_requisicoes_total", status="404", **rotulos)
+        antes_hist = amostra("alpphas_http_requisicao_duracao_segundos_count", **rotulos)
+
+        cliente = criar_app().test_client()
+        cliente.get("/exemplo/1")
+        cliente.get("/exemplo/2")
+        cliente.get("/exemplo/0")
+
+        assert amostra("alpphas_http_requisicoes_total", status="200", **rotulos) == antes_ok + 2
+        assert amostra("alpphas_http_requisicoes_total", status="404", **rotulos) == antes_404 + 1
+        assert amostra("alpphas_http_requisicao_duracao_segundos_count", **rotulos) == antes_hist + 3
+
+    def test_02_exposicao_no_formato_do_prometheus(self):
+        cliente = criar_app().test_client()
+        cliente.get("/exemplo/1")
+        resposta = cliente.get("/metrics")
+
+        assert resposta.status_code == 200
+        assert resposta.mimetype == "text/plain"
+        corpo = resposta.get_data(as_text=True)
+        assert 'alpphas_http_requisicoes_total{blueprint="exemplo",endpoint="exemplo.detalhar"' in corpo
+        assert "alpphas_db_pool_espera_segundos_bucket" in corpo
+        assert "alpphas_logs_buffer_pendentes" in corpo
+
+    def test_03_token_protege_o_endpoint(self):
+        cliente = criar_app(METRICAS_TOKEN="segredo").test_client()
+        assert cliente.get("/metrics").status_code == 403
+        assert cliente.get("/metrics", headers={"Authorization": "Bearer errado"}).status_code == 403
+        assert cliente.get("/metrics", headers={"Authorization": "Bearer segredo"}).status_code == 200
+
+    def test_04_medir_conta_duracao_e_falhas(self):
+        antes = amostra("alpphas_envio_duracao_segundos_count", canal="teste")
+        falhas = amostra("alpphas_envio_falhas_total", canal="teste")
+
+        with medir(DURACAO_ENVIO, FALHAS_ENVIO, canal="teste"):
+            pass
+        with pytest.raises(ConnectionError):
+            with medir(DURACAO_ENVIO, FALHAS_ENVIO, canal="teste"):
+                raise ConnectionError("smtp fora")
+
+        assert amostra("alpphas_envio_duracao_segundos_count", canal="teste") == antes + 2
+        assert amostra("alpphas_envio_falhas_total", canal="teste") == falhas + 1
+
+    def test_05_renderizacao_de_pdf_por_documento(self):
+        antes = amostra("alpphas_pdf_duracao_segundos_count", documento="ficha_de_treino")
+        DocumentoPDF("Ficha de Treino", ["Profissional: Ana"]).finalizar()
+        assert amostra("alpphas_pdf_duracao_segundos_count", documento="ficha_de_treino") == antes + 1
@@ -0,0 +1,268 @@
+import ast
+import importlib.util
+import os
+import re
+
+import pytest
+
+from app.utils.migracoes import PASTA_MIGRACOES, aplicar_migracoes, dividir_sql, listar_migracoes
+
+
+class BancoMigracoes:
+    """Guarda os comandos executados; schema_versoes vive em `versoes`."""
+
+    def __init__(self, versoes=(), falhar_em=None):
+        self.versoes = set(versoes)
+        self.falhar_em = falhar_em
+        self.comandos = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.resultado = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        if self.falhar_em and self.falhar_em in sql:
+            raise RuntimeError("falhou")
+        self.comandos.append(sql.strip())
+        if sql.startswith("SELECT GET_LOCK"):
+            self.resultado = [{"obtido": 1}]
+        elif sql.startswith("SELECT versao"):
+            self.resultado = [{"versao": v} for v in sorted(self.versoes)]
+        elif sql.startswith("INSERT INTO schema_versoes"):
+            self.versoes.add(params[0])
+
+    def fetchone(self):
+        return self.resultado[0]
+
+    def fetchall(self):
+        return self.resultado
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class BancoEsquema:
+    """Responde às consultas ao information_schema com as colunas de `existentes`."""
+
+    def __init__(self, existentes=()):
+        self.existentes = set(existentes)
+        self.comandos = []
+
+    def execute(self, sql, params=None):
+        self.comandos.append(" ".join(sql.split()))
+        self.total = int(tuple(params or ()) in self.existentes)
+        if sql.startswith("ALTER TABLE"):
+            partes = sql.split()
+            self.existentes.add((partes[2], partes[5]))
+
+    def executemany(self, sql, params):
+        self.comandos.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return {"total": self.total}
+
+    def fetchall(self):
+        return []
+
+
+def carregar_migracao(nome):
+    migracao = next(m for m in listar_migracoes(PASTA_MIGRACOES) if m.nome == nome)
+    spec = importlib.util.spec_from_file_location(f"migracao_{migracao.versao:04d}", migracao.caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+PALAVRAS_SQL = {"WHERE", "JOIN", "ON", "LEFT", "RIGHT", "INNER", "ORDER", "GROUP", "LIMIT", "SET", "AND", "FOR", "AS"}
+
+
+def esquema_de_banco_novo():
+    """Tabela -> colunas de um banco criado do zero por `flask db upgrade`."""
+    tabelas = {}
+    banco = BancoEsquema()
+    for migracao in listar_migracoes(PASTA_MIGRACOES):
+        if migracao.nome.endswith(".py"):
+            carregar_migracao(migracao.nome).aplicar(banco)
+            continue
+        with open(migracao.caminho, encoding="utf-8") as arquivo:
+            comandos = dividir_sql(arquivo.read())
+        for comando in comandos:
+            criacao = re.match(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)$", comando, re.S)
+            if not criacao:
+                continue
+            linhas = (linha.split("--")[0].strip() for linha in criacao.group(2).splitlines())
+            tabelas[criacao.group(1)] = {
+                linha.split()[0] for linha in linhas
+                if re.match(r"[a-z_]+ [A-Z]", linha) and not linha.startswith(("REFERENCES", "FOREIGN"))
+            }
+    for tabela, coluna in banco.existentes:
+        tabelas[tabela].add(coluna)
+    return tabelas
+
+
+def consultas_do_app():
+    """(arquivo, linha, sql numa linha só) de cada string com SQL em app/, fora as migrações."""
+    raiz_app = os.path.dirname(PASTA_MIGRACOES)
+    for pasta_atual, _, arquivos in os.walk(raiz_app):
+        if pasta_atual.startswith(PASTA_MIGRACOES):
+            continue
+        for nome in arquivos:
+            if not nome.endswith(".py"):
+                continue
+            caminho = os.path.join(pasta_atual, nome)
+            with open(caminho, encoding="utf-8") as arquivo:
+                arvore = ast.parse(arquivo.read())
+            for no in ast.walk(arvore):
+                if isinstance(no, ast.Constant) and isinstance(no.value, str):
+                    texto = no.value
+                elif isinstance(no, ast.JoinedStr):
+                    texto = "".join(v.value if isinstance(v, ast.Constant) else "?" for v in no.values)
+                else:
+                    continue
+                if re.search(r"\b(SELECT|INSERT INTO|UPDATE)\b", texto):
+                    yield os.path.relpath(caminho, raiz_app), no.lineno, " ".join(texto.split())
+
+
+def colunas_usadas(sql, tabelas):
+    """
+    (tabela, coluna) que o SQL referencia de forma inequívoca: alias.coluna,
+    lista do INSERT, SET do UPDATE e o SELECT simples de uma tabela só.
+    """
+    aliases = {}
+    for tabela, alias in re.findall(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql):
+        if tabela in tabelas:
+            aliases[tabela] = tabela
+            if alias and alias.upper() not in PALAVRAS_SQL:
+                aliases[alias] = tabela
+    usadas = {(aliases[alias], coluna) for alias, coluna in re.findall(r"\b(\w+)\.(\w+)\b", sql) if alias in aliases}
+
+    insercao = re.match(r"INSERT (?:IGNORE )?INTO (\w+) \(([\w, ]+)\)", sql)
+    if insercao and insercao.group(1) in tabelas:
+        usadas |= {(insercao.group(1), c.strip()) for c in insercao.group(2).split(",")}
+
+    atualizacao = re.match(r"UPDATE (\w+) SET (.*?)(?: WHERE .*)?$", sql)
+    if atualizacao and atualizacao.group(1) in tabelas:
+        usadas |= {(atualizacao.group(1), c) for c in re.findall(r"(?:^|, ?)(\w+) ?=", atualizacao.group(2))}
+
+    selecao = re.fullmatch(r"SELECT ([\w, ]+?(?: AS \w+)?(?:, [\w ]+?)*) FROM (\w+)(?: (?:WHERE|ORDER|LIMIT|FOR)\b.*)?", sql)
+    if selecao and selecao.group(2) in tabelas:
+        usadas |= {(selecao.group(2), c.split()[0]) for c in selecao.group(1).split(",")}
+    return usadas
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    (tmp_path / "0001_inicial.sql").write_text("-- tabela a\nCREATE TABLE a (id INT);\nCREATE TABLE b (\n    id INT\n);\n")
+    (tmp_path / "0002_indice.sql").write_text("ALTER TABLE a ADD INDEX idx_a (id);\n")
+    (tmp_path / "0003_carga.py").write_text("def aplicar(cursor):\n    cursor.execute('UPDATE a SET id = id')\n")
+    (tmp_path / "LEIAME.txt").write_text("ignorado")
+    return str(tmp_path)
+
+
+class TestMigracoes:
+    def test_01_divide_comandos_e_ignora_comentarios(self):
+        comandos = dividir_sql("-- comentário; com ponto e vírgula\nSET x = 1;\n\nCREATE TABLE t (\n  a INT -- coluna\n);\nSELECT 1")
+        assert comandos == ["SET x = 1", "CREATE TABLE t (\n  a INT -- coluna\n)", "SELECT 1"]
+
+    def test_02_lista_em_ordem_e_recusa_versao_repetida(self, pasta, tmp_path):
+        assert [m.versao for m in listar_migracoes(pasta)] == [1, 2, 3]
+        (tmp_path / "0002_outra.sql").write_text("SELECT 1;")
+        with pytest.raises(ValueError):
+            listar_migracoes(pasta)
+
+    def test_03_aplica_pendentes_e_registra_versao(self, pasta):
+        banco = BancoMigracoes(versoes={1})
+        aplicadas = aplicar_migracoes(banco, pasta=pasta)
+
+        assert [m.nome for m in aplicadas] == ["0002_indice.sql", "0003_carga.py"]
+        assert banco.versoes == {1, 2, 3}
+        assert "CREATE TABLE a (id INT)" not in banco.comandos
+        assert "UPDATE a SET id = id" in banco.comandos
+        assert banco.comandos[-1].startswith("SELECT RELEASE_LOCK")
+
+        assert aplicar_migracoes(banco, pasta=pasta) == []
+
+    def test_04_para_no_alvo(self, pasta):
+        banco = BancoMigracoes()
+        assert [m.versao for m in aplicar_migracoes(banco, alvo=1, pasta=pasta)] == [1]
+        assert "CREATE TABLE b (\n    id INT\n)" in banco.comandos
+
+    def test_05_falha_nao_registra_e_solta_o_lock(self, pasta):
+        banco = BancoMigracoes(falhar_em="ALTER TABLE a")
+        with pytest.raises(RuntimeError):
+            aplicar_migracoes(banco, pasta=pasta)
+        assert banco.versoes == {1}
+        assert banco.rollbacks == 1
+        assert banco.comandos[-1].startswith("SELECT RELEASE_LOCK")
+
+    def test_06_esquema_inicial_tem_os_indices_das_consultas(self):
+        migracoes = listar_migracoes(PASTA_MIGRACOES)
+        assert migracoes[0].nome == "0001_esquema_inicial.sql"
+        with open(migracoes[0].caminho, encoding="utf-8") as arquivo:
+            esquema = arquivo.read()
+        for indice in (
+            "(id_aluno, data_avaliacao)",
+            "(id_profissional, status, data_hora_inicio)",
+            "(id_aluno, ativo, data_execucao)",
+            "(id_exercicio, id_registro)",
+            "uq_tokensrevogados_jti (jti)",
+            "(tipo_log, data)",
+        ):
+            assert indice in esquema
+
+    def test_07_migracoes_nao_dependem_do_codigo_do_app(self):
+        # Só os utilitários de migração: o resto do app muda e a migração precisa continuar igual
+        for migracao in listar_migracoes(PASTA_MIGRACOES):
+            if not migracao.nome.endswith(".py"):
+                continue
+            with open(migracao.caminho, encoding="utf-8") as arquivo:
+                arvore = ast.parse(arquivo.read())
+            modulos = [n.module for n in ast.walk(arvore) if isinstance(n, ast.ImportFrom)]
+            modulos += [a.name for n in ast.walk(arvore) if isinstance(n, ast.Import) for a in n.names]
+            assert [m for m in modulos if m.startswith("app") and m != "app.utils.migracoes"] == [], migracao.nome
+
+    def test_08_coluna_nova_pode_ser_reaplicada(self):
+        migracao = carregar_migracao("0003_filaenvios_traceparent.py")
+        banco = BancoEsquema()
+        migracao.aplicar(banco)
+        migracao.aplicar(banco)
+        assert [c for c in banco.comandos if c.startswith("ALTER")] == [
+            "ALTER TABLE filaenvios ADD COLUMN traceparent VARCHAR(55) NULL"
+        ]
+
+    def test_09_nome_busca_congelado_na_0002(self):
+        migracao = carregar_migracao("0002_completar_bancos_existentes.py")
+        assert migracao.normalizar_nome("João  D'Ávila") == "joao d avila"
+
+    def test_10_banco_novo_tem_as_colunas_que_o_app_consulta(self):
+        tabelas = esquema_de_banco_novo()
+        assert {"titulo", "descricao_geral"} <= tabelas["planosalimentares"]
+        assert "traceparent" in tabelas["filaenvios"]
+
+        faltando = [
+            f"{arquivo}:{linha} {tabela}.{coluna}"
+            for arquivo, linha, sql in consultas_do_app()
+            for tabela, coluna in colunas_usadas(sql, tabelas)
+            if coluna not in tabelas[tabela]
+        ]
+        assert faltando == []
+
+    def test_11_colunas_do_plano_em_bancos_antigos(self):
+        migracao = carregar_migracao("0005_planosalimentares_titulo.py")
+        banco = BancoEsquema(existentes={("planosalimentares", "titulo")})
+        migracao.aplicar(banco)
+        migracao.aplicar(banco)
+        assert [c for c in banco.comandos if c.startswith("ALTER")] == [
+            "ALTER TABLE planosalimentares ADD COLUMN descricao_geral TEXT NULL AFTER titulo"
+        ]
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+from app.utils.paginacao import ErroPaginacao, Paginacao, codificar_cursor, decodificar_cursor
+
+
+class CursorSQLite:
+    """Executa o SQL gerado pela paginação num SQLite em memória (placeholders %s -> ?)."""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.executados = []
+
+    def execute(self, sql, params=()):
+        self.executados.append(sql)
+        self.linhas = self.conexao.execute(sql.replace("%s", "?"), params).fetchall()
+
+    def fetchall(self):
+        return [dict(linha) for linha in self.linhas]
+
+
+ORDEM = [("a.data_avaliacao", "data_avaliacao", "DESC"), ("a.id_avaliacao", "id_avaliacao", "DESC")]
+SQL = "SELECT a.* FROM avaliacoes a WHERE a.id_aluno = %s AND {apos_cursor}"
+
+
+class TestPaginacao:
+    def setup_method(self):
+        conexao = sqlite3.connect(":memory:")
+        conexao.row_factory = sqlite3.Row
+        conexao.execute("CREATE TABLE avaliacoes (id_avaliacao INTEGER, id_aluno INTEGER, data_avaliacao TEXT)")
+        # Várias avaliações no mesmo dia: o id desempata
+        linhas = [(i, 7, f"2025-01-{(i + 1) // 2:02d}") for i in range(1, 12)] + [(99, 8, "2025-01-01")]
+        conexao.executemany("INSERT INTO avaliacoes VALUES (?, ?, ?)", linhas)
+        self.cursor = CursorSQLite(conexao)
+        self.app = Flask(__name__)
+
+    def paginar(self, query_string):
+        with self.app.test_request_context(query_string=query_string):
+            return Paginacao.da_requisicao(ORDEM).executar(self.cursor, SQL, (7,))
+
+    def test_01_sem_parametros_devolve_a_lista_completa(self):
+        resultado = self.paginar({})
+        assert isinstance(resultado, list)
+        assert [r["id_avaliacao"] for r in resultado] == list(range(11, 0, -1))
+        assert "LIMIT" not in self.cursor.executados[-1]
+
+    def test_02_percorre_todas_as_paginas_sem_repetir_nem_pular(self):
+        vistos, cursor = [], None
+        while True:
+            pagina = self.paginar({"limit": 3, **({"cursor": cursor} if cursor else {})})
+            vistos += [r["id_avaliacao"] for r in pagina["itens"]]
+            cursor = pagina["next_cursor"]
+            if cursor is None:
+                break
+        assert vistos == list(range(11, 0, -1))
+
+    def test_03_limite_respeita_o_maximo(self):
+        self.app.config["PAGINACAO_LIMITE_MAXIMO"] = 2
+        assert len(self.paginar({"limit": 500})["itens"]) == 2
+
+    def test_04_cursor_ou_limit_invalido_e_400(self):
+        with pytest.raises(ErroPaginacao):
+            self.paginar({"cursor": "isso-nao-e-um-cursor"})
+        with pytest.raises(ErroPaginacao):
+            self.paginar({"cursor": codificar_cursor(["2025-01-01"])})  # chaves a menos
+        with pytest.raises(ErroPaginacao):
+            self.paginar({"limit": "0"})
+        assert ErroPaginacao.code == 400
+
+    def test_05_cursor_e_opaco_e_reversivel(self):
+        cursor = codificar_cursor(["2025-01-03 10:00:00", 5])
+        assert "2025" not in cursor
+        assert decodificar_cursor(cursor, 2) == ["2025-01-03 10:00:00", 5]
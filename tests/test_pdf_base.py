@@ -0,0 +1,53 @@
+import re
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+
+from app.utils.pdf_base import LOGO_PATH, DocumentoPDF, _xobject_imagem, carregar_imagem, desenhar_imagem
+
+
+class TestDocumentoPDF:
+    def test_01_logo_decodificado_uma_unica_vez(self):
+        DocumentoPDF("Teste", ["Profissional: Teste"]).finalizar()
+        antes = _xobject_imagem.cache_info().misses
+        for _ in range(3):
+            DocumentoPDF("Teste", ["Profissional: Teste"]).finalizar()
+        assert _xobject_imagem.cache_info().misses == antes
+
+    def test_02_logo_incluido_uma_vez_por_documento(self):
+        doc = DocumentoPDF("Teste", ["Profissional: Teste"])
+        for i in range(120):
+            doc.garantir_espaco()
+            doc.texto(80, f"Linha {i}", avanco=15)
+        pdf = doc.finalizar().getvalue()
+
+        assert pdf.startswith(b"%PDF")
+        assert pdf.count(b"/Subtype /Image") == 2  # logo + máscara de transparência
+        assert pdf.count(b"/Type /Page\n") == 3
+
+    def test_03_internals_do_reportlab_continuam_os_mesmos(self, monkeypatch, capsys):
+        # Se um upgrade do ReportLab quebrar o XObject em cache, o fallback silencioso não pode esconder
+        def proibido(*args, **kwargs):
+            raise AssertionError("caiu no drawImage: internals do ReportLab mudaram")
+        monkeypatch.setattr(canvas.Canvas, "drawImage", proibido)
+
+        pdf = DocumentoPDF("Teste", ["Profissional: Teste"]).finalizar().getvalue()
+        saida = capsys.readouterr().out
+        assert "Erro ao carregar logo" not in saida
+        assert "[ERRO]" not in saida
+        assert pdf.count(b"/Subtype /Image") == 2
+        assert re.search(rb"/SMask \d+ 0 R", pdf)
+
+    def test_04_mesmo_conteudo_que_o_drawimage_publico(self):
+        def imagens(desenhar):
+            buffer = BytesIO()
+            c = canvas.Canvas(buffer, invariant=1)
+            desenhar(c)
+            c.save()
+            pdf = buffer.getvalue()
+            return sorted(re.findall(rb"/Subtype /Image.*?stream\r?\n(.*?)endstream", pdf, re.S))
+
+        nosso = imagens(lambda c: desenhar_imagem(c, LOGO_PATH, 40, 40, 60, 60))
+        publico = imagens(lambda c: c.drawImage(carregar_imagem(LOGO_PATH), 40, 40, 60, 60, mask="auto"))
+        assert len(nosso) == 2
+        assert nosso == publico
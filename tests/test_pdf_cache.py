@@ -0,0 +1,62 @@
+from io import BytesIO
+
+from flask import Flask
+from app.utils.pdf_cache import CachePDF, chave_pdf, responder_pdf
+
+
+class TestCachePDF:
+    def setup_method(self):
+        self.renderizacoes = 0
+
+    def gerar(self, dados):
+        self.renderizacoes += 1
+        return BytesIO(b"%PDF-" + str(dados).encode())
+
+    def test_01_mesmos_dados_nao_renderizam_de_novo(self):
+        cache = CachePDF()
+        primeiro = cache.obter_ou_gerar("treino", {"id": 1, "nome": "A"}, self.gerar)
+        segundo = cache.obter_ou_gerar("treino", {"nome": "A", "id": 1}, self.gerar)
+        assert self.renderizacoes == 1
+        assert primeiro == segundo
+
+    def test_02_dados_alterados_geram_nova_chave(self):
+        assert chave_pdf("treino", {"series": 3}) != chave_pdf("treino", {"series": 4})
+        assert chave_pdf("treino", {"id": 1}) != chave_pdf("plano", {"id": 1})
+
+    def test_03_despeja_pelo_total_de_bytes(self):
+        cache = CachePDF(limite_bytes=25)
+        cache.guardar("a", b"x" * 10)
+        cache.guardar("b", b"x" * 10)
+        cache.obter("a")
+        cache.guardar("c", b"x" * 10)
+        assert cache.obter("b") is None
+        assert cache.obter("a") is not None
+        assert cache.estatisticas()["bytes"] == 20
+
+    def test_04_despejados_vao_para_o_disco(self, tmp_path):
+        cache = CachePDF(limite_bytes=15, pasta_disco=str(tmp_path))
+        cache.guardar("a", b"x" * 10)
+        cache.guardar("b", b"y" * 10)
+        assert (tmp_path / "a.pdf").exists()
+        assert cache.obter("a")[0] == b"x" * 10
+
+
+class TestRespostaCondicional:
+    def setup_method(self):
+        self.app = Flask(__name__)
+
+        @self.app.route("/pdf")
+        def pdf():
+            return responder_pdf("treino", {"id": 1}, lambda d: BytesIO(b"%PDF-1"), "treino.pdf")
+
+    def test_01_etag_devolve_304(self):
+        cliente = self.app.test_client()
+        res = cliente.get("/pdf")
+        assert res.status_code == 200
+        assert res.headers["ETag"]
+        assert res.headers["Last-Modified"]
+        assert "private" in res.headers["Cache-Control"]
+
+        res = cliente.get("/pdf", headers={"If-None-Match": res.headers["ETag"]})
+        assert res.status_code == 304
+        assert res.data == b""
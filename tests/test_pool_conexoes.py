@@ -0,0 +1,250 @@
+import threading
+import time
+
+import pymysql
+import pytest
+from flask import Flask
+from app.extensions.db import (
+    PoolConexoes, consultas_em_lote, get_db, init_db, inserir_em_lote, obter_pool, obter_pool_lote,
+)
+
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.open = True
+        self.pings = 0
+        self.rollbacks = 0
+        self.commits = 0
+        self.responde = True
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.responde:
+            raise ConnectionError("servidor sumiu")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.open = False
+
+
+class TestPoolConexoes:
+    def setup_method(self):
+        self.criadas = []
+
+    def fabrica(self):
+        conexao = ConexaoFalsa()
+        self.criadas.append(conexao)
+        return conexao
+
+    def test_01_reutiliza_conexao_devolvida(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=2)
+        db = pool.obter()
+        db.close()
+        db = pool.obter()
+        db.close()
+
+        assert len(self.criadas) == 1
+        assert self.criadas[0].pings == 1
+        assert self.criadas[0].rollbacks == 2
+
+    def test_02_close_e_idempotente(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=1)
+        db = pool.obter()
+        db.close()
+        db.close()
+        assert pool.estatisticas() == {"livres": 1, "em_uso": 0, "maximo": 1}
+
+    def test_03_descarta_conexao_que_nao_responde_ao_ping(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=1)
+        pool.obter().close()
+        self.criadas[0].responde = False
+
+        pool.obter().close()
+        assert len(self.criadas) == 2
+        assert not self.criadas[0].open
+
+    def test_04_recicla_conexao_apos_tempo_de_vida(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=1, tempo_vida_maximo=0)
+        pool.obter().close()
+        pool.obter().close()
+        assert len(self.criadas) == 2
+        assert not self.criadas[0].open
+
+    def test_05_fecha_conexoes_ociosas(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=2, tempo_ocioso_maximo=0.01)
+        pool.obter().close()
+        time.sleep(0.02)
+        pool.obter().close()
+        assert len(self.criadas) == 2
+        assert not self.criadas[0].open
+
+    def test_06_limite_de_conexoes_com_espera(self):
+        pool = PoolConexoes(self.fabrica, tamanho_maximo=1, tempo_espera=0.05)
+        db = pool.obter()
+        with pytest.raises(RuntimeError):
+            pool.obter()
+
+        threading.Timer(0.01, db.close).start()
+        pool.tempo_espera = 1
+        pool.obter().close()
+        assert len(self.criadas) == 1
+
+    def test_07_falha_na_fabrica_libera_vaga(self):
+        def fabrica_quebrada():
+            raise RuntimeError("banco indisponível")
+
+        pool = PoolConexoes(fabrica_quebrada, tamanho_maximo=1, tempo_espera=0.01)
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="indisponível"):
+                pool.obter()
+        assert pool.estatisticas()["em_uso"] == 0
+
+
+class TestSessaoRequisicao:
+    def setup_method(self):
+        self.criadas = []
+        self.app = Flask(__name__)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(self.fabrica, tamanho_maximo=2)
+
+        @self.app.route("/ok")
+        def ok():
+            get_db().close()
+            get_db()
+            return "ok"
+
+        @self.app.route("/erro")
+        def erro():
+            get_db()
+            return "erro", 500
+
+    def fabrica(self):
+        conexao = ConexaoFalsa()
+        self.criadas.append(conexao)
+        return conexao
+
+    def test_01_uma_conexao_por_requisicao_confirmada_no_teardown(self):
+        res = self.app.test_client().get("/ok")
+        assert res.status_code == 200
+        assert len(self.criadas) == 1
+        assert self.criadas[0].commits == 1
+        assert self.app.extensions["db_pool"].estatisticas()["em_uso"] == 0
+
+    def test_02_erro_interno_desfaz_a_transacao(self):
+        res = self.app.test_client().get("/erro")
+        assert res.status_code == 500
+        assert self.criadas[0].commits == 0
+        assert self.app.extensions["db_pool"].estatisticas()["em_uso"] == 0
+
+
+class CursorMultiStatement:
+    """Conexão e cursor do pool de lote ao mesmo tempo."""
+
+    def __init__(self, resultados):
+        self.resultados = resultados
+        self.executados = []
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def mogrify(self, sql, params):
+        return sql % tuple(repr(p) for p in params)
+
+    def execute(self, sql):
+        self.executados.append(sql)
+
+    def fetchall(self):
+        return self.resultados.pop(0)
+
+    def nextset(self):
+        return True if self.resultados else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestConsultasEmLote:
+    def setup_method(self):
+        self.app = Flask(__name__)
+        init_db(self.app)
+        self.principal = ConexaoFalsa()
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.principal, tamanho_maximo=1)
+
+    def test_01_uma_unica_execucao_e_um_resultado_por_consulta(self):
+        cursor = CursorMultiStatement([[{"id": 1}], [], [{"total": 3}]])
+        self.app.extensions["db_pool_lote"] = PoolConexoes(lambda: cursor, tamanho_maximo=1)
+        with self.app.app_context():
+            resultados = consultas_em_lote([
+                ("SELECT * FROM usuarios WHERE id_usuario = %s", (1,)),
+                ("SELECT * FROM treinos WHERE id_aluno = %s;", (1,)),
+                ("SELECT COUNT(*) AS total FROM agendamentos WHERE id_aluno = %s", (1,)),
+            ])
+
+        assert resultados == [[{"id": 1}], [], [{"total": 3}]]
+        assert len(cursor.executados) == 1
+        assert cursor.executados[0].count(";") == 2
+        # Conexão devolvida ao pool de lote e a da requisição nem foi aberta
+        assert self.app.extensions["db_pool_lote"].estatisticas() == {"livres": 1, "em_uso": 0, "maximo": 1}
+        assert self.principal.pings == 0
+
+    def test_02_multi_statement_so_no_pool_de_lote(self, monkeypatch):
+        flags = []
+        monkeypatch.setattr(pymysql, "connect", lambda **kwargs: flags.append(kwargs["client_flag"]))
+        app = Flask(__name__)
+        app.config["DB_CONFIG"] = {"database": "academia"}
+        with app.app_context():
+            obter_pool().fabrica()
+            obter_pool_lote().fabrica()
+        assert flags == [0, pymysql.constants.CLIENT.MULTI_STATEMENTS]
+
+
+class ConexaoEscape:
+    """O mínimo que o cursor do PyMySQL usa para montar o SQL, sem socket."""
+    encoding = "utf8"
+
+    def escape(self, valor, mapping=None):
+        return pymysql.converters.escape_item(valor, "utf8", mapping)
+
+
+class CursorGravador(pymysql.cursors.Cursor):
+    def __init__(self):
+        super().__init__(ConexaoEscape())
+        self.executados = []
+
+    def execute(self, sql, args=None):
+        self.executados.append(bytes(sql).decode())
+        return sql.count(b"),(") + 1
+
+
+class TestInserirEmLote:
+    def test_01_varias_linhas_num_so_insert(self):
+        cursor = CursorGravador()
+        linhas = [(7, i, "Arroz d'água") for i in range(50)]
+
+        assert inserir_em_lote(cursor, "alimentos", ("id_refeicao", "ordem", "nome"), linhas) == 50
+        assert len(cursor.executados) == 1
+        assert cursor.executados[0].startswith("INSERT INTO alimentos (id_refeicao, ordem, nome) VALUES (7, 0, ")
+        assert cursor.rowcount == 50
+
+    def test_02_lista_vazia_nao_vai_ao_banco(self):
+        cursor = CursorGravador()
+        assert inserir_em_lote(cursor, "alimentos", ("id_refeicao",), []) == 0
+        assert cursor.executados == []
@@ -0,0 +1,170 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+from flask import Flask, jsonify
+from app.extensions.db import PoolConexoes, get_db, init_db
+from app.utils.fila_envios import DespachanteEnvios
+from app.utils.instrumentacao import init_instrumentacao
+from app.utils.rastreamento import (
+    CLIENTE, CONSUMIDOR, SERVIDOR, STATUS_ERRO, encerrar_rastro, init_rastreamento, iniciar_rastro,
+    ler_traceparent, rastrear, span,
+)
+from app.utils.whatsapp import ClienteUltraMsg
+from tests.test_fila_envios import UltraMsgFalsa
+from tests.test_instrumentacao import BancoFalso
+
+TRACE_ORIGEM = "4bf92f3577b34da6a3ce929d0e0e4736"
+SPAN_ORIGEM = "00f067aa0ba902b7"
+
+
+@rastrear("pdf.teste")
+def gerar_pdf_teste():
+    with span("pdf.pagina", paginas=2):
+        pass
+
+
+def criar_app(arquivo, amostragem=1.0):
+    app = Flask(__name__)
+    app.config.update(RASTREAMENTO_ATIVO=True, RASTREAMENTO_AMOSTRAGEM=amostragem,
+                      RASTREAMENTO_ARQUIVO=str(arquivo), SQL_LOG_REQUISICOES=False)
+    init_db(app)
+    init_instrumentacao(app)
+    init_rastreamento(app)
+    banco = BancoFalso()
+    app.extensions["db_pool"] = PoolConexoes(lambda: banco, tamanho_maximo=1)
+
+    @app.route("/avaliacoes/<int:id>/enviar", methods=["POST"])
+    def enviar(id):
+        with get_db().cursor() as cursor:
+            cursor.execute("SELECT * FROM avaliacoesfisicas WHERE id_avaliacao = %s", (id,))
+            cursor.fetchall()
+        gerar_pdf_teste()
+        return jsonify({}), 202
+
+    @app.route("/quebrada")
+    def quebrada():
+        raise RuntimeError("falhou")
+
+    return app
+
+
+def ler_spans(arquivo):
+    if not arquivo.exists():
+        return []
+    spans = []
+    for linha in arquivo.read_text(encoding="utf-8").splitlines():
+        for recurso in json.loads(linha)["resourceSpans"]:
+            for escopo in recurso["scopeSpans"]:
+                spans.extend(escopo["spans"])
+    return spans
+
+
+def atributos(span_otlp):
+    return {a["key"]: next(iter(a["value"].values())) for a in span_otlp["attributes"]}
+
+
+class TestRastreamento:
+    def test_01_le_traceparent_w3c(self):
+        assert ler_traceparent(f"00-{TRACE_ORIGEM}-{SPAN_ORIGEM}-01") == (TRACE_ORIGEM, SPAN_ORIGEM, True)
+        assert ler_traceparent(f"00-{TRACE_ORIGEM}-{SPAN_ORIGEM}-00")[2] is False
+        assert ler_traceparent(f"00-{'0' * 32}-{SPAN_ORIGEM}-01") is None
+        assert ler_traceparent("lixo") is None
+        assert ler_traceparent(None) is None
+
+    def test_02_requisicao_com_spans_aninhados(self, tmp_path):
+        arquivo = tmp_path / "rastros.jsonl"
+        criar_app(arquivo).test_client().post("/avaliacoes/7/enviar")
+
+        spans = ler_spans(arquivo)
+        por_nome = {s["name"]: s for s in spans}
+        raiz = por_nome["POST /avaliacoes/<int:id>/enviar"]
+
+        assert {s["traceId"] for s in spans} == {raiz["traceId"]}
+        assert "parentSpanId" not in raiz
+        assert raiz["kind"] == SERVIDOR
+        assert atributos(raiz)["http.status_code"] == "202"
+
+        consulta = por_nome["db.consulta"]
+        assert consulta["kind"] == CLIENTE
+        assert consulta["parentSpanId"] == raiz["spanId"]
+        assert atributos(consulta)["db.statement"] == "SELECT * FROM avaliacoesfisicas WHERE id_avaliacao = ?"
+        assert por_nome["db.conexao"]["parentSpanId"] == raiz["spanId"]
+        assert por_nome["pdf.pagina"]["parentSpanId"] == por_nome["pdf.teste"]["spanId"]
+        assert int(raiz["endTimeUnixNano"]) >= int(por_nome["pdf.teste"]["endTimeUnixNano"])
+
+    def test_03_amostragem_e_traceparent_de_origem(self, tmp_path):
+        arquivo = tmp_path / "rastros.jsonl"
+        fora = criar_app(arquivo, amostragem=1.0).test_client()
+        fora.post("/avaliacoes/7/enviar", headers={"traceparent": f"00-{TRACE_ORIGEM}-{SPAN_ORIGEM}-00"})
+        assert ler_spans(arquivo) == []
+
+        criar_app(arquivo, amostragem=0.0).test_client().post("/avaliacoes/7/enviar")
+        assert ler_spans(arquivo) == []
+
+        dentro = criar_app(arquivo, amostragem=0.0).test_client()
+        dentro.post("/avaliacoes/7/enviar", headers={"traceparent": f"00-{TRACE_ORIGEM}-{SPAN_ORIGEM}-01"})
+        raiz = next(s for s in ler_spans(arquivo) if s["kind"] == SERVIDOR)
+        assert (raiz["traceId"], raiz["parentSpanId"]) == (TRACE_ORIGEM, SPAN_ORIGEM)
+
+    def test_04_erro_marca_o_span_raiz(self, tmp_path):
+        arquivo = tmp_path / "rastros.jsonl"
+        app = criar_app(arquivo)
+        app.config["PROPAGATE_EXCEPTIONS"] = False
+        app.test_client().get("/quebrada")
+
+        (raiz,) = ler_spans(arquivo)
+        assert raiz["status"]["code"] == STATUS_ERRO
+        assert atributos(raiz)["exception.type"] == "RuntimeError"
+
+    def test_05_lote_da_fila_liga_as_requisicoes_de_origem(self, tmp_path):
+        arquivo = tmp_path / "rastros.jsonl"
+        app = criar_app(arquivo, amostragem=0.0)
+        envios = [
+            {"traceparent": f"00-{'a' * 32}-{'1' * 16}-00"},
+            {"traceparent": f"00-{TRACE_ORIGEM}-{SPAN_ORIGEM}-01"},
+            {"traceparent": None},
+        ]
+        with app.app_context():
+            raiz = DespachanteEnvios._iniciar_rastro(envios)
+            encerrar_rastro(raiz)
+
+        (lote,) = ler_spans(arquivo)
+        assert lote["kind"] == CONSUMIDOR
+        assert (lote["traceId"], lote["parentSpanId"]) == (TRACE_ORIGEM, SPAN_ORIGEM)
+        assert lote["links"] == [{"traceId": "a" * 32, "spanId": "1" * 16},
+                                 {"traceId": TRACE_ORIGEM, "spanId": SPAN_ORIGEM}]
+
+    def test_06_envio_em_lote_do_whatsapp_fica_no_mesmo_trace(self, tmp_path):
+        http = ThreadingHTTPServer(("127.0.0.1", 0), UltraMsgFalsa)
+        http.daemon_threads = True
+        http.recebidas, http.respostas, http.conexoes = [], [], set()
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        cliente = ClienteUltraMsg(f"http://127.0.0.1:{http.server_address[1]}", "instancia1", "token", tamanho_pool=3)
+
+        arquivo = tmp_path / "rastros.jsonl"
+        app = criar_app(arquivo)
+        try:
+            with app.app_context():
+                raiz = iniciar_rastro("fila.processar_lote")
+                cliente.enviar_em_lote([(f"551199999000{i}", "oi") for i in range(3)])
+                encerrar_rastro(raiz)
+        finally:
+            http.shutdown()
+            http.server_close()
+
+        envios = [s for s in ler_spans(arquivo) if s["name"] == "ultramsg.enviar"]
+        assert len(envios) == 3
+        assert {s["parentSpanId"] for s in envios} == {raiz.span_id}
+        assert all(atributos(s)["http.status_code"] == "200" for s in envios)
+
+    def test_07_desligado_nao_grava(self, tmp_path):
+        arquivo = tmp_path / "rastros.jsonl"
+        app = criar_app(arquivo)
+        app.config["RASTREAMENTO_ATIVO"] = False
+        app.test_client().post("/avaliacoes/7/enviar")
+        assert not arquivo.exists()
+        with app.app_context():
+            assert iniciar_rastro("x") is None
+            with span("sem.trace") as atual:
+                assert atual is None
@@ -0,0 +1,238 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from app.administrador.admin_routes import admin_bp
+from app.comandos import registrar_comandos
+from app.extensions.db import PoolConexoes, get_db, init_db
+from app.utils.revogacao import CacheRevogacao, contar_tokens_revogados, purgar_tokens_expirados
+
+
+class TabelaRevogadosFalsa:
+    """Conexão falsa que responde às consultas do cache sobre uma lista de linhas."""
+
+    def __init__(self):
+        self.linhas = []
+        self.consultas = 0
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.consultas += 1
+        if "MAX(id)" in sql:
+            self.resultado = [{"ultimo_id": max([l["id"] for l in self.linhas], default=0)}]
+        elif params:
+            self.resultado = [l for l in self.linhas if l["id"] > params[0]]
+        else:
+            self.resultado = list(self.linhas)
+
+    def fetchone(self):
+        return self.resultado[0]
+
+    def fetchall(self):
+        return self.resultado
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestCacheRevogacao:
+    def setup_method(self):
+        self.tabela = TabelaRevogadosFalsa()
+        self.app = Flask(__name__)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.tabela, tamanho_maximo=1)
+        self.cache = CacheRevogacao(intervalo_sincronizacao=60, validade_maxima=900)
+
+    def test_01_token_nao_revogado_nao_consulta_o_banco_apos_aquecer(self):
+        self.tabela.linhas.append({"id": 1, "jti": "antigo"})
+        with self.app.app_context():
+            assert self.cache.revogado("antigo")
+            consultas = self.tabela.consultas
+            for _ in range(100):
+                assert not self.cache.revogado("valido")
+        assert self.tabela.consultas == consultas
+
+    def test_02_logout_local_entra_no_cache_imediatamente(self):
+        with self.app.app_context():
+            self.cache.sincronizar()
+            self.cache.adicionar("novo", time.time() + 60)
+            assert self.cache.revogado("novo")
+
+    def test_03_sincroniza_somente_linhas_novas_de_outros_workers(self):
+        with self.app.app_context():
+            self.cache.sincronizar()
+            self.tabela.linhas.append({"id": 7, "jti": "outro_worker"})
+            assert not self.cache.revogado("outro_worker")
+
+            self.cache._proxima_sincronizacao = 0
+            assert self.cache.revogado("outro_worker")
+            assert self.cache._ultimo_id == 7
+
+    def test_04_tabela_truncada_recarrega_tudo(self):
+        self.tabela.linhas = [{"id": 5, "jti": "a"}]
+        with self.app.app_context():
+            self.cache.sincronizar()
+            self.tabela.linhas = [{"id": 1, "jti": "b"}]
+            self.cache._proxima_sincronizacao = 0
+            assert self.cache.revogado("b")
+            assert not self.cache.revogado("a")
+
+    def test_05_entrada_expira_junto_com_o_token(self):
+        with self.app.app_context():
+            self.cache.sincronizar()
+            self.cache.adicionar("vencido", time.time() - 1)
+            assert not self.cache.revogado("vencido")
+            assert len(self.cache) == 0
+
+
+# ===============================
+# Limpeza da tabela (flask tokens purgar / contar, /admin/tokens-revogados)
+# ===============================
+class TabelaTokensFalsa:
+    """Responde ao DELETE ... LIMIT e ao COUNT sobre linhas com expira_em, registrando cada DELETE e commit."""
+
+    def __init__(self, expira_em):
+        self.agora = datetime.now()
+        self.linhas = [{"id": i, "jti": f"jti{i}", "expira_em": exp} for i, exp in enumerate(expira_em, 1)]
+        self.eventos = []
+        self.open = True
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        vencidas = [l for l in self.linhas if l["expira_em"] is not None and l["expira_em"] < self.agora]
+        if sql.startswith("DELETE FROM tokensrevogados WHERE expira_em < NOW() LIMIT %s"):
+            apagadas = vencidas[:params[0]]
+            self.linhas = [l for l in self.linhas if l not in apagadas]
+            self.rowcount = len(apagadas)
+            self.eventos.append(("DELETE", self.rowcount))
+        elif "COUNT(*) AS total" in sql:
+            self.resultado = {"total": len(self.linhas), "expirados": len(vencidas)}
+        else:
+            raise AssertionError(f"SQL inesperado: {sql}")
+
+    def fetchone(self):
+        return self.resultado
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        self.eventos.append(("COMMIT",))
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestPurgaTokens:
+    def setup_method(self):
+        agora = datetime.now()
+        # 5 vencidos, 2 ainda válidos e 1 sem expiração
+        self.tabela = TabelaTokensFalsa(
+            [agora - timedelta(hours=i) for i in range(1, 6)] + [agora + timedelta(hours=1)] * 2 + [None]
+        )
+        self.app = Flask(__name__)
+        self.app.config["JWT_SECRET_KEY"] = "chave-de-teste-com-pelo-menos-32-bytes"
+        JWTManager(self.app)
+        init_db(self.app)
+        self.app.extensions["db_pool"] = PoolConexoes(lambda: self.tabela, tamanho_maximo=1)
+        self.app.register_blueprint(admin_bp, url_prefix="/admin")
+        registrar_comandos(self.app)
+
+    def test_01_apaga_so_os_vencidos_em_lotes_com_commit_por_lote(self):
+        with self.app.app_context():
+            assert purgar_tokens_expirados(tamanho_lote=2) == 5
+            eventos = list(self.tabela.eventos)
+
+        # 2 + 2 + 1: o lote incompleto encerra a limpeza
+        assert eventos == [("DELETE", 2), ("COMMIT",), ("DELETE", 2), ("COMMIT",),
+                                       ("DELETE", 1), ("COMMIT",)]
+        assert [l["jti"] for l in self.tabela.linhas] == ["jti6", "jti7", "jti8"]
+
+    def test_02_lote_cheio_exige_mais_uma_volta(self):
+        with self.app.app_context():
+            assert purgar_tokens_expirados(tamanho_lote=5) == 5
+            assert purgar_tokens_expirados(tamanho_lote=5) == 0
+        assert [e for e in self.tabela.eventos if e[0] == "DELETE"] == [("DELETE", 5), ("DELETE", 0), ("DELETE", 0)]
+
+    def test_03_contagem(self):
+        with self.app.app_context():
+            assert contar_tokens_revogados() == {"total": 8, "expirados": 5, "ativos": 3, "em_cache": 0}
+
+    def test_04_comandos_flask_tokens(self):
+        runner = self.app.test_cli_runner()
+        resultado = runner.invoke(args=["tokens", "contar"])
+        assert resultado.exit_code == 0
+        assert resultado.output.strip() == "total=8 ativos=3 expirados=5"
+
+        resultado = runner.invoke(args=["tokens", "purgar", "--lote", "3"])
+        assert resultado.exit_code == 0
+        assert resultado.output.strip() == "5 token(s) expirado(s) removido(s)."
+        assert runner.invoke(args=["tokens", "contar"]).output.strip() == "total=3 ativos=3 expirados=0"
+
+    def test_05_rota_admin(self):
+        with self.app.app_context():
+            admin = create_access_token(identity=json.dumps({"email": "administrador@alpphasgym.com"}))
+            aluno = create_access_token(identity=json.dumps({"email": "aluno@teste.com"}))
+        cliente = self.app.test_client()
+
+        assert cliente.get("/admin/tokens-revogados", headers={"Authorization": f"Bearer {aluno}"}).status_code == 403
+        resposta = cliente.get("/admin/tokens-revogados", headers={"Authorization": f"Bearer {admin}"})
+        assert resposta.status_code == 200
+        assert resposta.get_json() == {"total": 8, "expirados": 5, "ativos": 3, "em_cache": 0}
+
+
+class TestPurgaTokensMySQL:
+    """Mesma limpeza contra o banco de testes, para validar o próprio SQL (NOW(), LIMIT, NULL)."""
+
+    def test_01_purga_e_contagem_no_banco(self, app, client):
+        with app.app_context():
+            db = get_db()
+            with db.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO tokensrevogados (jti, expira_em) VALUES (%s, NOW() + INTERVAL %s HOUR)",
+                    [(f"vencido{i}", -i) for i in range(1, 6)] + [("valido1", 1), ("valido2", 2)],
+                )
+                cursor.execute("INSERT INTO tokensrevogados (jti, expira_em) VALUES ('sem_exp', NULL)")
+            db.commit()
+
+        runner = app.test_cli_runner()
+        assert runner.invoke(args=["tokens", "contar"]).output.strip() == "total=8 ativos=3 expirados=5"
+        assert runner.invoke(args=["tokens", "purgar", "--lote", "2"]).output.strip() == "5 token(s) expirado(s) removido(s)."
+
+        with app.app_context():
+            with get_db().cursor() as cursor:
+                cursor.execute("SELECT jti FROM tokensrevogados ORDER BY jti")
+                assert [l["jti"] for l in cursor.fetchall()] == ["sem_exp", "valido1", "valido2"]
+            assert contar_tokens_revogados()["expirados"] == 0
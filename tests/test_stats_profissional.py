@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+from app.utils.stats_profissional import (
+    ajustar_contador, completar_stats, fim_da_semana, registrar_vinculo
+)
+
+
+class CursorRoteirizado:
+    """Registra o SQL executado e devolve as linhas roteirizadas, em ordem."""
+
+    def __init__(self, linhas=(), rowcount=1):
+        self.linhas = list(linhas)
+        self.rowcount = rowcount
+        self.executados = []
+
+    def execute(self, sql, params=()):
+        self.executados.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return self.linhas.pop(0) if self.linhas else None
+
+
+class TestStatsProfissional:
+    def test_01_fim_da_semana_e_a_proxima_segunda(self):
+        quarta = datetime(2025, 3, 12, 15, 30)
+        assert fim_da_semana(quarta) == datetime(2025, 3, 17)
+        assert fim_da_semana(datetime(2025, 3, 17, 0, 0)) == datetime(2025, 3, 24)
+
+    def test_02_aluno_ja_vinculado_nao_soma_de_novo(self):
+        cursor = CursorRoteirizado(rowcount=0)
+        registrar_vinculo(cursor, 3, 7)
+        assert len(cursor.executados) == 1
+        assert cursor.executados[0].startswith("INSERT IGNORE INTO profissional_alunos")
+
+    def test_03_novo_aluno_incrementa_o_resumo_existente(self):
+        cursor = CursorRoteirizado(linhas=[{"id_profissional": 3}])
+        registrar_vinculo(cursor, 3, 7)
+        assert cursor.executados[-1].startswith("UPDATE profissional_stats SET alunos_vinculados = alunos_vinculados + 1")
+
+    def test_04_sem_resumo_o_incremento_vira_recalculo(self):
+        cursor = CursorRoteirizado(linhas=[None, {"total": 1}])
+        ajustar_contador(cursor, 3, "treinos_ativos", 1)
+        assert not any(sql.startswith("UPDATE profissional_stats") for sql in cursor.executados)
+        assert any("INSERT INTO profissional_stats" in sql for sql in cursor.executados)
+
+    def test_05_contador_desconhecido_e_recusado(self):
+        with pytest.raises(ValueError):
+            ajustar_contador(CursorRoteirizado(), 3, "id_profissional = 0 --", 1)
+
+    def test_06_resumo_valido_nao_gera_consulta(self):
+        agora = datetime(2025, 3, 12, 10, 0)
+        stats = {"alunos_vinculados": 4, "sessoes_semana": 2, "treinos_ativos": 1, "planos_ativos": 0,
+                 "sessoes_validas_ate": agora + timedelta(hours=1)}
+        cursor = CursorRoteirizado()
+        assert completar_stats(cursor, 3, stats, agora) == stats
+        assert cursor.executados == []
+
+    def test_07_sessoes_vencidas_sao_recontadas(self):
+        agora = datetime(2025, 3, 12, 10, 0)
+        proxima = agora + timedelta(days=1)
+        stats = {"alunos_vinculados": 4, "sessoes_semana": 2, "treinos_ativos": 1, "planos_ativos": 0,
+                 "sessoes_validas_ate": agora - timedelta(minutes=1)}
+        cursor = CursorRoteirizado(linhas=[{"total": 1, "proxima": proxima}])
+
+        resultado = completar_stats(cursor, 3, stats, agora)
+        assert resultado["sessoes_semana"] == 1
+        assert resultado["sessoes_validas_ate"] == proxima
+        assert resultado["alunos_vinculados"] == 4
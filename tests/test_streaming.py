@@ -0,0 +1,121 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pymysql
+from flask import Flask
+from app.extensions.db import PoolConexoes, init_db
+from app.utils.streaming import responder_json_streaming
+
+
+class CursorSemBuffer:
+    """Simula o SSDictCursor: entrega as linhas aos poucos e registra quantas já saíram."""
+
+    def __init__(self, banco):
+        self.banco = banco
+        self.lidas = 0
+        self.fechado = False
+
+    def execute(self, sql, params=None):
+        if "invalida" in sql:
+            raise pymysql.err.ProgrammingError("erro de sintaxe")
+        self.banco.consultas.append((sql, params))
+
+    def fetchmany(self, tamanho):
+        linhas = [
+            {"id": i, "peso": Decimal("70.5"), "data": datetime(2025, 1, 1, 8, 0)}
+            for i in range(self.lidas, min(self.lidas + tamanho, self.banco.total))
+        ]
+        self.lidas += len(linhas)
+        return linhas
+
+    def close(self):
+        self.fechado = True
+
+
+class BancoExportacao:
+    def __init__(self, total):
+        self.total = total
+        self.consultas = []
+        self.cursores = []
+        self.open = True
+
+    def cursor(self, classe=None):
+        assert classe is pymysql.cursors.SSDictCursor
+        cursor = CursorSemBuffer(self)
+        self.cursores.append(cursor)
+        return cursor
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestStreaming:
+    def criar_app(self, total):
+        self.banco = BancoExportacao(total)
+        app = Flask(__name__)
+        app.config["EXPORTACAO_TAMANHO_BLOCO"] = 10
+        init_db(app)
+        app.extensions["db_pool"] = PoolConexoes(lambda: self.banco, tamanho_maximo=1)
+
+        @app.route("/exportar")
+        def exportar():
+            return responder_json_streaming("SELECT * FROM logs WHERE id > %s", (0,), nome_arquivo="logs.json")
+
+        @app.route("/quebrada")
+        def quebrada():
+            return responder_json_streaming("SELECT invalida")
+
+        return app
+
+    def test_01_gera_um_array_json_valido(self):
+        app = self.criar_app(25)
+        resposta = app.test_client().get("/exportar")
+
+        assert resposta.status_code == 200
+        assert resposta.mimetype == "application/json"
+        assert 'filename="logs.json"' in resposta.headers["Content-Disposition"]
+        itens = json.loads(resposta.data)
+        assert [i["id"] for i in itens] == list(range(25))
+        assert itens[0]["peso"] == "70.5"
+        assert self.banco.consultas == [("SELECT * FROM logs WHERE id > %s", (0,))]
+
+    def test_02_linhas_so_saem_do_banco_quando_o_cliente_le(self):
+        app = self.criar_app(35)
+        resposta = app.test_client().get("/exportar", buffered=False)
+        cursor = self.banco.cursores[0]
+        partes = iter(resposta.response)
+
+        inicio = next(partes)
+        assert inicio == b"["
+        assert cursor.lidas == 0
+        primeiro_bloco = next(partes)
+        assert cursor.lidas == 10  # um bloco por vez, nunca o resultado inteiro
+
+        corpo = inicio + primeiro_bloco + b"".join(partes)
+        resposta.close()
+        assert cursor.lidas == 35
+        assert cursor.fechado
+        assert len(json.loads(corpo)) == 35
+
+    def test_03_resultado_vazio_e_lista_vazia(self):
+        app = self.criar_app(0)
+        resposta = app.test_client().get("/exportar")
+        assert json.loads(resposta.data) == []
+        assert self.banco.cursores[0].fechado
+
+    def test_04_erro_de_sql_acontece_antes_dos_cabecalhos(self):
+        app = self.criar_app(5)
+        app.config["PROPAGATE_EXCEPTIONS"] = False
+        resposta = app.test_client().get("/quebrada")
+        assert resposta.status_code == 500
+        assert self.banco.cursores[0].fechado
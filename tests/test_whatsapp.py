@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+from http.server import ThreadingHTTPServer
+from app.utils.whatsapp import CircuitoAberto, ClienteUltraMsg
+from tests.test_fila_envios import UltraMsgFalsa
+
+
+class TestClienteUltraMsg:
+    def setup_method(self):
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), UltraMsgFalsa)
+        self.http.daemon_threads = True
+        self.http.recebidas = []
+        self.http.respostas = []
+        self.http.conexoes = set()
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+        self.cliente = ClienteUltraMsg(
+            f"http://127.0.0.1:{self.http.server_address[1]}", "instancia1", "token",
+            tamanho_pool=4, limite_falhas=2, tempo_reabertura=0.2
+        )
+
+    def teardown_method(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+    def test_01_reaproveita_a_conexao_entre_mensagens(self):
+        for i in range(5):
+            self.cliente.enviar("5511999999999", f"mensagem {i}")
+        assert len(self.http.recebidas) == 5
+        assert len(self.http.conexoes) == 1
+
+    def test_02_envio_em_lote_usa_no_maximo_o_tamanho_do_pool(self):
+        mensagens = [(f"55119999900{i:02d}", "treino novo") for i in range(20)]
+        resultados = self.cliente.enviar_em_lote(mensagens)
+
+        assert [r["numero"] for r in resultados] == [n for n, _ in mensagens]
+        assert all(r["sucesso"] for r in resultados)
+        assert len(self.http.conexoes) <= 4
+
+    def test_03_circuito_abre_apos_falhas_e_falha_sem_chamar_a_api(self):
+        self.http.respostas = [500, 500]
+        for _ in range(2):
+            with pytest.raises(Exception):
+                self.cliente.enviar("5511999999999", "oi")
+        assert self.cliente.estado == "aberto"
+
+        with pytest.raises(CircuitoAberto):
+            self.cliente.enviar("5511999999999", "oi")
+        assert len(self.http.recebidas) == 2
+
+    def test_04_circuito_fecha_quando_a_chamada_de_teste_funciona(self):
+        self.http.respostas = [500, 500]
+        for _ in range(2):
+            with pytest.raises(Exception):
+                self.cliente.enviar("5511999999999", "oi")
+
+        threading.Event().wait(0.25)
+        assert self.cliente.estado == "meio-aberto"
+        self.cliente.enviar("5511999999999", "oi")
+        assert self.cliente.estado == "fechado"
+
+    def test_05_erro_do_cliente_nao_abre_o_circuito(self):
+        self.http.respostas = [400, 400, 400]
+        for _ in range(3):
+            with pytest.raises(Exception):
+                self.cliente.enviar("numero-invalido", "oi")
+        assert self.cliente.estado == "fechado"